@@ -0,0 +1,185 @@
+import collections
+import functools
+import os
+import threading
+import time
+from API import versions
+
+# Defaults for the service-layer query cache; both can be set from the environment.
+CACHE_MAX_ENTRIES = int(os.environ.get("DRONE_CACHE_SIZE", 1024))
+CACHE_TTL = float(os.environ.get("DRONE_CACHE_TTL", 300))
+
+
+class QueryCache:
+    """
+    A bounded LRU cache with a time-to-live for service-layer query results.
+
+    Every entry is tagged with what it was built from: (table, None) for a
+    result that depends on the whole table, (table, key) for one that only
+    depends on a single row. invalidate() drops exactly the entries a write
+    can have changed. Entries made by cached() also record the table_versions
+    counters of their tables, read before the result was built, and are only
+    served while those are unchanged, so writes made outside this process
+    are seen on the next read, as they are by the ETags.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # key -> (expires, value, tags), oldest first
+        self._tagged = {}  # tag -> set of keys
+        self._generation = 0  # bumped by every invalidation
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0, "stale": 0}
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tagged[tag]
+
+    def lookup(self, key):
+        """
+        Returns:
+            tuple: (True, value) on a hit, (False, None) on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, entry[1]
+
+    def store(self, key, value, tags, generation):
+        """
+        Adds an entry, evicting the least recently used ones beyond max_entries.
+
+        Args:
+            key (tuple): Cache key.
+            value: The result to cache.
+            tags (set of tuple): (table, key or None) pairs the result depends on.
+            generation (int): The generation read before the result was computed.
+                              If anything was invalidated since, the result may be
+                              stale and is not stored.
+        """
+        with self._lock:
+            if generation != self._generation or self.max_entries <= 0:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, frozenset(tags))
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def discard_stale(self, key):
+        """
+        Drops an entry found to be older than its tables, counting it as a miss.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._stats["hits"] -= 1
+            self._stats["misses"] += 1
+            self._stats["stale"] += 1
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def invalidate(self, table, key=None):
+        """
+        Drops the entries a write to a table can have changed.
+
+        Args:
+            table (str): The table that was written.
+            key (optional): The key of the row that was written. If omitted,
+                            every entry built from the table is dropped.
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                tags = [tag for tag in self._tagged if tag[0] == table]
+            else:
+                tags = [(table, None), (table, key)]
+            stale = set()
+            for tag in tags:
+                stale |= self._tagged.get(tag, set())
+            for stale_key in stale:
+                self._drop(stale_key)
+            self._stats["invalidations"] += len(stale)
+
+    def clear(self):
+        """
+        Drops every entry.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tagged.clear()
+
+    def cached(self, *tables, row_tags=None):
+        """
+        Decorates a service function so its results are cached by arguments.
+
+        None results (not found, or a database error) are never cached. A
+        cached result is recomputed once the version of a table it was built
+        from has changed, whoever wrote to it.
+
+        Args:
+            *tables (str): Tables the whole result depends on.
+            row_tags (callable, optional): Called with (args, result); returns
+                                           extra (table, key) tags for rows the
+                                           result depends on.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (func.__name__, args, tuple(sorted(kwargs.items())))
+                hit, entry = self.lookup(key)
+                if hit:
+                    built_from, value = entry
+                    if versions.current(list(built_from)) == list(built_from.values()):
+                        return value
+                    self.discard_stale(key)
+                generation = self._generation
+                # Read before the query, so a write that races it leaves the entry outdated rather than wrong
+                before = dict(zip(versions.STORED_TABLES, versions.current(versions.STORED_TABLES)))
+                value = func(*args, **kwargs)
+                if value is not None:
+                    tags = {(table, None) for table in tables}
+                    if row_tags is not None:
+                        tags.update(row_tags(args, value))
+                    built_from = {table: before[table] for table in sorted({table for table, _ in tags}) if table in before}
+                    self.store(key, (built_from, value), tags, generation)
+                return value
+            wrapper.uncached = func
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit, miss, eviction, expiration and invalidation counters and the current size.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl"] = self.ttl
+        return stats
+
+
+query_cache = QueryCache()
@@ -0,0 +1,161 @@
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; br is only offered when it is installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; zstd is only offered when it is installed
+    zstandard = None
+
+# Media types worth compressing. Server-Sent Events are left out on purpose:
+# each event must reach the client as soon as it is written.
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/x-yaml",
+    "application/yaml",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/plain",
+    "text/yaml",
+}
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 writes a gzip header
+
+    def compress(self, data, flush=True):
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data, flush=True):
+        out = self._compressor.process(data)
+        return out + self._compressor.flush() if flush else out
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data, flush=True):
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else out
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+# Content-Encoding -> (encoder, default level), in order of preference when
+# the client accepts several equally.
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = (ZstdEncoder, 3)
+if brotli is not None:
+    ENCODERS["br"] = (BrotliEncoder, 4)
+ENCODERS["gzip"] = (GzipEncoder, 6)
+
+
+def init_app(app):
+    """
+    Compresses responses according to the request's Accept-Encoding header.
+
+    Configuration (app.config):
+        COMPRESS_MIN_SIZE: Bodies smaller than this many bytes are sent as they
+                           are; compressing them costs more latency than it saves.
+                           Defaults to 1024.
+        COMPRESS_ALGORITHMS: Encodings to offer, most preferred first.
+                             Defaults to every one available.
+        COMPRESS_LEVELS: Dict of encoding -> compression level.
+
+    Streamed responses stay streamed: their chunks are compressed and flushed
+    one by one, after enough of the stream has been read to tell whether it
+    reaches COMPRESS_MIN_SIZE at all.
+    """
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESS_ALGORITHMS", list(ENCODERS))
+    app.config.setdefault("COMPRESS_LEVELS", {})
+    app.after_request(compress_response)
+
+
+def compress_response(response):
+    """
+    after_request hook that applies the negotiated Content-Encoding.
+    """
+    if (response.mimetype not in COMPRESSIBLE_TYPES
+            or not 200 <= response.status_code < 300 or response.status_code == 204
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or request.method == "HEAD"):
+        return response
+    response.vary.add("Accept-Encoding")
+
+    config = current_app.config
+    offered = [encoding for encoding in config["COMPRESS_ALGORITHMS"] if encoding in ENCODERS]
+    encoding = request.accept_encodings.best_match(offered)
+    if encoding is None:
+        return response
+    encoder_class, level = ENCODERS[encoding]
+    level = config["COMPRESS_LEVELS"].get(encoding, level)
+    min_size = config["COMPRESS_MIN_SIZE"]
+
+    if response.is_streamed:
+        chunks = iter(response.response)
+        head, size = [], 0
+        for chunk in chunks:
+            chunk = _bytes(chunk)
+            head.append(chunk)
+            size += len(chunk)
+            if size >= min_size:
+                break
+        else:
+            # The whole stream turned out to be small
+            response.set_data(b"".join(head))
+            return response
+        original = response.response
+        if hasattr(original, "close"):
+            response.call_on_close(original.close)
+        response.response = _compress_stream(encoder_class(level), b"".join(head), chunks)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        encoder = encoder_class(level)
+        response.set_data(encoder.compress(data, flush=False) + encoder.finish())
+
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # The compressed bytes differ from the identity ones, so only a weak match is honest
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _compress_stream(encoder, head, chunks):
+    yield encoder.compress(head)
+    for chunk in chunks:
+        out = encoder.compress(_bytes(chunk))
+        if out:
+            yield out
+    yield encoder.finish()
+
+
+def _bytes(chunk):
+    return chunk.encode() if isinstance(chunk, str) else chunk
@@ -0,0 +1,263 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from API import migrations
+
+DATABASE_PATH = Path(os.environ.get("DRONE_DB_PATH",
+                                    Path(__file__).parents[1] / "data" / "drone_data.db"))
+
+# Pragmas applied once to every pooled connection. WAL lets readers keep going
+# while the telemetry writer commits, and NORMAL sync is safe under WAL.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,          # ~64 MB page cache per connection
+    "mmap_size": 268435456,        # 256 MB memory-mapped I/O
+    "busy_timeout": 5000,          # ms to wait on a locked database
+    "temp_store": "MEMORY",
+}
+
+
+class RowStream:
+    """
+    Iterates a query's rows in batches while holding one pooled connection.
+
+    The connection goes back to the pool when the rows run out or close() is
+    called, whichever comes first, so an abandoned iteration (for example a
+    client disconnecting from a streamed response) does not leak it.
+
+    With raw=True rows are plain tuples instead of sqlite3.Row objects.
+    """
+
+    def __init__(self, pool, query, params=(), batch_size=500, raw=False):
+        self._pool = pool
+        self._connection = pool.acquire()
+        self._batch_size = batch_size
+        self._batch = iter(())
+        try:
+            self._cursor = self._connection.cursor()
+            if raw:
+                self._cursor.row_factory = None
+            self._cursor.execute(query, params)
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def columns(self):
+        """
+        list of str: The result column names.
+        """
+        return [column[0] for column in self._cursor.description]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        for row in self._batch:
+            return row
+        if self._connection is not None:
+            rows = self._cursor.fetchmany(self._batch_size)
+            if rows:
+                self._batch = iter(rows)
+                return next(self._batch)
+            self.close()
+        raise StopIteration
+
+    def batches(self):
+        """
+        Yields the remaining rows a batch (list) at a time.
+        """
+        while self._connection is not None:
+            rows = self._cursor.fetchmany(self._batch_size)
+            if not rows:
+                self.close()
+                return
+            yield rows
+
+    def close(self):
+        """
+        Returns the connection to the pool. Safe to call more than once.
+        """
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection)
+
+
+class ConnectionPool:
+    """
+    A bounded pool of long-lived SQLite connections.
+
+    Connections are opened lazily, tuned with PRAGMAS and handed back to the
+    pool when the caller is done, so the page cache and the per-connection
+    statement cache survive between requests. The first connection brings
+    the schema up to date with migrations.migrate(), so every connection the
+    pool hands out sees the current schema.
+    """
+
+    def __init__(self, database_path=DATABASE_PATH, max_size=8, cached_statements=256, migrate=True):
+        self.database_path = Path(database_path)
+        self.max_size = max_size
+        self.cached_statements = cached_statements
+        self.migrate = migrate
+        self._migrated = False
+        self._trace_callback = None
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._migrate_lock = threading.Lock()
+        self._stats = {"opened": 0, "closed": 0, "acquired": 0, "reused": 0, "in_use": 0}
+
+    def _open(self):
+        connection = sqlite3.connect(self.database_path,
+                                     check_same_thread=False,
+                                     cached_statements=self.cached_statements)
+        connection.row_factory = sqlite3.Row
+        for pragma, value in PRAGMAS.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+        if self.migrate and not self._migrated:
+            with self._migrate_lock:
+                if not self._migrated:
+                    migrations.migrate(connection)
+                    self._migrated = True
+        connection.set_trace_callback(self._trace_callback)
+        with self._lock:
+            self._stats["opened"] += 1
+        return connection
+
+    def acquire(self):
+        """
+        Takes an idle connection from the pool, opening a new one if none is free.
+
+        Returns:
+            sqlite3.Connection: A connection object.
+        """
+        try:
+            connection = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            connection = self._open()
+            reused = False
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._stats["in_use"] += 1
+            if reused:
+                self._stats["reused"] += 1
+        return connection
+
+    def release(self, connection):
+        """
+        Returns a connection to the pool, closing it if the pool is already full.
+
+        Args:
+            connection (sqlite3.Connection): A connection from acquire().
+        """
+        if connection.in_transaction:
+            connection.rollback()
+        with self._lock:
+            self._stats["in_use"] -= 1
+        if self._idle.qsize() < self.max_size:
+            self._idle.put(connection)
+        else:
+            connection.close()
+            with self._lock:
+                self._stats["closed"] += 1
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrows a connection for the duration of a with-block.
+
+        Any transaction left open when the block exits is rolled back.
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Borrows a connection and commits when the with-block succeeds,
+        rolling back if it raises.
+        """
+        with self.connection() as connection:
+            try:
+                yield connection
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+
+    def stream(self, query, params=None, batch_size=500, raw=False):
+        """
+        Runs a SELECT and returns its rows as a RowStream instead of a list.
+
+        The query executes immediately, so SQL errors are raised here rather
+        than part-way through the iteration.
+
+        Args:
+            query (str): The SQL query.
+            params (tuple, optional): Query parameters.
+            batch_size (int, optional): Rows fetched from SQLite at a time.
+            raw (bool, optional): Return plain tuples instead of sqlite3.Row objects.
+
+        Returns:
+            RowStream: An iterator over the rows.
+        """
+        return RowStream(self, query, params if params is not None else (), batch_size, raw)
+
+    def set_trace_callback(self, callback):
+        """
+        Calls callback with the text of every SQL statement run on a pooled
+        connection, or stops tracing if callback is None.
+
+        Applies to idle connections and to connections opened later, so set it
+        while no connection is borrowed.
+
+        Args:
+            callback (callable): Takes one str argument.
+        """
+        self._trace_callback = callback
+        idle = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for connection in idle:
+            connection.set_trace_callback(callback)
+            self._idle.put(connection)
+
+    def close_all(self):
+        """
+        Closes every idle connection in the pool.
+        """
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+            with self._lock:
+                self._stats["closed"] += 1
+
+    def stats(self):
+        """
+        Returns pool counters.
+
+        Returns:
+            dict: Opened/closed/acquired/reused counts, connections in use and idle.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["idle"] = self._idle.qsize()
+        stats["max_size"] = self.max_size
+        stats["database"] = str(self.database_path)
+        return stats
+
+
+pool = ConnectionPool()
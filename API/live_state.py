@@ -0,0 +1,408 @@
+import atexit
+import bisect
+import dataclasses
+import math
+import os
+import sqlite3
+import threading
+import time
+from API.database import pool
+from API.model import Drone
+from API import telemetry
+from API.stream import feed
+from API.spatial import nearest_index
+
+DRONE_FIELDS = [field.name for field in dataclasses.fields(Drone)]
+
+# Upper bound, in seconds, on how long an accepted update can live only in
+# memory. Zero or less writes every update through immediately.
+FLUSH_INTERVAL = float(os.environ.get("DRONE_FLUSH_INTERVAL", 1.0))
+
+# Allowed range of each position field; None for any finite number
+POSITION_RANGES = {"Altitude": None, "Latitude": (-90, 90), "Longitude": (-180, 180)}
+
+
+def position_errors(changes):
+    """
+    Checks the position fields present in a set of drone changes.
+
+    Args:
+        changes (dict): Drone fields to change. Missing or None positions are not checked.
+
+    Returns:
+        list of str: One message per invalid field; empty if they are all valid.
+    """
+    errors = []
+    for name, bounds in POSITION_RANGES.items():
+        value = changes.get(name)
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            errors.append(f"{name} must be a number")
+        elif bounds is not None and not bounds[0] <= value <= bounds[1]:
+            errors.append(f"{name} must be between {bounds[0]} and {bounds[1]}")
+    return errors
+
+
+def field_errors(changes):
+    """
+    Checks every field in a set of drone changes: positions as in
+    position_errors(), the other fields must be strings, numbers or None.
+
+    Returns:
+        list of str: One message per invalid field; empty if they are all valid.
+    """
+    errors = [f"{name} must be a string or a number" for name, value in changes.items()
+              if name not in POSITION_RANGES and value is not None and not isinstance(value, (str, int, float))]
+    return errors + position_errors(changes)
+
+
+class FleetState:
+    """
+    Process-wide, in-memory copy of the drones table.
+
+    Reads are answered from memory. Updates replace the in-memory Drone, move
+    it in the nearest-drone index, are published to the SSE change feed, and
+    are written back to SQLite by a
+    background thread every flush_interval seconds, together with their
+    telemetry samples. A flush writes only the columns updates changed, so
+    it does not undo changes other writers made to the rest of the row;
+    reload() picks those up.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._drones = None
+        self._sorted_ids = None  # BUNO_IDs in order, rebuilt after adds and deletes
+        self._dirty = {}  # BUNO_ID -> names of the columns changed since the last flush
+        self._samples = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # keeps flushes from committing out of order
+        self._stop = threading.Event()
+        self._flusher = None
+        self._stats = {"flushes": 0, "flushed_drones": 0, "flush_errors": 0, "last_flush_ms": 0.0}
+
+    def _load(self):
+        if self._drones is not None:
+            return
+        with pool.connection() as conn:
+            rows = conn.execute("SELECT * FROM drones").fetchall()
+        drones = {row["BUNO_ID"]: Drone(**{name: row[name] for name in DRONE_FIELDS}) for row in rows}
+        with self._lock:
+            if self._drones is None:
+                self._drones = drones
+                nearest_index.rebuild(drones.values())
+
+    def _start_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._run, name="fleet-state-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def all(self):
+        """
+        Returns:
+            List[Drone]: Every drone, in table order.
+        """
+        self._load()
+        with self._lock:
+            return list(self._drones.values())
+
+    def matching(self, predicate):
+        """
+        Returns:
+            List[Drone]: The drones for which predicate(drone) is true, in table order.
+        """
+        self._load()
+        with self._lock:
+            return [drone for drone in self._drones.values() if predicate(drone)]
+
+    def get(self, buno_id):
+        """
+        Returns:
+            Drone: The drone with the given BUNO_ID, or None.
+        """
+        self._load()
+        with self._lock:
+            return self._drones.get(buno_id)
+
+    def get_many(self, buno_ids):
+        """
+        Returns:
+            List[Drone]: The drone with each of the given BUNO_IDs, in order; None for unknown IDs.
+        """
+        self._load()
+        with self._lock:
+            return [self._drones.get(buno_id) for buno_id in buno_ids]
+
+    def page(self, after=None, limit=None):
+        """
+        Returns one page of drones in BUNO_ID order.
+
+        Args:
+            after (str, optional): Start after this BUNO_ID.
+            limit (int, optional): Maximum drones to return.
+
+        Returns:
+            List[Drone]: The page.
+        """
+        self._load()
+        with self._lock:
+            if self._sorted_ids is None:
+                self._sorted_ids = sorted(self._drones)
+            start = bisect.bisect_right(self._sorted_ids, after) if after is not None else 0
+            end = start + limit if limit is not None else None
+            return [self._drones[buno_id] for buno_id in self._sorted_ids[start:end]]
+
+    def nearest(self, lat, lon, k, status=None):
+        """
+        Returns:
+            list of tuple: (distance in metres, Drone) pairs for the k drones
+                           nearest to a point, nearest first.
+        """
+        self._load()
+        with self._lock:
+            return [(distance, self._drones[buno_id])
+                    for distance, buno_id in nearest_index.nearest(lat, lon, k, status)]
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Returns:
+            List[Drone]: The drones inside a latitude/longitude box, in BUNO_ID order.
+        """
+        self._load()
+        with self._lock:
+            buno_ids = nearest_index.within_bbox(min_lat, min_lon, max_lat, max_lon)
+            return [self._drones[buno_id] for buno_id in buno_ids]
+
+    def within_radius(self, lat, lon, radius_m):
+        """
+        Returns:
+            List[Drone]: The drones within radius_m metres of a point, nearest first.
+        """
+        self._load()
+        with self._lock:
+            return [self._drones[buno_id] for _, buno_id in nearest_index.within_radius(lat, lon, radius_m)]
+
+    def put(self, drone):
+        """
+        Stores a drone that has already been written to the database.
+        """
+        self._load()
+        with self._lock:
+            old = self._drones.get(drone.BUNO_ID)
+            if old is None:
+                self._sorted_ids = None
+            self._drones[drone.BUNO_ID] = drone
+            nearest_index.upsert(drone)
+            feed.publish([drone], previous=[old.Status if old is not None else None])
+
+    def remove(self, buno_id):
+        """
+        Forgets a drone that has already been deleted from the database.
+        """
+        self._load()
+        with self._lock:
+            drone = self._drones.pop(buno_id, None)
+            self._sorted_ids = None
+            nearest_index.remove(buno_id)
+            self._dirty.pop(buno_id, None)
+            self._samples = [sample for sample in self._samples if sample["BUNO_ID"] != buno_id]
+            if drone is not None:
+                feed.publish([drone], event="delete")
+
+    def update(self, buno_id, changes):
+        """
+        Applies changes to one drone. See update_many().
+
+        Returns:
+            Drone: The updated drone, or None if it does not exist.
+        """
+        return self.update_many([(buno_id, changes)])[0]
+
+    def update_many(self, updates):
+        """
+        Applies changes to drones in memory and queues them for the next flush.
+
+        With a flush_interval of zero or less the changes are written through
+        before returning instead.
+
+        Every update is checked before any is applied, so the call changes
+        all the drones or none: memory, the nearest-drone index and the
+        pending writes never disagree.
+
+        Args:
+            updates (list of tuple): (BUNO_ID, dict of Drone fields to change)
+                                     pairs; unknown keys are ignored.
+
+        Returns:
+            list: The updated Drone for each pair, or None where the drone does not exist.
+
+        Raises:
+            ValueError: If an update sets a field to an unusable value (see field_errors()).
+        """
+        self._load()
+        now = time.time()
+        with self._lock:
+            results = []
+            for buno_id, changes in updates:
+                current = self._drones.get(buno_id) if isinstance(buno_id, str) else None
+                if current is None:
+                    results.append(None)
+                    continue
+                changes = {name: changes[name] for name in DRONE_FIELDS if name in changes and name != "BUNO_ID"}
+                errors = field_errors(changes)
+                if errors:
+                    raise ValueError(f"{buno_id}: {'; '.join(errors)}")
+                results.append(dataclasses.replace(current, **changes))
+
+            published, previous = [], []
+            for updated in results:
+                if updated is None:
+                    continue
+                current = self._drones[updated.BUNO_ID]
+                published.append(updated)
+                previous.append(current.Status)
+                changed = {name for name in DRONE_FIELDS if getattr(updated, name) != getattr(current, name)}
+                nearest_index.upsert(updated)
+                self._drones[updated.BUNO_ID] = updated
+                if changed:
+                    self._dirty.setdefault(updated.BUNO_ID, set()).update(changed)
+                self._samples.append({"BUNO_ID": updated.BUNO_ID, "Timestamp": now,
+                                      "Altitude": updated.Altitude,
+                                      "Latitude": updated.Latitude,
+                                      "Longitude": updated.Longitude})
+            # Published under the lock, so the feed orders a drone's changes as they were applied
+            feed.publish(published, previous=previous)
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self._start_flusher()
+        return results
+
+    def flush(self):
+        """
+        Writes every pending change to the drones and telemetry tables in one
+        transaction. On failure the changes stay queued for the next attempt.
+
+        Returns:
+            int: Number of drones written.
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            if not self._dirty and not self._samples:
+                return 0
+            dirty, self._dirty = self._dirty, {}
+            samples, self._samples = self._samples, []
+            # One UPDATE statement per set of changed columns; position updates all share one
+            by_columns = {}
+            for buno_id, changed in dirty.items():
+                drone = self._drones.get(buno_id)
+                if drone is not None:
+                    columns = tuple(name for name in DRONE_FIELDS if name in changed)
+                    by_columns.setdefault(columns, []).append(
+                        tuple(getattr(drone, name) for name in columns) + (buno_id,))
+
+        started = time.perf_counter()
+        try:
+            with pool.transaction() as conn:
+                for columns, rows in by_columns.items():
+                    conn.executemany(
+                        f"UPDATE drones SET {', '.join(f'{name} = ?' for name in columns)} WHERE BUNO_ID = ?", rows)
+                telemetry.record_positions(conn, samples)
+        except sqlite3.Error as e:
+            print(f"Error flushing fleet state to the database: {e}")
+            with self._lock:
+                for buno_id, changed in dirty.items():
+                    if buno_id in self._drones:
+                        self._dirty.setdefault(buno_id, set()).update(changed)
+                self._samples = samples + self._samples
+                self._stats["flush_errors"] += 1
+            return 0
+
+        flushed = sum(len(rows) for rows in by_columns.values())
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["flushed_drones"] += flushed
+            self._stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        telemetry.maybe_compact()
+        return flushed
+
+    def reload(self):
+        """
+        Re-reads the drones table, picking up rows that something other than
+        the API added, changed or deleted, such as create_db.py --incremental.
+
+        Pending changes are flushed first. Changes accepted while the table is
+        read are kept over the values read. Drones that differ are moved in
+        the nearest-drone index and published to the change feed; deleted
+        ones are published as deletes.
+
+        Returns:
+            dict: Counts of "added", "updated" and "deleted" drones.
+        """
+        self._load()
+        with self._flush_lock:
+            self._flush()
+            with pool.connection() as conn:
+                rows = conn.execute("SELECT * FROM drones").fetchall()
+            drones = {row["BUNO_ID"]: Drone(**{name: row[name] for name in DRONE_FIELDS}) for row in rows}
+
+            with self._lock:
+                for buno_id, columns in self._dirty.items():
+                    if buno_id in drones:
+                        current = self._drones[buno_id]
+                        drones[buno_id] = dataclasses.replace(
+                            drones[buno_id], **{name: getattr(current, name) for name in columns})
+                changed = [drone for buno_id, drone in drones.items() if self._drones.get(buno_id) != drone]
+                deleted = [drone for buno_id, drone in self._drones.items() if buno_id not in drones]
+                added = sum(buno_id not in self._drones for buno_id in drones)
+                previous = [self._drones[drone.BUNO_ID].Status if drone.BUNO_ID in self._drones else None
+                            for drone in changed]
+                for drone in changed:
+                    nearest_index.upsert(drone)
+                for drone in deleted:
+                    nearest_index.remove(drone.BUNO_ID)
+                    self._dirty.pop(drone.BUNO_ID, None)
+                if deleted:
+                    gone = {drone.BUNO_ID for drone in deleted}
+                    self._samples = [sample for sample in self._samples if sample["BUNO_ID"] not in gone]
+                if added or deleted:
+                    self._sorted_ids = None
+                self._drones = drones
+                feed.publish(changed, previous=previous)
+                feed.publish(deleted, event="delete")
+        return {"added": added, "updated": len(changed) - added, "deleted": len(deleted)}
+
+    def close(self):
+        """
+        Stops the background flusher and writes whatever is still pending.
+        """
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Cache size, pending work and flush counters.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["drones"] = len(self._drones) if self._drones is not None else 0
+            stats["dirty"] = len(self._dirty)
+            stats["pending_samples"] = len(self._samples)
+        stats["flush_interval"] = self.flush_interval
+        return stats
+
+
+fleet = FleetState()
+atexit.register(fleet.close)
@@ -0,0 +1,213 @@
+# Versioned schema migrations.
+#
+# The database's PRAGMA user_version holds the number of the last migration
+# applied. migrate() applies the newer ones in order, each in its own
+# transaction, so an existing database is upgraded in place and a new one is
+# built from scratch the same way. Never edit a migration that has shipped;
+# add a new one instead.
+#
+# A CREATE UNIQUE INDEX fails on a table that already holds duplicate keys.
+# migrate() checks for them first and raises sqlite3.IntegrityError naming
+# the table, the key columns and some of the duplicate keys, and leaves the
+# database at the previous version; nothing is deleted on the user's behalf.
+import re
+import sqlite3
+
+# (version, description, statements)
+MIGRATIONS = [
+    (1, "Core tables", [
+        """
+        CREATE TABLE IF NOT EXISTS drones (
+            BUNO_ID TEXT,
+            Drone_Model TEXT,
+            Manufacturer TEXT,
+            Purchase_Date TEXT,
+            Serial BIGINT,
+            Status TEXT,
+            Status_Code TEXT,
+            Altitude BIGINT,
+            Latitude FLOAT,
+            Longitude FLOAT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS flight_plans (
+            Flight_Plan_ID TEXT,
+            BUNO_ID TEXT,
+            Pilot_ID TEXT,
+            Route_ID TEXT,
+            IsPlanned BOOLEAN,
+            IsComplete BOOLEAN
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS routes (
+            Route_ID TEXT,
+            Latitude FLOAT,
+            Longitude FLOAT,
+            Waypoint_ID TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS pilots (
+            Pilot_ID TEXT,
+            Pilot_Current BOOLEAN,
+            Pilot_Hours BIGINT
+        )
+        """,
+    ]),
+    # Keys are unique indexes rather than PRIMARY KEY clauses so existing
+    # tables get them without being rebuilt. Flight_Plan_ID is not unique in
+    # the shipped data (a plan can cover several routes), so it is only indexed.
+    # Databases created before this migration could hold duplicate drones,
+    # pilots or waypoints; those must be removed by hand before it applies.
+    (2, "Keys and lookup indexes", [
+        "DROP INDEX IF EXISTS idx_routes_route_waypoint",
+        "DROP INDEX IF EXISTS idx_pilots_pilot_id",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_drones_buno_id ON drones (BUNO_ID)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_pilots_pilot_id ON pilots (Pilot_ID)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_routes_route_waypoint ON routes (Route_ID, Waypoint_ID)",
+        "CREATE INDEX IF NOT EXISTS idx_drones_status ON drones (Status)",
+        "CREATE INDEX IF NOT EXISTS idx_drones_manufacturer ON drones (Manufacturer)",
+        "CREATE INDEX IF NOT EXISTS idx_drones_purchase_date ON drones (Purchase_Date)",
+        "CREATE INDEX IF NOT EXISTS idx_flight_plans_flight_plan_id ON flight_plans (Flight_Plan_ID)",
+        "CREATE INDEX IF NOT EXISTS idx_flight_plans_buno_id ON flight_plans (BUNO_ID)",
+        "CREATE INDEX IF NOT EXISTS idx_flight_plans_pilot_id ON flight_plans (Pilot_ID)",
+        "CREATE INDEX IF NOT EXISTS idx_flight_plans_route_id ON flight_plans (Route_ID)",
+        "CREATE INDEX IF NOT EXISTS idx_pilots_hours ON pilots (Pilot_Hours)",
+    ]),
+    (3, "Telemetry tiers", [
+        statement
+        for table in ("telemetry_raw", "telemetry_1s", "telemetry_1m")
+        for statement in (
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                BUNO_ID TEXT NOT NULL,
+                Timestamp REAL NOT NULL,
+                Altitude REAL,
+                Latitude REAL,
+                Longitude REAL,
+                PRIMARY KEY (BUNO_ID, Timestamp)
+            ) WITHOUT ROWID
+            """,
+            # Compaction selects and deletes by age across all drones
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (Timestamp)",
+        )
+    ]),
+    (4, "Table version counters", [
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+    ] + [
+        statement
+        for table in ("routes", "pilots", "flight_plans")
+        for statement in [f"INSERT OR IGNORE INTO table_versions (name) VALUES ('{table}')"] + [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+            END
+            """
+            for event in ("INSERT", "UPDATE", "DELETE")
+        ]
+    ]),
+    # A plan covers each of its routes once. This is the key incremental
+    # imports (create_db.py --incremental) match flight plans on.
+    # idx_flight_plans_flight_plan_id stays: it is ordered by (Flight_Plan_ID,
+    # rowid), which keyset pagination reads in order.
+    (5, "Flight plan key", [
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_flight_plans_plan_route ON flight_plans (Flight_Plan_ID, Route_ID)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+UNIQUE_INDEX = re.compile(r"\s*CREATE UNIQUE INDEX IF NOT EXISTS (\w+) ON (\w+) \(([^)]+)\)")
+
+# Duplicate keys quoted in the error raised by check_unique_keys()
+DUPLICATES_SHOWN = 5
+
+
+def current_version(conn):
+    """
+    Returns:
+        int: The number of the last migration applied to the database.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def check_unique_keys(conn, statement):
+    """
+    Checks that the unique index a statement creates can be built.
+
+    Args:
+        conn (sqlite3.Connection): A connection to the database.
+        statement (str): A migration statement; only CREATE UNIQUE INDEX is checked.
+
+    Raises:
+        sqlite3.IntegrityError: If the table holds rows with the same key,
+            with a message naming the table, the key and how to fix it.
+    """
+    match = UNIQUE_INDEX.match(statement)
+    if not match:
+        return
+    index, table, columns = match.groups()
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,)).fetchone():
+        return
+    # Rows with a NULL key column never clash in a unique index
+    not_null = " AND ".join(f"{column.strip()} IS NOT NULL" for column in columns.split(","))
+    duplicates = conn.execute(
+        f"SELECT {columns}, COUNT(*) FROM {table} WHERE {not_null} GROUP BY {columns} HAVING COUNT(*) > 1"
+    ).fetchall()
+    if not duplicates:
+        return
+    shown = "; ".join(f"{', '.join(map(str, row[:-1]))} ({row[-1]} rows)" for row in duplicates[:DUPLICATES_SHOWN])
+    raise sqlite3.IntegrityError(
+        f"{table} has {len(duplicates)} duplicate key(s) on ({columns}), so {index} cannot be created: {shown}"
+        f"{' ...' if len(duplicates) > DUPLICATES_SHOWN else ''}. Delete or correct the duplicate rows, "
+        f"e.g. keep the first of each with DELETE FROM {table} WHERE rowid NOT IN "
+        f"(SELECT MIN(rowid) FROM {table} GROUP BY {columns}), then start the API again.")
+
+
+def migrate(conn, target=LATEST_VERSION):
+    """
+    Applies every migration newer than the database's version, up to target.
+
+    Each migration runs in a BEGIN IMMEDIATE transaction together with the
+    user_version bump, so it is applied completely or not at all, and two
+    processes starting at once cannot apply the same migration twice.
+    Unique indexes are checked with check_unique_keys() before they are built.
+
+    Args:
+        conn (sqlite3.Connection): A connection to the database.
+        target (int, optional): Stop after this version. Defaults to the latest.
+
+    Returns:
+        list of int: The versions applied, oldest first.
+    """
+    applied = []
+    start = current_version(conn)
+    for version, description, statements in MIGRATIONS:
+        if version <= start:
+            continue
+        if version > target:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= version:  # applied meanwhile by another process
+                conn.rollback()
+                continue
+            for statement in statements:
+                check_unique_keys(conn, statement)
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error applying migration {version} ({description}): {e}")
+            raise
+        applied.append(version)
+    return applied
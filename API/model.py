@@ -1,7 +1,18 @@
 from dataclasses import dataclass
 
-@dataclass
-class Drone:
+
+class Model:
+    """
+    Base for the row models. Models are slotted, so they have no per-instance
+    __dict__; use to_dict() to get a JSON-ready dictionary.
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+@dataclass(slots=True)
+class Drone(Model):
     BUNO_ID: str
     Drone_Model: str
     Manufacturer: str
@@ -13,8 +24,8 @@ class Drone:
     Latitude: float
     Longitude: float
 
-@dataclass
-class FlightPlan:
+@dataclass(slots=True)
+class FlightPlan(Model):
     Flight_Plan_ID: str
     BUNO_ID: str
     Pilot_ID: str
@@ -22,15 +33,15 @@ class FlightPlan:
     IsPlanned: bool
     IsComplete: bool
 
-@dataclass
-class Route:
+@dataclass(slots=True)
+class Route(Model):
     Route_ID: str
     Latitude: float
     Longitude: float
     Waypoint_ID: str 
 
-@dataclass
-class Pilot:
+@dataclass(slots=True)
+class Pilot(Model):
     Pilot_ID: str
     Pilot_Current: bool
-    Pilot_Hours: int
\ No newline at end of file
+    Pilot_Hours: int
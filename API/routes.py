@@ -1,21 +1,244 @@
-from flask import Blueprint, jsonify, send_from_directory, request
+import base64
+import functools
+import hashlib
+import json
+import math
+from datetime import datetime
+from urllib.parse import urlencode
+from flask import Blueprint, Response, jsonify, make_response, send_from_directory, request, stream_with_context
 import API.services as services  # Import your services module
+from API.serialize import dumps
 
 api_bp = Blueprint('api', __name__)
 
 
+def parse_time(value):
+    """
+    Parses a query-string time given as Unix seconds or an ISO-8601 string.
+
+    Returns:
+        float: Unix time, or None if no value was given.
+    """
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+MAX_PAGE_SIZE = 1000
+
+
+def page_args(cursor_length):
+    """
+    Reads the ?limit= and ?after= keyset pagination parameters.
+
+    Args:
+        cursor_length (int): Number of values a valid cursor holds.
+
+    Returns:
+        tuple: (limit, decoded cursor) - both None if the client did not ask to page.
+
+    Raises:
+        ValueError: If either parameter is malformed.
+    """
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    if limit is None and after is None:
+        return None, None
+    limit = int(limit) if limit is not None else MAX_PAGE_SIZE
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    if after is not None:
+        after = json.loads(base64.urlsafe_b64decode(after.encode()))
+        # Cursor values are bound as SQL parameters, so only scalars are accepted
+        if (not isinstance(after, list) or len(after) != cursor_length
+                or not all(isinstance(value, (str, int, float)) for value in after)):
+            raise ValueError('Invalid cursor')
+    return limit, after
+
+
+def field_args(table):
+    """
+    Reads the ?fields= sparse fieldset parameter.
+
+    Args:
+        table (str): The table whose model the fields are checked against.
+
+    Returns:
+        list of str: The requested fields, or None to return every field.
+
+    Raises:
+        ValueError: If a field is unknown.
+    """
+    return services.parse_fields(table, request.args.get('fields'))
+
+
+MAX_MULTI_GET_IDS = MAX_PAGE_SIZE
+
+
+def point_args():
+    """
+    Reads the ?lat= and ?lon= parameters of a point.
+
+    Returns:
+        tuple: (lat, lon) in degrees.
+
+    Raises:
+        KeyError: If either parameter is missing.
+        ValueError: If either is not a number, or lies outside [-90, 90] / [-180, 180].
+    """
+    lat = float(request.args['lat'])
+    lon = float(request.args['lon'])
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):  # False for NaN too
+        raise ValueError
+    return lat, lon
+
+
+def id_args():
+    """
+    Reads the ?ids= multi-get parameter, a comma-separated list of IDs.
+
+    Returns:
+        list of str: The IDs in request order, repeats included, or None if not given.
+
+    Raises:
+        ValueError: If the list is empty or too long, or paging is asked for as well.
+    """
+    ids = request.args.get('ids')
+    if ids is None:
+        return None
+    ids = [value.strip() for value in ids.split(',') if value.strip()]
+    if not 1 <= len(ids) <= MAX_MULTI_GET_IDS:
+        raise ValueError(f'ids must list between 1 and {MAX_MULTI_GET_IDS} IDs')
+    if 'limit' in request.args or 'after' in request.args:
+        raise ValueError('ids cannot be combined with limit or after')
+    return ids
+
+
+def multi_get_response(ids, items, key, not_found):
+    """
+    Builds a multi-get response: one entry per requested ID, in request
+    order, either the item or {key: id, "error": not_found}.
+    """
+    return jsonify([to_dict(item) if item is not None else {key: item_id, 'error': not_found}
+                    for item_id, item in zip(ids, items)]), 200
+
+
+def to_dict(item):
+    """
+    Returns the JSON-ready form of a model object or a sparse-fieldset dictionary.
+    """
+    return item if isinstance(item, dict) else item.to_dict()
+
+
+def paged_response(items, next_after):
+    """
+    Builds a list response, adding X-Next-Cursor and Link headers when
+    there is another page.
+    """
+    response = jsonify([to_dict(item) for item in items])
+    if next_after is not None:
+        cursor = base64.urlsafe_b64encode(json.dumps(next_after).encode()).decode()
+        response.headers['X-Next-Cursor'] = cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(dict(request.args, after=cursor))}>; rel="next"'
+    return response, 200
+
+
+def streamed_list(array):
+    """
+    Builds a 200 response that sends a JSON array as it is produced.
+
+    The response starts right away and its memory use does not grow with
+    the size of the collection. The array's close() runs when the response
+    finishes or the client goes away, even if it was never iterated.
+
+    Args:
+        array (ArrayStream): The array, as chunks of bytes.
+    """
+    response = Response(stream_with_context(iter(array)), 200, mimetype='application/json')
+    response.call_on_close(array.close)
+    return response
+
+
+def conditional(*tables):
+    """
+    Adds an ETag to a read endpoint and answers If-None-Match with 304.
+
+    The ETag is derived from the change counters of the tables the endpoint
+    reads and from the full request URL, so it is known before the endpoint
+    runs; a matching request gets its 304 without touching the query or the
+    serializer.
+
+    Args:
+        *tables (str): The tables whose contents the response depends on.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = '|'.join(services.get_table_versions(list(tables)) + [request.full_path])
+            etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator
+
+
 @api_bp.route('/connection')
 def test_connection():
     """
     Test the database connection.
     """
     try:
-        services.get_db_connection()  # Call the function from services.py
+        services.check_connection()  # Call the function from services.py
         return jsonify({'message': 'Successfully connected to the API'}), 200
     except Exception as e:
         return jsonify({'error': f'Database connection failed: {str(e)}'}), 500
 
 
+@api_bp.route('/stats/pool')
+def get_pool_stats():
+    """
+    Report the database connection pool counters.
+    """
+    return jsonify(services.get_pool_stats()), 200
+
+
+@api_bp.route('/stats/cache')
+def get_cache_stats():
+    """
+    Report the query cache hit, miss and eviction counters.
+    """
+    return jsonify(services.get_cache_stats()), 200
+
+
+@api_bp.route('/stats/fleet_state')
+def get_fleet_state_stats():
+    """
+    Report the live fleet state cache and write-behind counters.
+    """
+    return jsonify(services.get_fleet_state_stats()), 200
+
+
+@api_bp.route('/fleet_state/reload', methods=['POST'])
+def reload_fleet_state():
+    """
+    Re-read the drones table into the live fleet state, after it was changed
+    outside the API (e.g. by create_db.py --incremental).
+    """
+    counts = services.reload_fleet_state()
+    if counts is None:
+        return jsonify({'error': 'Failed to reload the fleet state'}), 500
+    return jsonify(counts), 200
+
+
 @api_bp.route('/')  # Route for index.html
 def serve_index():
     """Serve the index.html file."""
@@ -29,27 +252,115 @@ def serve_openapi_spec():
 
 
 @api_bp.route("/drones", methods=["GET"])
+@conditional('drones')
 def get_drones():
     """
-    Retrieve a list of all drones.
+    Retrieve a list of all drones, or the drones listed in ?ids=.
+    """
+    try:
+        limit, after = page_args(1)
+        if after is not None and not isinstance(after[0], str):
+            raise ValueError('Invalid cursor')  # The fleet state pages by comparing BUNO_ID strings
+    except ValueError as e:
+        return jsonify({'error': f'Invalid pagination parameters: {str(e)}'}), 400
+    try:
+        fields = field_args('drones')
+        ids = id_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        if ids is not None:
+            return multi_get_response(ids, services.get_drones_by_ids(ids, fields), 'BUNO_ID', 'Drone not found')
+        if limit is not None:
+            return paged_response(*services.get_drones_page(limit, after, fields))
+        return streamed_list(services.stream_json('drones', fields))
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch drones: {str(e)}'}), 500
+
+
+@api_bp.route("/drones/stream", methods=["GET"])
+def stream_drones():
+    """
+    Stream drone changes as Server-Sent Events, optionally filtered with
+    ?buno_id=DR-001,DR-002 and ?status=Active.
     """
+    buno_ids = set(filter(None, request.args.get('buno_id', '').split(',')))
+    statuses = set(filter(None, request.args.get('status', '').split(',')))
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    events = services.stream_drone_changes(buno_ids, statuses, last_event_id)
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@api_bp.route("/drones/within", methods=["GET"])
+@conditional('drones')
+def get_drones_within():
+    """
+    Retrieve the drones inside ?bbox=min_lon,min_lat,max_lon,max_lat or
+    within ?radius_m= metres of ?lat=&lon=.
+    """
+    try:
+        if 'bbox' in request.args:
+            min_lon, min_lat, max_lon, max_lat = (float(value) for value in request.args['bbox'].split(','))
+            if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):  # False for NaN too
+                raise ValueError
+            drones = services.get_drones_in_bbox(min_lat, min_lon, max_lat, max_lon)
+        else:
+            lat, lon = point_args()
+            radius_m = float(request.args['radius_m'])
+            if not 0 <= radius_m < math.inf:
+                raise ValueError
+            drones = services.get_drones_in_radius(lat, lon, radius_m)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Provide bbox=min_lon,min_lat,max_lon,max_lat within [-180, 180] and [-90, 90], '
+                                 'or lat, lon and a finite radius_m of 0 or more'}), 400
     try:
-        drones = services.get_all_drones()  # Call the function from services.py
-        drone_list = [drone.__dict__ for drone in drones]
-        return jsonify(drone_list), 200
+        if drones is None:
+            return jsonify({'error': 'Failed to fetch drones'}), 500
+        return jsonify([drone.to_dict() for drone in drones]), 200
     except Exception as e:
         return jsonify({'error': f'Failed to fetch drones: {str(e)}'}), 500
 
 
+# Largest ?k= accepted by /drones/nearest
+MAX_NEAREST = MAX_PAGE_SIZE
+
+
+@api_bp.route("/drones/nearest", methods=["GET"])
+@conditional('drones')
+def get_nearest_drones():
+    """
+    Retrieve the ?k= drones nearest to ?lat=&lon=, optionally only those with ?status=.
+    """
+    try:
+        lat, lon = point_args()
+        k = int(request.args.get('k', 5))
+        if not 1 <= k <= MAX_NEAREST:
+            raise ValueError
+    except (KeyError, ValueError):
+        return jsonify({'error': f'Provide lat from -90 to 90, lon from -180 to 180, '
+                                 f'and k from 1 to {MAX_NEAREST}'}), 400
+    try:
+        nearest = services.get_nearest_drones(lat, lon, k, request.args.get('status'))
+        return jsonify([dict(drone.to_dict(), Distance_m=round(distance, 1)) for distance, drone in nearest]), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch nearest drones: {str(e)}'}), 500
+
+
 @api_bp.route("/drones/<buno_id>", methods=["GET"])  # Changed drone_id to buno_id
+@conditional('drones')
 def get_drone(buno_id):  # Changed drone_id to buno_id
     """
     Retrieve a specific drone by its ID.
     """
     try:
-        drone = services.get_drone_by_id(buno_id)  # Call the function from services.py and pass buno_id
+        fields = field_args('drones')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        drone = services.get_drone_by_id(buno_id, fields)  # Call the function from services.py and pass buno_id
         if drone:
-            return jsonify(drone.__dict__), 200
+            return jsonify(to_dict(drone)), 200
         else:
             return jsonify({'error': 'Drone not found'}), 404
     except Exception as e:
@@ -65,11 +376,31 @@ def add_drone():
         drone_data = request.get_json()
         new_drone = services.add_drone(
             drone_data)  # Call the function from services.py
-        return jsonify(new_drone.__dict__), 201
+        return jsonify(new_drone.to_dict()), 201
     except Exception as e:
         return jsonify({'error': f'Failed to add drone: {str(e)}'}), 500
 
 
+@api_bp.route("/drones/batch", methods=["PUT"])
+def update_drone_positions():
+    """
+    Update the positions of many drones in one request.
+    """
+    try:
+        updates = request.get_json()
+        if not isinstance(updates, list):
+            return jsonify({'error': 'Request body must be a list of position updates'}), 400
+        results = services.update_drone_positions(updates)
+        updated = sum(1 for result in results if result["updated"])
+        return jsonify({
+            "updated": updated,
+            "failed": len(results) - updated,
+            "results": results
+        }), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to update drones: {str(e)}'}), 500
+
+
 @api_bp.route("/drones/<buno_id>", methods=["PUT"])
 def update_drone(buno_id):
     """
@@ -79,13 +410,34 @@ def update_drone(buno_id):
         drone_data = request.get_json()
         updated_drone = services.update_drone(buno_id, drone_data)  # Call the function from services.py and pass buno_id
         if updated_drone:
-            return jsonify(updated_drone.__dict__), 200
+            return jsonify(updated_drone.to_dict()), 200
         else:
             return jsonify({'error': 'Drone not found'}), 404
+    except ValueError as e:
+        return jsonify({'error': f'Invalid drone data: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': f'Failed to update drone: {str(e)}'}), 500
 
 
+@api_bp.route("/drones/<buno_id>/track", methods=["GET"])
+def get_drone_track(buno_id):
+    """
+    Retrieve a drone's position history, optionally limited with ?from= and ?to=.
+    """
+    try:
+        start = parse_time(request.args.get('from'))
+        end = parse_time(request.args.get('to'))
+    except ValueError:
+        return jsonify({'error': 'from and to must be Unix seconds or ISO-8601 times'}), 400
+    try:
+        track = services.get_drone_track(buno_id, start, end)
+        if track is None:
+            return jsonify({'error': 'Failed to fetch drone track'}), 500
+        return jsonify(track), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch drone track: {str(e)}'}), 500
+
+
 @api_bp.route("/drones/<buno_id>", methods=["DELETE"])
 def delete_drone(buno_id):
     """
@@ -102,26 +454,79 @@ def delete_drone(buno_id):
 
 
 @api_bp.route("/routes", methods=["GET"])
+@conditional('routes')
 def get_routes():
-    routes = services.get_all_routes()
-    return jsonify([route.__dict__ for route in routes])
+    try:
+        limit, after = page_args(3)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid pagination parameters: {str(e)}'}), 400
+    try:
+        fields = field_args('routes')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        if limit is not None:
+            return paged_response(*services.get_routes_page(limit, after, fields))
+        return streamed_list(services.stream_json('routes', fields))
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch routes: {str(e)}'}), 500
+
+
+# Deepest web map zoom level accepted by ?zoom=
+MAX_ZOOM = 22
 
 
 @api_bp.route("/routes/<route_id>", methods=["GET"])
+@conditional('routes')
 def get_route_by_id_handler(route_id):
-    routes = services.get_route_by_id(route_id)
+    try:
+        fields = field_args('routes')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    tolerance_m = request.args.get('tolerance_m')
+    zoom = request.args.get('zoom')
+    try:
+        tolerance_m = float(tolerance_m) if tolerance_m is not None else None
+        zoom = int(zoom) if zoom is not None else None
+        if (tolerance_m is not None and not tolerance_m >= 0) or (zoom is not None and not 0 <= zoom <= MAX_ZOOM):
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': f'tolerance_m must be a non-negative number and zoom an integer from 0 to {MAX_ZOOM}'}), 400
+    if tolerance_m is not None or zoom is not None:
+        routes = services.get_simplified_route(route_id, tolerance_m, zoom)
+        if routes and fields:
+            routes = services.project_models(routes, fields)
+    else:
+        routes = services.get_route_by_id(route_id, fields)
     if routes:
-        return jsonify([route.__dict__ for route in routes])
+        return jsonify([to_dict(route) for route in routes])
     else:
         return jsonify({"error": "Route not found"}), 404
 
 
+@api_bp.route("/routes/<route_id>/metrics", methods=["GET"])
+@conditional('routes')
+def get_route_metrics(route_id):
+    """
+    Retrieve a route's length, per-leg distances, bounding box and centroid.
+    """
+    try:
+        metrics = services.get_route_metrics(route_id)
+        if metrics:
+            return jsonify(metrics), 200
+        else:
+            return jsonify({"error": "Route not found"}), 404
+    except Exception as e:
+        return jsonify({'error': f'Failed to compute route metrics: {str(e)}'}), 500
+
+
 @api_bp.route("/routes/<route_id>/<waypoint_id>", methods=["GET"])
+@conditional('routes')
 def get_route_waypoint(route_id, waypoint_id):
     try:
         waypoint = services.get_route_waypoint(route_id, waypoint_id)
         if waypoint:
-            return jsonify(waypoint.__dict__), 200
+            return jsonify(waypoint.to_dict()), 200
         else:
             return jsonify({'error': 'Waypoint not found'}), 404
     except Exception as e:
@@ -136,7 +541,7 @@ def add_route_waypoint(route_id, waypoint_id):
     try:
         waypoint_data = request.get_json()
         new_waypoint = services.add_route_waypoint(route_id, waypoint_id, waypoint_data)
-        return jsonify(new_waypoint.__dict__), 201
+        return jsonify(new_waypoint.to_dict()), 201
     except Exception as e:
         return jsonify({'error': f'Failed to add waypoint: {str(e)}'}), 500
     
@@ -161,7 +566,7 @@ def update_route_waypoint(route_id, waypoint_id):
         waypoint_data = request.get_json()
         updated_waypoint = services.update_route_waypoint(route_id, waypoint_id, waypoint_data)
         if updated_waypoint:
-            return jsonify(updated_waypoint.__dict__), 200
+            return jsonify(updated_waypoint.to_dict()), 200
         else:
             return jsonify({"error": "Waypoint not found"}), 404
     except Exception as e:
@@ -180,22 +585,43 @@ def delete_route(route_id):
     
     
 @api_bp.route("/flight_plans", methods=["GET"])
+@conditional('flight_plans')
 def get_flight_plans():
     """
-    Retrieve a list of all flight plans.
+    Retrieve a list of all flight plans, or the flight plans listed in ?ids=.
     """
     try:
-        flight_plans = services.get_all_flight_plans()
-        flight_plan_list = [flight_plan.__dict__ for flight_plan in flight_plans]
-        return jsonify(flight_plan_list), 200
+        limit, after = page_args(2)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid pagination parameters: {str(e)}'}), 400
+    try:
+        fields = field_args('flight_plans')
+        ids = id_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        if ids is not None:
+            return multi_get_response(ids, services.get_flight_plans_by_ids(ids, fields), 'Flight_Plan_ID',
+                                      'Flight plan not found')
+        if limit is not None:
+            return paged_response(*services.get_flight_plans_page(limit, after, fields))
+        return streamed_list(services.stream_json('flight_plans', fields))
     except Exception as e:
         return jsonify({'error': f'Failed to fetch flight plans: {str(e)}'}), 500
 
 
 @api_bp.route('/flight_plans/flight_plans_with_routes', methods=['GET'])
+@conditional('flight_plans', 'routes')
 def flight_plans_with_routes():
+    """
+    Retrieve flight plans with their routes. ?layout=flat (default), nested or columnar.
+    """
+    layout = request.args.get('layout', 'flat')
+    if layout not in services.FLIGHT_PLAN_ROUTE_LAYOUTS:
+        return jsonify({'error': f"Invalid layout '{layout}', expected one of: "
+                                 f"{', '.join(services.FLIGHT_PLAN_ROUTE_LAYOUTS)}"}), 400
     try:
-        flight_plans = services.get_flight_plans_with_routes()
+        flight_plans = services.get_flight_plans_with_routes(layout)
         if flight_plans:
             return jsonify(flight_plans), 200
         else:
@@ -205,14 +631,19 @@ def flight_plans_with_routes():
     
     
 @api_bp.route("/flight_plans/<flight_plan_id>", methods=["GET"])
+@conditional('flight_plans')
 def get_flight_plan(flight_plan_id):
     """
     Retrieve a specific flight plan by its ID.
     """
     try:
-        flight_plan = services.get_flight_plan_by_id(flight_plan_id)
+        fields = field_args('flight_plans')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        flight_plan = services.get_flight_plan_by_id(flight_plan_id, fields)
         if flight_plan:
-            return jsonify(flight_plan.__dict__), 200
+            return jsonify(to_dict(flight_plan)), 200
         else:
             return jsonify({'error': 'Flight plan not found'}), 404
     except Exception as e:
@@ -227,7 +658,7 @@ def add_flight_plan():
     try:
         flight_plan_data = request.get_json()
         new_flight_plan = services.add_flight_plan(flight_plan_data)
-        return jsonify(new_flight_plan.__dict__), 201
+        return jsonify(new_flight_plan.to_dict()), 201
     except Exception as e:
         return jsonify({'error': f'Failed to add flight plan: {str(e)}'}), 500
 
@@ -241,7 +672,7 @@ def update_flight_plan(flight_plan_id):
         flight_plan_data = request.get_json()
         updated_flight_plan = services.update_flight_plan(flight_plan_id, flight_plan_data)
         if updated_flight_plan:
-            return jsonify(updated_flight_plan.__dict__), 200
+            return jsonify(updated_flight_plan.to_dict()), 200
         else:
             return jsonify({'error': 'Flight plan not found'}), 404
     except Exception as e:
@@ -263,27 +694,44 @@ def delete_flight_plan(flight_plan_id):
         return jsonify({'error': f'Failed to delete flight plan: {str(e)}'}), 500
     
 @api_bp.route("/pilots", methods=["GET"])
+@conditional('pilots')
 def get_pilots():
     """
-    Retrieve a list of all pilots.
+    Retrieve a list of all pilots, or the pilots listed in ?ids=.
     """
     try:
-        pilots = services.get_all_pilots()
-        pilot_list = [pilot.__dict__ for pilot in pilots]
-        return jsonify(pilot_list), 200
+        limit, after = page_args(2)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid pagination parameters: {str(e)}'}), 400
+    try:
+        fields = field_args('pilots')
+        ids = id_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        if ids is not None:
+            return multi_get_response(ids, services.get_pilots_by_ids(ids, fields), 'Pilot_ID', 'Pilot not found')
+        if limit is not None:
+            return paged_response(*services.get_pilots_page(limit, after, fields))
+        return streamed_list(services.stream_json('pilots', fields))
     except Exception as e:
         return jsonify({'error': f'Failed to fetch pilots: {str(e)}'}), 500
 
 
 @api_bp.route("/pilots/<pilot_id>", methods=["GET"])
+@conditional('pilots')
 def get_pilot(pilot_id):
     """
     Retrieve a specific pilot by their ID.
     """
     try:
-        pilot = services.get_pilot_by_id(pilot_id)
+        fields = field_args('pilots')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        pilot = services.get_pilot_by_id(pilot_id, fields)
         if pilot:
-            return jsonify(pilot.__dict__), 200
+            return jsonify(to_dict(pilot)), 200
         else:
             return jsonify({'error': 'Pilot not found'}), 404
     except Exception as e:
@@ -298,7 +746,7 @@ def add_pilot():
     try:
         pilot_data = request.get_json()
         new_pilot = services.add_pilot(pilot_data)
-        return jsonify(new_pilot.__dict__), 201
+        return jsonify(new_pilot.to_dict()), 201
     except Exception as e:
         return jsonify({'error': f'Failed to add pilot: {str(e)}'}), 500
 
@@ -312,7 +760,7 @@ def update_pilot(pilot_id):
         pilot_data = request.get_json()
         updated_pilot = services.update_pilot(pilot_id, pilot_data)
         if updated_pilot:
-            return jsonify(updated_pilot.__dict__), 200
+            return jsonify(updated_pilot.to_dict()), 200
         else:
             return jsonify({'error': 'Pilot not found'}), 404
     except Exception as e:
@@ -335,6 +783,7 @@ def delete_pilot(pilot_id):
     
     
 @api_bp.route("/drones/<buno_id>/pilot_info", methods=["GET"])
+@conditional('drones', 'flight_plans', 'pilots')
 def get_drone_pilot_info_api(buno_id):
     """
     API endpoint to retrieve drone and pilot information for the given BUNO_ID.
@@ -356,6 +805,7 @@ def get_drone_pilot_info_api(buno_id):
     
     
 @api_bp.route("/pilots/hours", methods=["GET"])
+@conditional('pilots')
 def get_pilots_with_hour_range_api():
     """
     API endpoint to retrieve pilots with pilot hours within the specified range.
@@ -366,10 +816,30 @@ def get_pilots_with_hour_range_api():
 
         pilots = services.get_pilots_with_hour_range(min_hours, max_hours)
         if pilots:
-            pilot_list = [pilot.__dict__ for pilot in pilots]
+            pilot_list = [pilot.to_dict() for pilot in pilots]
             return jsonify(pilot_list), 200
         else:
             return jsonify({"error": "No pilots found with the specified criteria"}), 404
 
     except Exception as e:
         return jsonify({'error': f'Failed to retrieve pilots: {str(e)}'}), 500
+
+
+@api_bp.route("/dispatch/distances", methods=["GET"])
+@conditional('drones', 'routes')
+def get_dispatch_distances():
+    """
+    Retrieve the distance matrix from drones to route start waypoints.
+    Narrow it with ?buno_id=, ?route_id= (comma-separated) and ?status=.
+    """
+    buno_ids = list(dict.fromkeys(filter(None, request.args.get('buno_id', '').split(',')))) or None
+    route_ids = list(dict.fromkeys(filter(None, request.args.get('route_id', '').split(',')))) or None
+    try:
+        matrix = services.get_distance_matrix(buno_ids, route_ids, request.args.get('status'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to compute distances: {str(e)}'}), 500
+    if matrix is None:
+        return jsonify({'error': 'Failed to compute distances'}), 500
+    return Response(dumps(matrix), 200, mimetype='application/json')
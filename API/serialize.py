@@ -0,0 +1,110 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard library encoder is used without it
+    orjson = None
+
+
+def dumps(obj):
+    """
+    Encodes a JSON response body that may hold numpy arrays.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_tolist).encode()
+
+
+def _tolist(obj):
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class RowEncoder:
+    """
+    Encodes batches of row tuples as the comma-separated objects of a JSON array.
+
+    Rows go from the cursor to JSON without Row, model or per-row dictionary
+    objects surviving the batch: each batch is zipped with the column names
+    and handed to the C encoder in a single call.
+    """
+
+    def __init__(self, columns, bool_columns=()):
+        """
+        Args:
+            columns (list of str): Column names, in row order.
+            bool_columns (iterable of str, optional): Columns stored as 0/1 that
+                                                      are encoded as true/false.
+        """
+        self.columns = tuple(columns)
+        bool_columns = set(bool_columns)
+        self._bool_indexes = [i for i, column in enumerate(self.columns) if column in bool_columns]
+
+    def _objects(self, rows):
+        columns = self.columns
+        if not self._bool_indexes:
+            return [dict(zip(columns, row)) for row in rows]
+        objects = []
+        for row in rows:
+            obj = dict(zip(columns, row))
+            for i in self._bool_indexes:
+                value = row[i]
+                if value is not None:
+                    obj[columns[i]] = bool(value)
+            objects.append(obj)
+        return objects
+
+    def encode(self, rows):
+        """
+        Args:
+            rows (list of tuple): One batch of rows.
+
+        Returns:
+            bytes: The rows as JSON objects joined by commas, without the
+                   surrounding brackets. Empty if there are no rows.
+        """
+        if not rows:
+            return b""
+        objects = self._objects(rows)
+        if orjson is not None:
+            return orjson.dumps(objects)[1:-1]
+        return json.dumps(objects, separators=(",", ":"), ensure_ascii=False).encode()[1:-1]
+
+
+class ArrayStream:
+    """
+    An iterable JSON array built from batches of row tuples.
+
+    Iterating it yields bytes: the opening bracket, one chunk per non-empty
+    batch, and the closing bracket. close() releases whatever produces the
+    batches, whether or not the array was iterated to the end.
+    """
+
+    def __init__(self, batches, encoder, close=None):
+        """
+        Args:
+            batches (iterable of list): Row batches, e.g. from RowStream.batches().
+            encoder (RowEncoder): Encoder for the rows' columns.
+            close (callable, optional): Called by close().
+        """
+        self._batches = batches
+        self._encoder = encoder
+        self._close = close
+
+    def __iter__(self):
+        yield b"["
+        separator = b""
+        for rows in self._batches:
+            chunk = self._encoder.encode(rows)
+            if chunk:
+                yield separator + chunk
+                separator = b","
+        yield b"]\n"
+
+    def close(self):
+        if self._close is not None:
+            self._close()
@@ -1,25 +1,91 @@
+import dataclasses
+import operator
 import sqlite3
 from typing import List
 from API.model import Drone, FlightPlan, Route, Pilot  # Only import necessary models
-from pathlib import Path
+from API.database import pool
+from API import telemetry
+from API.live_state import fleet, position_errors
+from API import stream
+from API import geo
+from API import versions
+from API.cache import query_cache
+from API.serialize import ArrayStream, RowEncoder
 
 
-def get_db_connection():
+def check_connection():
     """
-    Establishes a connection to the SQLite database.
+    Checks that a pooled connection can reach the SQLite database.
 
     Returns:
-        sqlite3.Connection: A connection object.
+        bool: True if the database answered.
     """
-    DATABASE_PATH = Path(__file__).parents[1] / "data"
-    connection = sqlite3.connect(DATABASE_PATH / 'drone_data.db')
-    connection.row_factory = sqlite3.Row
-    return connection
+    with pool.connection() as conn:
+        return conn.execute("SELECT 1").fetchone()[0] == 1
+
+
+def get_pool_stats():
+    """
+    Returns the connection pool counters.
+
+    Returns:
+        dict: Pool statistics.
+    """
+    return pool.stats()
+
+
+def get_table_versions(tables: list) -> list:
+    """
+    Returns the change counters of the given tables, for building ETags.
+
+    Args:
+        tables (list of str): Table names, e.g. ["flight_plans", "routes"].
+
+    Returns:
+        list of str: One version per table, in the order given.
+    """
+    return versions.current(tables)
+
+
+def get_cache_stats():
+    """
+    Returns the query cache counters.
+
+    Returns:
+        dict: Hits, misses, evictions, expirations, invalidations, stale entries and size.
+    """
+    return query_cache.stats()
+
+
+def get_fleet_state_stats():
+    """
+    Returns the live fleet state counters.
+
+    Returns:
+        dict: Cache size, pending writes and flush statistics.
+    """
+    return fleet.stats()
+
+
+def reload_fleet_state():
+    """
+    Re-reads the drones table into the live fleet state, for changes made
+    to it outside the API, and empties the query cache.
+
+    Returns:
+        dict: Counts of added, updated and deleted drones, or None on a database error.
+    """
+    query_cache.clear()
+    try:
+        return fleet.reload()
+    except sqlite3.Error as e:
+        print(f"Error reloading the fleet state from the database: {e}")
+        return None
 
 
 def run_query(query, params=None):
     """
-    Runs a query on the database.
+    Runs a query on the database using a pooled connection.
 
     Args:
         query (str): The SQL query.
@@ -29,46 +95,179 @@ def run_query(query, params=None):
         list of dict: Query results for SELECT queries.
         sqlite3.Cursor: Cursor object for non-SELECT queries.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        if params is not None:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        
+    with pool.connection() as conn:
+        cursor = conn.execute(query, params if params is not None else ())
+
         if query.strip().upper().startswith("SELECT"):
             results = cursor.fetchall()
             return results
         else:
             conn.commit()
             return cursor
-    finally:
-        conn.close()
+
+
+TABLE_MODELS = {"drones": Drone, "routes": Route, "flight_plans": FlightPlan, "pilots": Pilot}
+
+# Columns stored as 0/1 that the converters hand out as booleans
+BOOLEAN_FIELDS = {"Pilot_Current"}
+
+# Rows read from SQLite and encoded to JSON at a time by stream_json()
+STREAM_BATCH_SIZE = 500
+
+# Keys bound per IN (...) list by run_in_query(); SQLite before 3.32 allows at most 999 parameters
+IN_QUERY_CHUNK_SIZE = 500
+
+
+def parse_fields(table: str, fields: str) -> list:
+    """
+    Validates a comma-separated ?fields= value against the table's model.
+
+    Args:
+        table (str): One of the keys of TABLE_MODELS.
+        fields (str): The requested field names, e.g. "BUNO_ID,Latitude".
+
+    Returns:
+        list of str: The requested fields in order without duplicates,
+                     or None if no fields were requested.
+
+    Raises:
+        ValueError: If a field is not a column of the model.
+    """
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    allowed = [field.name for field in dataclasses.fields(TABLE_MODELS[table])]
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Valid fields: {', '.join(allowed)}")
+    return requested or None
+
+
+def convert_rows_to_dicts(rows, fields):
+    """
+    Converts database rows to dictionaries holding only the given fields.
+
+    Args:
+        rows (list): Database rows.
+        fields (list of str): Fields to keep.
+
+    Returns:
+        list of dict: One dictionary per row.
+    """
+    if rows is None:
+        return []
+    converters = [(field, bool if field in BOOLEAN_FIELDS else None) for field in fields]
+    return [{field: convert(row[field]) if convert and row[field] is not None else row[field]
+             for field, convert in converters}
+            for row in rows]
+
+
+def select_columns(fields):
+    """
+    Returns the SELECT list for a set of validated fields.
+    """
+    return ", ".join(fields) if fields else "*"
+
+
+def stream_json(table: str, fields: list = None):
+    """
+    Streams a whole table as a JSON array without loading it into memory.
+
+    Drones come from the live fleet state; the other tables are read from
+    SQLite as plain tuples, in batches over one pooled connection, and
+    encoded straight to JSON.
+
+    Args:
+        table (str): One of the keys of TABLE_MODELS.
+        fields (list of str, optional): Only read these columns. Defaults to every model field.
+
+    Returns:
+        ArrayStream: Iterable of bytes. Close it if it is abandoned before the end.
+    """
+    columns = fields or [field.name for field in dataclasses.fields(TABLE_MODELS[table])]
+    encoder = RowEncoder(columns, BOOLEAN_FIELDS)
+    if table == "drones":
+        drones = fleet.all()
+        values = operator.attrgetter(*columns)
+        if len(columns) == 1:
+            rows = [(values(drone),) for drone in drones]
+        else:
+            rows = [values(drone) for drone in drones]
+        return ArrayStream((rows[i:i + STREAM_BATCH_SIZE] for i in range(0, len(rows), STREAM_BATCH_SIZE)),
+                           encoder)
+    rows = pool.stream(f"SELECT {select_columns(columns)} FROM {table}", batch_size=STREAM_BATCH_SIZE, raw=True)
+    return ArrayStream(rows.batches(), encoder, rows.close)
+
+
+def run_page_query(table, key_columns, limit, after=None, fields=None):
+    """
+    Reads one page of a table in key order.
+
+    Seeks past the last key of the previous page instead of using OFFSET,
+    so every page costs the same no matter how deep it is. The rowid is
+    appended to the key so rows that share a key are neither skipped nor
+    repeated.
+
+    Args:
+        table (str): The table to read.
+        key_columns (list of str): The key columns, in sort order.
+        limit (int): Maximum rows to return.
+        after (list, optional): Cursor returned with the previous page.
+        fields (list of str, optional): Columns to read besides the key. Defaults to all.
+
+    Returns:
+        tuple: (list of sqlite3.Row, cursor for the next page or None).
+    """
+    columns = ", ".join(key_columns + ["rowid"])
+    selected = select_columns(list(dict.fromkeys(key_columns + fields)) if fields else None)
+    query = f"SELECT rowid AS _rowid, {selected} FROM {table}"
+    params = []
+    if after is not None:
+        query += f" WHERE ({columns}) > ({', '.join('?' for _ in after)})"
+        params.extend(after)
+    query += f" ORDER BY {columns} LIMIT ?"
+    params.append(limit + 1)
+    rows = run_query(query, tuple(params))
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], [last[column] for column in key_columns] + [last["_rowid"]]
+
+
+def run_in_query(table, key_column, keys, fields=None):
+    """
+    Reads the rows of a table whose key is one of keys.
+
+    The keys are looked up IN_QUERY_CHUNK_SIZE at a time with IN (...)
+    queries over one pooled connection, instead of one query per key.
+
+    Args:
+        table (str): The table to read.
+        key_column (str): The column the keys are matched against.
+        keys (list): The keys. Duplicates are looked up once.
+        fields (list of str, optional): Columns to read besides the key. Defaults to all.
+
+    Returns:
+        dict: The first row, in rowid order, for each key found, by key.
+    """
+    keys = list(dict.fromkeys(keys))
+    selected = select_columns(list(dict.fromkeys([key_column] + fields)) if fields else None)
+    found = {}
+    with pool.connection() as conn:
+        for i in range(0, len(keys), IN_QUERY_CHUNK_SIZE):
+            chunk = keys[i:i + IN_QUERY_CHUNK_SIZE]
+            rows = conn.execute(
+                f"SELECT {selected} FROM {table} WHERE {key_column} IN ({', '.join('?' * len(chunk))}) ORDER BY rowid",
+                chunk).fetchall()
+            for row in rows:
+                found.setdefault(row[key_column], row)
+    return found
 
 
 # ---------------------------------------------------------
 # Drones
 # ---------------------------------------------------------
 
-def run_query(query, params=None):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        if params is not None:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        
-        if query.strip().upper().startswith("SELECT"):
-            results = cursor.fetchall()
-            return results
-        else:
-            conn.commit()
-            return cursor
-    finally:
-        conn.close()
-
 def convert_rows_to_drone_list(drones):
     all_drones = []
     if drones is None:
@@ -88,32 +287,77 @@ def convert_rows_to_drone_list(drones):
     return all_drones
 
 
-def get_all_drones() -> List[Drone]:
+def project_models(items, fields):
+    """
+    Reduces model objects to dictionaries holding only the given fields.
+    """
+    return [{field: getattr(item, field) for field in fields} for item in items]
+
+
+def get_all_drones(fields: list = None) -> List[Drone]:
     """
     Retrieves all drones.
 
+    Args:
+        fields (list of str, optional): Only return these fields, as dictionaries.
+
     Returns:
         List[Drone]: Drone objects.
     """
-    query = "SELECT * FROM drones"
-    drones = run_query(query)  # Use run_query()
-    return convert_rows_to_drone_list(drones)
+    drones = fleet.all()  # Served from the live fleet state
+    return project_models(drones, fields) if fields else drones
+
+
+def get_drones_page(limit: int, after: list = None, fields: list = None):
+    """
+    Retrieves one page of drones in BUNO_ID order.
+
+    Args:
+        limit (int): Page size.
+        after (list, optional): Cursor returned with the previous page.
+        fields (list of str, optional): Only return these fields, as dictionaries.
+
+    Returns:
+        tuple: (List[Drone], cursor for the next page or None).
+    """
+    drones = fleet.page(after[0] if after else None, limit + 1)
+    next_after = [drones[limit - 1].BUNO_ID] if len(drones) > limit else None
+    drones = drones[:limit]
+    return (project_models(drones, fields) if fields else drones), next_after
 
 
-def get_drone_by_id(buno_id: int) -> Drone:
+def get_drone_by_id(buno_id: int, fields: list = None) -> Drone:
     """
     Retrieves a drone by its BUNO_ID.
 
     Args:
         buno_id (int): The BUNO_ID of the drone.
+        fields (list of str, optional): Only return these fields, as a dictionary.
 
     Returns:
         Drone: The drone object.
     """
-    query = "SELECT * FROM drones WHERE BUNO_ID = ?"
-    drones = run_query(query, (buno_id, ))
-    drone_list = convert_rows_to_drone_list(drones)
-    return drone_list[0] if drone_list else None
+    drone = fleet.get(buno_id)  # Served from the live fleet state
+    if drone is not None and fields:
+        return project_models([drone], fields)[0]
+    return drone
+
+
+def get_drones_by_ids(buno_ids: list, fields: list = None) -> list:
+    """
+    Retrieves several drones by their BUNO_IDs.
+
+    Args:
+        buno_ids (list of str): The BUNO_IDs, in the order to return the drones in.
+        fields (list of str, optional): Only return these fields, as dictionaries.
+
+    Returns:
+        list: A Drone (or dictionary) for each BUNO_ID; None where the drone does not exist.
+    """
+    drones = fleet.get_many(buno_ids)  # Served from the live fleet state
+    if fields:
+        return [project_models([drone], fields)[0] if drone is not None else None for drone in drones]
+    return drones
 
 
 def get_drones_by_status(status: str) -> List[Drone]:
@@ -126,9 +370,7 @@ def get_drones_by_status(status: str) -> List[Drone]:
     Returns:
         List[Drone]: Drone objects.
     """
-    query = "SELECT * FROM drones WHERE Status = ?"
-    drones = run_query(query, (status, ))
-    return convert_rows_to_drone_list(drones)
+    return fleet.matching(lambda drone: drone.Status == status)  # Served from the live fleet state
 
 
 def get_drones_by_manufacturer(manufacturer: str) -> List[Drone]:
@@ -141,9 +383,7 @@ def get_drones_by_manufacturer(manufacturer: str) -> List[Drone]:
     Returns:
         List[Drone]: Drone objects.
     """
-    query = "SELECT * FROM drones WHERE Manufacturer = ?"
-    drones = run_query(query, (manufacturer, ))
-    return convert_rows_to_drone_list(drones)
+    return fleet.matching(lambda drone: drone.Manufacturer == manufacturer)  # Served from the live fleet state
 
 
 def get_drones_purchased_after(date: str) -> List[Drone]:
@@ -156,9 +396,8 @@ def get_drones_purchased_after(date: str) -> List[Drone]:
     Returns:
         List[Drone]: Drone objects.
     """
-    query = "SELECT * FROM drones WHERE Purchase_Date > ?"
-    drones = run_query(query, (date, ))
-    return convert_rows_to_drone_list(drones)
+    # Served from the live fleet state; like the SQL comparison, a missing date matches nothing
+    return fleet.matching(lambda drone: drone.Purchase_Date is not None and drone.Purchase_Date > date)
 
 
 def add_drone(drone_data):
@@ -172,19 +411,16 @@ def add_drone(drone_data):
         Drone: The newly added Drone object.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Assuming your 'drones' table has columns: DRONE_ID, Drone_Model, Manufacturer, Purchase_Date, Serial, Status, Status_Code, Altitude, Latitude, Longitude
-        cursor.execute(
-            "INSERT INTO drones (BUNO_ID, Drone_Model, Manufacturer, Purchase_Date, Serial, Status, Status_Code, Altitude, Latitude, Longitude) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (drone_data['BUNO_ID'], drone_data['Drone_Model'],
-             drone_data['Manufacturer'], drone_data['Purchase_Date'],
-             drone_data['Serial'], drone_data['Status'],
-             drone_data['Status_Code'], drone_data['Altitude'],
-             drone_data['Latitude'], drone_data['Longitude']))
-        conn.commit()
-        conn.close()
+        with pool.transaction() as conn:
+            # Assuming your 'drones' table has columns: DRONE_ID, Drone_Model, Manufacturer, Purchase_Date, Serial, Status, Status_Code, Altitude, Latitude, Longitude
+            conn.execute(
+                "INSERT INTO drones (BUNO_ID, Drone_Model, Manufacturer, Purchase_Date, Serial, Status, Status_Code, Altitude, Latitude, Longitude) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (drone_data['BUNO_ID'], drone_data['Drone_Model'],
+                 drone_data['Manufacturer'], drone_data['Purchase_Date'],
+                 drone_data['Serial'], drone_data['Status'],
+                 drone_data['Status_Code'], drone_data['Altitude'],
+                 drone_data['Latitude'], drone_data['Longitude']))
+            telemetry.record_positions(conn, [drone_data])
 
         new_drone = Drone(BUNO_ID=drone_data['BUNO_ID'],
                           Drone_Model=drone_data['Drone_Model'],
@@ -196,54 +432,181 @@ def add_drone(drone_data):
                           Altitude=drone_data['Altitude'],
                           Latitude=drone_data['Latitude'],
                           Longitude=drone_data['Longitude'])
+        fleet.put(new_drone)
         return new_drone
 
     except sqlite3.Error as e:
         print(f"Error adding drone to the database: {e}")
         return None
+
+
 def update_drone(drone_id: int, drone_data: dict) -> Drone:
     """
-    Updates an existing drone in the database.
+    Updates an existing drone.
+
+    The change is applied to the live fleet state at once and written to the
+    database by its background flush.
 
     Args:
         buno_id (int): The BUNO_ID of the drone to update.
         drone_data (dict): A dictionary containing the updated drone data.
 
     Returns:
-        Drone: The updated Drone object.
+        Drone: The updated Drone object, or None if the drone does not exist.
+
+    Raises:
+        ValueError: If a field has an unusable value; the drone is left unchanged.
+    """
+    return fleet.update(drone_id, drone_data)
+
+
+POSITION_FIELDS = ("Altitude", "Latitude", "Longitude")
+
+
+def update_drone_positions(updates: list) -> list:
+    """
+    Applies many drone position updates at once.
+
+    Each update must carry a string BUNO_ID and numeric Altitude, Latitude
+    and Longitude, with the latitude and longitude in range. Valid updates
+    for drones that exist are applied to the live fleet state, whose next
+    flush writes them with one executemany in a single transaction; the rest
+    are reported back and do not stop the others.
+
+    Args:
+        updates (list of dict): Position updates.
+
+    Returns:
+        list of dict: One result per update, in request order, with the
+                      BUNO_ID and either "updated": True or an "error".
+    """
+    results = []
+    valid = []
+    for update in updates:
+        if not isinstance(update, dict) or not update.get("BUNO_ID"):
+            results.append({"BUNO_ID": None, "updated": False, "error": "Missing BUNO_ID"})
+            continue
+        if not isinstance(update["BUNO_ID"], str):
+            results.append({"BUNO_ID": None, "updated": False, "error": "BUNO_ID must be a string"})
+            continue
+        missing = [field for field in POSITION_FIELDS if update.get(field) is None]
+        if missing:
+            results.append({"BUNO_ID": update["BUNO_ID"], "updated": False,
+                            "error": f"Missing fields: {', '.join(missing)}"})
+            continue
+        errors = position_errors(update)
+        if errors:
+            results.append({"BUNO_ID": update["BUNO_ID"], "updated": False, "error": "; ".join(errors)})
+            continue
+        results.append({"BUNO_ID": update["BUNO_ID"], "updated": True})
+        valid.append(update)
+
+    applied = iter(fleet.update_many(
+        [(update["BUNO_ID"], {field: update[field] for field in POSITION_FIELDS}) for update in valid]))
+    for result in results:
+        if result["updated"] and next(applied) is None:
+            result.update(updated=False, error="Drone not found")
+    return results
+
+
+def get_drone_track(buno_id: str, start: float = None, end: float = None) -> list:
+    """
+    Retrieves the recorded position history of a drone.
+
+    Args:
+        buno_id (str): The BUNO_ID of the drone.
+        start (float, optional): Unix time to start from. Defaults to None.
+        end (float, optional): Unix time to stop at. Defaults to None.
+
+    Returns:
+        list of dict: Timestamped positions, oldest first.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "UPDATE drones SET Drone_Model = ?, Manufacturer = ?, Purchase_Date = ?, Serial = ?, Status = ?, Status_Code = ?, Altitude = ?, Latitude = ?, Longitude = ? WHERE BUNO_ID = ?",
-            (drone_data['Drone_Model'], drone_data['Manufacturer'], drone_data['Purchase_Date'], drone_data['Serial'], drone_data['Status'], drone_data['Status_Code'], drone_data['Altitude'], drone_data['Latitude'], drone_data['Longitude'], drone_id)
-        )
-        conn.commit()
-        conn.close()
-
-        updated_drone = Drone(BUNO_ID=drone_data['BUNO_ID'],
-                              Drone_Model=drone_data['Drone_Model'],
-                              Manufacturer=drone_data['Manufacturer'],
-                              Purchase_Date=drone_data['Purchase_Date'],
-                              Serial=drone_data['Serial'],
-                              Status=drone_data['Status'],
-                              Altitude=drone_data['Altitude'],
-                              Status_Code=drone_data['Status_Code'],
-                              Latitude=drone_data['Latitude'],
-                              Longitude=drone_data['Longitude'])
-        return updated_drone
+        return telemetry.get_track(buno_id, start, end)
+    except sqlite3.Error as e:
+        print(f"Error retrieving drone track from the database: {e}")
+        return None
 
+
+def get_drones_in_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Drone]:
+    """
+    Retrieves the drones inside a latitude/longitude box.
+
+    Answered from the live fleet state's in-memory index, so positions are
+    current to the last update.
+
+    Args:
+        min_lat (float): Southern edge in degrees.
+        min_lon (float): Western edge in degrees.
+        max_lat (float): Northern edge in degrees.
+        max_lon (float): Eastern edge in degrees.
+
+    Returns:
+        List[Drone]: Drone objects, ordered by BUNO_ID.
+    """
+    try:
+        return fleet.within_bbox(min_lat, min_lon, max_lat, max_lon)
     except sqlite3.Error as e:
-        print(f"Error updating drone in the database: {e}")
+        print(f"Error retrieving drones in bounding box from the database: {e}")
         return None
 
+
+def get_drones_in_radius(lat: float, lon: float, radius_m: float) -> List[Drone]:
+    """
+    Retrieves the drones within radius_m metres of a point, nearest first.
+
+    Answered from the live fleet state's in-memory index, so positions are
+    current to the last update.
+
+    Args:
+        lat (float): Latitude of the centre in degrees.
+        lon (float): Longitude of the centre in degrees.
+        radius_m (float): Search radius in metres.
+
+    Returns:
+        List[Drone]: Drone objects.
+    """
+    try:
+        return fleet.within_radius(lat, lon, radius_m)
     except sqlite3.Error as e:
-        print(f"Error updating drone in the database: {e}")
+        print(f"Error retrieving drones in radius from the database: {e}")
         return None
 
 
+def get_nearest_drones(lat: float, lon: float, k: int = 5, status: str = None) -> list:
+    """
+    Retrieves the k drones closest to a point by great-circle distance.
+
+    Answered from the live fleet state's in-memory index, so positions are
+    current to the last update.
+
+    Args:
+        lat (float): Latitude of the point in degrees.
+        lon (float): Longitude of the point in degrees.
+        k (int, optional): Number of drones to return. Defaults to 5.
+        status (str, optional): Only consider drones with this Status. Defaults to None.
+
+    Returns:
+        list of tuple: (distance in metres, Drone) pairs, nearest first.
+    """
+    return fleet.nearest(lat, lon, k, status)
+
+
+def stream_drone_changes(buno_ids=None, statuses=None, last_event_id=None):
+    """
+    Streams drone changes as Server-Sent Events.
+
+    Args:
+        buno_ids (set, optional): Only stream these drones.
+        statuses (set, optional): Only stream drones with one of these statuses.
+        last_event_id (int, optional): Resume after this event id.
+
+    Returns:
+        generator: SSE messages.
+    """
+    return stream.subscribe(stream.feed, fleet.all, buno_ids, statuses, last_event_id)
+
+
 def delete_drone(buno_id):
     """
     Deletes a drone from the database.
@@ -255,20 +618,13 @@ def delete_drone(buno_id):
         bool: True if the drone was deleted successfully, False otherwise.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Execute the DELETE query
-        cursor.execute("DELETE FROM drones WHERE BUNO_ID = ?", (buno_id, ))
+        with pool.transaction() as conn:
+            # Execute the DELETE query
+            cursor = conn.execute("DELETE FROM drones WHERE BUNO_ID = ?", (buno_id, ))
+        fleet.remove(buno_id)
 
         # Check if any rows were affected (i.e., if the drone existed)
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return True
-        else:
-            conn.close()
-            return False
+        return cursor.rowcount > 0
 
     except sqlite3.Error as e:
         print(f"Error deleting drone from the database: {e}")
@@ -279,6 +635,9 @@ def get_drone_pilot_info(BUNO_ID: str):
     """
     Retrieves drone and pilot information for the given BUNO_ID.
 
+    The drone part comes from the live fleet state, the pilot part from the
+    cached flight plan/pilot join.
+
     Args:
         BUNO_ID (str): The BUNO_ID of the drone.
 
@@ -286,42 +645,57 @@ def get_drone_pilot_info(BUNO_ID: str):
         tuple: A tuple containing the drone and pilot information as dictionaries, 
                 or None if no data is found.
     """
+    drone = fleet.get(BUNO_ID)
+    if drone is None:
+        return None
+    pilot_info = get_pilot_for_drone(BUNO_ID)
+    if pilot_info is None:
+        return None
+    drone_info = {
+        "BUNO_ID": drone.BUNO_ID,
+        "Drone_Model": drone.Drone_Model,
+        "Manufacturer": drone.Manufacturer,
+        "Purchase_Date": drone.Purchase_Date,
+        "Serial": drone.Serial,
+        "Status": drone.Status,
+        "Status_Code": drone.Status_Code
+    }
+    return drone_info, pilot_info
+
+
+@query_cache.cached("flight_plans", row_tags=lambda args, pilot: [("pilots", pilot["Pilot_ID"])])
+def get_pilot_for_drone(BUNO_ID: str) -> dict:
+    """
+    Retrieves the pilot assigned to a drone through its flight plan.
+
+    Args:
+        BUNO_ID (str): The BUNO_ID of the drone.
+
+    Returns:
+        dict: Pilot_ID, Pilot_Current and Pilot_Hours, or None if the drone
+              has no flight plan or an error occurs.
+    """
     query = """
-    SELECT d.BUNO_ID, d.Drone_Model, d.Manufacturer, d.Purchase_Date, d.Serial, d.Status, d.Status_Code,
-            p.Pilot_ID, p.Pilot_Current, p.Pilot_Hours
-    FROM drones d
-    INNER JOIN flight_plans fp ON d.BUNO_ID = fp.BUNO_ID
+    SELECT p.Pilot_ID, p.Pilot_Current, p.Pilot_Hours
+    FROM flight_plans fp
     INNER JOIN pilots p ON fp.Pilot_ID = p.Pilot_ID
-    WHERE d.BUNO_ID = ?
+    WHERE fp.BUNO_ID = ?
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(query, (BUNO_ID,))
-        row = cursor.fetchone()
-        conn.close()
+        with pool.connection() as conn:
+            row = conn.execute(query, (BUNO_ID,)).fetchone()
 
         if row:
-            drone_info = {
-                "BUNO_ID": row["BUNO_ID"],
-                "Drone_Model": row["Drone_Model"],
-                "Manufacturer": row["Manufacturer"],
-                "Purchase_Date": row["Purchase_Date"],
-                "Serial": row["Serial"],
-                "Status": row["Status"],
-                "Status_Code": row["Status_Code"]
-            }
-            pilot_info = {
+            return {
                 "Pilot_ID": row["Pilot_ID"],
                 "Pilot_Current": bool(row["Pilot_Current"]),
                 "Pilot_Hours": row["Pilot_Hours"]
             }
-            return drone_info, pilot_info
         else:
             return None
 
     except sqlite3.Error as e:
-        print(f"Error retrieving drone and pilot info from the database: {e}")
+        print(f"Error retrieving pilot info from the database: {e}")
         return None
 
 # ---------------------------------------------------------
@@ -350,31 +724,51 @@ def convert_rows_to_route_list(routes):
     return all_routes
 
 
-def get_all_routes() -> List[Route]:
+def get_all_routes(fields: list = None) -> List[Route]:
     """
     Retrieves all routes.
 
+    Args:
+        fields (list of str, optional): Only read these columns, returned as dictionaries.
+
     Returns:
         List[Route]: Route objects.
     """
-    query = "SELECT * FROM routes"
+    query = f"SELECT {select_columns(fields)} FROM routes"
     routes = run_query(query)
-    return convert_rows_to_route_list(routes)
+    return convert_rows_to_dicts(routes, fields) if fields else convert_rows_to_route_list(routes)
+
+
+def get_routes_page(limit: int, after: list = None, fields: list = None):
+    """
+    Retrieves one page of route waypoints in (Route_ID, Waypoint_ID) order.
+
+    Args:
+        limit (int): Page size.
+        after (list, optional): Cursor returned with the previous page.
+        fields (list of str, optional): Only read these columns, returned as dictionaries.
+
+    Returns:
+        tuple: (List[Route], cursor for the next page or None).
+    """
+    routes, next_after = run_page_query("routes", ["Route_ID", "Waypoint_ID"], limit, after, fields)
+    return (convert_rows_to_dicts(routes, fields) if fields else convert_rows_to_route_list(routes)), next_after
 
 
-def get_route_by_id(route_id: str) -> List[Route]:
+def get_route_by_id(route_id: str, fields: list = None) -> List[Route]:
     """
     Retrieves a route by its Route_ID.
 
     Args:
         route_id (str): The Route_ID of the route.
+        fields (list of str, optional): Only read these columns, returned as dictionaries.
 
     Returns:
         List[Route]: The list of route objects with the given Route_ID.
     """
-    query = "SELECT * FROM routes WHERE Route_ID = ?"
+    query = f"SELECT {select_columns(fields)} FROM routes WHERE Route_ID = ?"
     routes = run_query(query, (route_id,))
-    route_list = convert_rows_to_route_list(routes)
+    route_list = convert_rows_to_dicts(routes, fields) if fields else convert_rows_to_route_list(routes)
     return route_list if route_list else None
 
 
@@ -395,6 +789,87 @@ def get_route_waypoint(route_id: str, waypoint_id: str) -> Route:
     return route_list[0] if route_list else None
 
 
+# A route's positioned waypoints in flying order
+ROUTE_PATH_QUERY = """
+SELECT Route_ID, Latitude, Longitude, Waypoint_ID FROM routes
+WHERE Route_ID = ? AND Latitude IS NOT NULL AND Longitude IS NOT NULL
+ORDER BY CAST(Waypoint_ID AS INTEGER), rowid
+"""
+
+
+@query_cache.cached(row_tags=lambda args, result: {("routes", args[0])})
+def get_simplified_route(route_id: str, tolerance_m: float = None, zoom: int = None) -> List[Route]:
+    """
+    Retrieves a route's waypoints simplified with Douglas-Peucker, for drawing
+    it at a given scale.
+
+    Each level of detail is cached per route until one of the route's
+    waypoints is added, updated or deleted, or the route is deleted.
+
+    Args:
+        route_id (str): The Route_ID of the route.
+        tolerance_m (float, optional): Drop waypoints that lie closer than this
+                                       many metres to the simplified line.
+        zoom (int, optional): Web map zoom level; the tolerance becomes the
+                              size of one map pixel at the route's latitude.
+                              Ignored if tolerance_m is given.
+
+    Returns:
+        List[Route]: The kept waypoints in flying order, first and last always
+                     included, or None if the route does not exist or an error occurs.
+    """
+    try:
+        waypoints = run_query(ROUTE_PATH_QUERY, (route_id,))
+    except sqlite3.Error as e:
+        print(f"Error retrieving route waypoints from the database: {e}")
+        return None
+    if not waypoints:
+        return None
+
+    if tolerance_m is None:
+        tolerance_m = geo.pixel_size_m(zoom, waypoints[0]["Latitude"]) if zoom is not None else 0.0
+    kept = geo.simplify_path([(row["Latitude"], row["Longitude"]) for row in waypoints], tolerance_m)
+    return convert_rows_to_route_list([waypoints[i] for i in kept])
+
+
+@query_cache.cached(row_tags=lambda args, result: {("routes", args[0])})
+def get_route_metrics(route_id: str) -> dict:
+    """
+    Computes a route's geometry from its waypoints, in waypoint order.
+
+    The result is cached per route until one of its waypoints is added,
+    updated or deleted, or the route is deleted.
+
+    Args:
+        route_id (str): The Route_ID of the route.
+
+    Returns:
+        dict: Route_ID, Waypoint_Count, Length_m (haversine), Legs (From, To and
+              Distance_m per leg), BBox and Centroid (mean of the waypoints),
+              or None if the route does not exist or an error occurs.
+    """
+    try:
+        waypoints = run_query(ROUTE_PATH_QUERY, (route_id,))
+    except sqlite3.Error as e:
+        print(f"Error retrieving route waypoints from the database: {e}")
+        return None
+    if not waypoints:
+        return None
+
+    metrics = geo.path_metrics([(row["Latitude"], row["Longitude"]) for row in waypoints])
+    min_lat, min_lon, max_lat, max_lon = metrics["bbox"]
+    return {
+        "Route_ID": route_id,
+        "Waypoint_Count": len(waypoints),
+        "Length_m": round(metrics["length_m"], 1),
+        "Legs": [{"From": start["Waypoint_ID"], "To": end["Waypoint_ID"], "Distance_m": round(distance, 1)}
+                 for start, end, distance in zip(waypoints, waypoints[1:], metrics["legs"])],
+        "BBox": {"Min_Latitude": min_lat, "Min_Longitude": min_lon,
+                 "Max_Latitude": max_lat, "Max_Longitude": max_lon},
+        "Centroid": {"Latitude": metrics["centroid"][0], "Longitude": metrics["centroid"][1]},
+    }
+
+
 def add_route_waypoint(route_id: str, waypoint_id: str, waypoint_data: dict) -> Route:
     """
     Adds a new waypoint to the route in the database.
@@ -411,6 +886,7 @@ def add_route_waypoint(route_id: str, waypoint_id: str, waypoint_data: dict) ->
     params = (route_id, waypoint_data.get('Latitude'), waypoint_data.get('Longitude'), waypoint_id)
     try:
         run_query(query, params)
+        query_cache.invalidate("routes", route_id)
         new_waypoint = Route(Route_ID=route_id,
                              Latitude=waypoint_data.get('Latitude'),
                              Longitude=waypoint_data.get('Longitude'),
@@ -436,6 +912,7 @@ def delete_route_waypoint(route_id: str, waypoint_id: str) -> bool:
     params = (route_id, waypoint_id)
     try:
         result = run_query(query, params)
+        query_cache.invalidate("routes", route_id)
         return result.rowcount > 0
     except sqlite3.Error as e:
         print(f"Error deleting route waypoint from the database: {e}")
@@ -457,6 +934,7 @@ def update_route_waypoint(route_id: str, waypoint_id: str, waypoint_data: dict)
     params = (waypoint_data['Latitude'], waypoint_data['Longitude'], route_id, waypoint_id)
     try:
         run_query(query, params)
+        query_cache.invalidate("routes", route_id)
         updated_waypoint = Route(Route_ID=route_id,
                                  Latitude=waypoint_data['Latitude'],
                                  Longitude=waypoint_data['Longitude'],
@@ -481,6 +959,7 @@ def delete_route(route_id: str):
     params = (route_id,)
     try:
         result = run_query(query, params)
+        query_cache.invalidate("routes", route_id)
         return result.rowcount > 0
     except sqlite3.Error as e:
         print(f"Error deleting route from the database: {e}")
@@ -515,34 +994,79 @@ def convert_rows_to_flight_plan_list(flight_plans):
     return all_flight_plans
 
 
-def get_all_flight_plans() -> List[FlightPlan]:
+def get_all_flight_plans(fields: list = None) -> List[FlightPlan]:
     """
     Retrieves all flight plans.
 
+    Args:
+        fields (list of str, optional): Only read these columns, returned as dictionaries.
+
     Returns:
         List[FlightPlan]: FlightPlan objects.
     """
-    query = "SELECT * FROM flight_plans"
+    query = f"SELECT {select_columns(fields)} FROM flight_plans"
     flight_plans = run_query(query)
-    return convert_rows_to_flight_plan_list(flight_plans)
+    return convert_rows_to_dicts(flight_plans, fields) if fields else convert_rows_to_flight_plan_list(flight_plans)
+
+
+def get_flight_plans_page(limit: int, after: list = None, fields: list = None):
+    """
+    Retrieves one page of flight plans in Flight_Plan_ID order.
+
+    Args:
+        limit (int): Page size.
+        after (list, optional): Cursor returned with the previous page.
+        fields (list of str, optional): Only read these columns, returned as dictionaries.
+
+    Returns:
+        tuple: (List[FlightPlan], cursor for the next page or None).
+    """
+    flight_plans, next_after = run_page_query("flight_plans", ["Flight_Plan_ID"], limit, after, fields)
+    if fields:
+        return convert_rows_to_dicts(flight_plans, fields), next_after
+    return convert_rows_to_flight_plan_list(flight_plans), next_after
 
 
-def get_flight_plan_by_id(flight_plan_id: str) -> FlightPlan:
+def get_flight_plan_by_id(flight_plan_id: str, fields: list = None) -> FlightPlan:
     """
     Retrieves a flight plan by its Flight_Plan_ID.
 
     Args:
         flight_plan_id (str): The Flight_Plan_ID of the flight plan.
+        fields (list of str, optional): Only read these columns, returned as a dictionary.
 
     Returns:
         FlightPlan: The flight plan object.
     """
-    query = "SELECT * FROM flight_plans WHERE Flight_Plan_ID = ?"
+    query = f"SELECT {select_columns(fields)} FROM flight_plans WHERE Flight_Plan_ID = ?"
     flight_plans = run_query(query, (flight_plan_id,))
-    flight_plan_list = convert_rows_to_flight_plan_list(flight_plans)
+    if fields:
+        flight_plan_list = convert_rows_to_dicts(flight_plans, fields)
+    else:
+        flight_plan_list = convert_rows_to_flight_plan_list(flight_plans)
     return flight_plan_list[0] if flight_plan_list else None
 
 
+def get_flight_plans_by_ids(flight_plan_ids: list, fields: list = None) -> list:
+    """
+    Retrieves several flight plans by their Flight_Plan_IDs. As with
+    get_flight_plan_by_id(), a plan that covers several routes is returned
+    once, as its first row.
+
+    Args:
+        flight_plan_ids (list of str): The Flight_Plan_IDs, in the order to return the plans in.
+        fields (list of str, optional): Only read these columns, returned as dictionaries.
+
+    Returns:
+        list: A FlightPlan (or dictionary) for each ID; None where the plan does not exist.
+    """
+    found = run_in_query("flight_plans", "Flight_Plan_ID", flight_plan_ids, fields)
+    rows = list(found.values())
+    converted = dict(zip(found, convert_rows_to_dicts(rows, fields) if fields
+                         else convert_rows_to_flight_plan_list(rows)))
+    return [converted.get(flight_plan_id) for flight_plan_id in flight_plan_ids]
+
+
 def add_flight_plan(flight_plan_data):
     """
     Adds a new flight plan to the database.
@@ -554,16 +1078,13 @@ def add_flight_plan(flight_plan_data):
         FlightPlan: The newly added FlightPlan object.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "INSERT INTO flight_plans (Flight_Plan_ID, BUNO_ID, Pilot_ID, Route_ID, IsPlanned, IsComplete) VALUES (?, ?, ?, ?, ?, ?)",
-            (flight_plan_data['Flight_Plan_ID'], flight_plan_data['BUNO_ID'],
-             flight_plan_data['Pilot_ID'], flight_plan_data['Route_ID'],
-             flight_plan_data['IsPlanned'], flight_plan_data['IsComplete']))
-        conn.commit()
-        conn.close()
+        with pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO flight_plans (Flight_Plan_ID, BUNO_ID, Pilot_ID, Route_ID, IsPlanned, IsComplete) VALUES (?, ?, ?, ?, ?, ?)",
+                (flight_plan_data['Flight_Plan_ID'], flight_plan_data['BUNO_ID'],
+                 flight_plan_data['Pilot_ID'], flight_plan_data['Route_ID'],
+                 flight_plan_data['IsPlanned'], flight_plan_data['IsComplete']))
+        query_cache.invalidate("flight_plans", flight_plan_data['Flight_Plan_ID'])
 
         new_flight_plan = FlightPlan(Flight_Plan_ID=flight_plan_data['Flight_Plan_ID'],
                                       BUNO_ID=flight_plan_data['BUNO_ID'],
@@ -590,22 +1111,20 @@ def update_flight_plan(flight_plan_id: str, flight_plan_data):
         FlightPlan: The updated FlightPlan object.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "UPDATE flight_plans SET BUNO_ID = ?, Pilot_ID = ?, Route_ID = ?, IsPlanned = ?, IsComplete = ? WHERE Flight_Plan_ID = ?",
-            (flight_plan_data['BUNO_ID'], flight_plan_data['Pilot_ID'],
-             flight_plan_data['Route_ID'], flight_plan_data['IsPlanned'],
-             flight_plan_data['IsComplete'], flight_plan_id))
-        conn.commit()
-        conn.close()
+        with pool.transaction() as conn:
+            conn.execute(
+                "UPDATE flight_plans SET BUNO_ID = ?, Pilot_ID = ?, Route_ID = ?, IsPlanned = ?, IsComplete = ? WHERE Flight_Plan_ID = ?",
+                (flight_plan_data['BUNO_ID'], flight_plan_data['Pilot_ID'],
+                 flight_plan_data['Route_ID'], flight_plan_data['IsPlanned'],
+                 flight_plan_data['IsComplete'], flight_plan_id))
+        query_cache.invalidate("flight_plans", flight_plan_id)
 
         updated_flight_plan = FlightPlan(Flight_Plan_ID=flight_plan_id,
                                           BUNO_ID=flight_plan_data['BUNO_ID'],
                                           Pilot_ID=flight_plan_data['Pilot_ID'],
                                           Route_ID=flight_plan_data['Route_ID'],
-                                          IsPlanned=flight_plan_data['IsPlanned'], isComplete=flight_plan_data['IsComplete'])
+                                          IsPlanned=flight_plan_data['IsPlanned'],
+                                          IsComplete=flight_plan_data['IsComplete'])
         return updated_flight_plan
 
     except sqlite3.Error as e:
@@ -624,60 +1143,91 @@ def delete_flight_plan(flight_plan_id: str):
         bool: True if the flight plan was deleted successfully, False otherwise.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with pool.transaction() as conn:
+            cursor = conn.execute("DELETE FROM flight_plans WHERE Flight_Plan_ID = ?", (flight_plan_id,))
+        query_cache.invalidate("flight_plans", flight_plan_id)
 
-        cursor.execute("DELETE FROM flight_plans WHERE Flight_Plan_ID = ?", (flight_plan_id,))
-
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return True
-        else:
-            conn.close()
-            return False
+        return cursor.rowcount > 0
 
     except sqlite3.Error as e:
         print(f"Error deleting flight plan from the database: {e}")
         return False
 
 
-def get_flight_plans_with_routes():
+FLIGHT_PLAN_ROUTE_LAYOUTS = ("flat", "nested", "columnar")
+
+
+@query_cache.cached("flight_plans", "routes")
+def get_flight_plans_with_routes(layout: str = "flat"):
     """
     Retrieves flight plans along with their associated route details.
 
+    The join is read once, sorted by plan and then by waypoint order, and each
+    layout is assembled in that single pass over the cursor.
+
+    Args:
+        layout (str, optional): Shape of the result:
+            flat      one dictionary per plan and waypoint pair, the plan's
+                      fields repeated on each (the original shape).
+            nested    one dictionary per plan with a "Waypoints" list of
+                      {Waypoint_ID, Latitude, Longitude} in route order.
+            columnar  one dictionary per plan with "Waypoints" holding parallel
+                      Waypoint_ID, Latitude and Longitude lists.
+
     Returns:
-        list[dict]: A list of dictionaries, where each dictionary contains flight plan 
-                    and route details.
+        list[dict]: Flight plans with their route details, or None on a database error.
+
+    Raises:
+        ValueError: If layout is not one of FLIGHT_PLAN_ROUTE_LAYOUTS.
     """
+    if layout not in FLIGHT_PLAN_ROUTE_LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}', expected one of: {', '.join(FLIGHT_PLAN_ROUTE_LAYOUTS)}")
+    # fp.rowid tells plan rows apart: Flight_Plan_ID alone repeats across routes
     query = """
-    SELECT fp.Flight_Plan_ID, fp.BUNO_ID, fp.Pilot_ID, fp.Route_ID, fp.IsPlanned, fp.IsComplete,
-           r.Latitude, r.Longitude, r.Waypoint_ID
+    SELECT fp.rowid, fp.Flight_Plan_ID, fp.BUNO_ID, fp.Pilot_ID, fp.Route_ID, fp.IsPlanned, fp.IsComplete,
+           r.Waypoint_ID, r.Latitude, r.Longitude
     FROM flight_plans fp
     INNER JOIN routes r ON fp.Route_ID = r.Route_ID
+    ORDER BY fp.rowid, CAST(r.Waypoint_ID AS INTEGER), r.rowid
     """
+    plan_columns = ("Flight_Plan_ID", "BUNO_ID", "Pilot_ID", "Route_ID", "IsPlanned", "IsComplete")
     try:
-        flight_plans_with_routes = run_query(query)
-        result = []
-        for row in flight_plans_with_routes:
-            flight_plan_info = {
-                "Flight_Plan_ID": row["Flight_Plan_ID"],
-                "BUNO_ID": row["BUNO_ID"],
-                "Pilot_ID": row["Pilot_ID"],
-                "Route_ID": row["Route_ID"],
-                "IsPlanned": row["IsPlanned"],
-                "IsComplete": row["IsComplete"],
-                "Latitude": row["Latitude"],
-                "Longitude": row["Longitude"],
-                "Waypoint_ID": row["Waypoint_ID"]
-
-            }
-            result.append(flight_plan_info)
-        return result
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(query)
+            result = []
+            if layout == "flat":
+                columns = plan_columns + ("Latitude", "Longitude", "Waypoint_ID")
+                for _, *plan, waypoint_id, latitude, longitude in cursor:
+                    result.append(dict(zip(columns, (*plan, latitude, longitude, waypoint_id))))
+                return result
+
+            current = None
+            for rowid, *plan, waypoint_id, latitude, longitude in cursor:
+                if rowid != current:
+                    current = rowid
+                    if layout == "nested":
+                        waypoints = []
+                    else:
+                        waypoints = {"Waypoint_ID": [], "Latitude": [], "Longitude": []}
+                        waypoint_ids = waypoints["Waypoint_ID"].append
+                        latitudes = waypoints["Latitude"].append
+                        longitudes = waypoints["Longitude"].append
+                    flight_plan = dict(zip(plan_columns, plan))
+                    flight_plan["Waypoints"] = waypoints
+                    result.append(flight_plan)
+                if layout == "nested":
+                    waypoints.append({"Waypoint_ID": waypoint_id, "Latitude": latitude, "Longitude": longitude})
+                else:
+                    waypoint_ids(waypoint_id)
+                    latitudes(latitude)
+                    longitudes(longitude)
+            return result
     except sqlite3.Error as e:
         print(f"Error retrieving flight plans with routes from the database: {e}")
         return None
-    
+
 # ---------------------------------------------------------
 # Pilots
 # ---------------------------------------------------------
@@ -697,39 +1247,55 @@ def convert_rows_to_pilot_list(pilots):
     return all_pilots
 
 
-def get_all_pilots() -> List[Pilot]:
+def get_all_pilots(fields: list = None) -> List[Pilot]:
     """
-    Retrieves all pilots.
+    Retrieves all pilots, or only the given columns of each as dictionaries.
     """
-    query = "SELECT * FROM pilots"
+    query = f"SELECT {select_columns(fields)} FROM pilots"
     pilots = run_query(query)
-    return convert_rows_to_pilot_list(pilots)
+    return convert_rows_to_dicts(pilots, fields) if fields else convert_rows_to_pilot_list(pilots)
+
+
+def get_pilots_page(limit: int, after: list = None, fields: list = None):
+    """
+    Retrieves one page of pilots in Pilot_ID order.
+    """
+    pilots, next_after = run_page_query("pilots", ["Pilot_ID"], limit, after, fields)
+    return (convert_rows_to_dicts(pilots, fields) if fields else convert_rows_to_pilot_list(pilots)), next_after
 
 
-def get_pilot_by_id(pilot_id: int) -> Pilot:
+def get_pilot_by_id(pilot_id: int, fields: list = None) -> Pilot:
     """
-    Retrieves a pilot by their Pilot_ID.
+    Retrieves a pilot by their Pilot_ID, or only the given columns as a dictionary.
     """
-    query = "SELECT * FROM pilots WHERE Pilot_ID = ?"
+    query = f"SELECT {select_columns(fields)} FROM pilots WHERE Pilot_ID = ?"
     pilots = run_query(query, (pilot_id,))
-    pilot_list = convert_rows_to_pilot_list(pilots)
+    pilot_list = convert_rows_to_dicts(pilots, fields) if fields else convert_rows_to_pilot_list(pilots)
     return pilot_list[0] if pilot_list else None
 
 
+def get_pilots_by_ids(pilot_ids: list, fields: list = None) -> list:
+    """
+    Retrieves several pilots by their Pilot_IDs, in the order given; None
+    where the pilot does not exist. See get_flight_plans_by_ids().
+    """
+    found = run_in_query("pilots", "Pilot_ID", pilot_ids, fields)
+    rows = list(found.values())
+    converted = dict(zip(found, convert_rows_to_dicts(rows, fields) if fields else convert_rows_to_pilot_list(rows)))
+    return [converted.get(pilot_id) for pilot_id in pilot_ids]
+
+
 def add_pilot(pilot_data):
     """
     Adds a new pilot to the database.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "INSERT INTO pilots (Pilot_ID, Pilot_Current, Pilot_Hours) VALUES (?, ?, ?)", 
-            (pilot_data['Pilot_ID'], pilot_data['Pilot_Current'], pilot_data['Pilot_Hours'])
-        )
-        conn.commit()
-        conn.close()
+        with pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO pilots (Pilot_ID, Pilot_Current, Pilot_Hours) VALUES (?, ?, ?)", 
+                (pilot_data['Pilot_ID'], pilot_data['Pilot_Current'], pilot_data['Pilot_Hours'])
+            )
+        query_cache.invalidate("pilots", pilot_data['Pilot_ID'])
 
         new_pilot = Pilot(Pilot_ID=pilot_data['Pilot_ID'],
                           Pilot_Current=pilot_data['Pilot_Current'],
@@ -746,15 +1312,12 @@ def update_pilot(pilot_id: int, pilot_data):
     Updates an existing pilot in the database.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "UPDATE pilots SET Pilot_Current = ?, Pilot_Hours = ? WHERE Pilot_ID = ?",
-            (pilot_data['Pilot_Current'], pilot_data['Pilot_Hours'], pilot_id)
-        )
-        conn.commit()
-        conn.close()
+        with pool.transaction() as conn:
+            conn.execute(
+                "UPDATE pilots SET Pilot_Current = ?, Pilot_Hours = ? WHERE Pilot_ID = ?",
+                (pilot_data['Pilot_Current'], pilot_data['Pilot_Hours'], pilot_id)
+            )
+        query_cache.invalidate("pilots", pilot_id)
 
         updated_pilot = Pilot(Pilot_ID=pilot_id, 
                               Pilot_Current=pilot_data['Pilot_Current'],
@@ -771,24 +1334,18 @@ def delete_pilot(pilot_id: int):
     Deletes a pilot from the database.
     """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM pilots WHERE Pilot_ID = ?", (pilot_id,))
+        with pool.transaction() as conn:
+            cursor = conn.execute("DELETE FROM pilots WHERE Pilot_ID = ?", (pilot_id,))
+        query_cache.invalidate("pilots", pilot_id)
 
-        if cursor.rowcount > 0:
-            conn.commit()
-            conn.close()
-            return True
-        else:
-            conn.close()
-            return False
+        return cursor.rowcount > 0
 
     except sqlite3.Error as e:
         print(f"Error deleting pilot from the database: {e}")
         return False
     
     
+@query_cache.cached("pilots")
 def get_pilots_with_hour_range(min_hours: int = None, max_hours: int = None) -> List[Pilot]:
     """
     Retrieves pilots with pilot hours within the specified range.
@@ -820,4 +1377,82 @@ def get_pilots_with_hour_range(min_hours: int = None, max_hours: int = None) ->
         return convert_rows_to_pilot_list(pilots)
     except sqlite3.Error as e:
         print(f"Error retrieving pilots from the database: {e}")
-        return []
\ No newline at end of file
+        return []
+
+# ---------------------------------------------------------
+# Dispatch
+# ---------------------------------------------------------
+
+# Largest drones x routes matrix get_distance_matrix() computes in one request;
+# 1,000 x 1,000 distances take about 10 ms to compute and 15 ms to serialize
+MAX_MATRIX_CELLS = 1_000_000
+
+
+@query_cache.cached("routes")
+def get_route_starts() -> list:
+    """
+    Retrieves the first waypoint of every route, by waypoint number.
+
+    Returns:
+        list of tuple: (Route_ID, Latitude, Longitude) in Route_ID order, for the
+                       routes whose first waypoint has a position; None on error.
+    """
+    # With a single MIN() aggregate SQLite takes the bare columns from the minimum row
+    query = """
+    SELECT Route_ID, Latitude, Longitude, MIN(CAST(Waypoint_ID AS INTEGER))
+    FROM routes
+    GROUP BY Route_ID
+    """
+    try:
+        rows = run_query(query)
+    except sqlite3.Error as e:
+        print(f"Error retrieving route start waypoints from the database: {e}")
+        return None
+    return [(row[0], row[1], row[2]) for row in rows if row[1] is not None and row[2] is not None]
+
+
+def get_distance_matrix(buno_ids: list = None, route_ids: list = None, status: str = None) -> dict:
+    """
+    Computes the great-circle distance from each drone's current position to
+    the first waypoint of each route.
+
+    Drone positions come from the live fleet state. Drones without a position
+    and unknown IDs are left out; the returned ID lists say which rows and
+    columns the matrix has.
+
+    Args:
+        buno_ids (list of str, optional): Drones to include, in row order. Defaults to every drone.
+        route_ids (list of str, optional): Routes to include, in column order. Defaults to every route.
+        status (str, optional): Only include drones with this Status.
+
+    Returns:
+        dict: BUNO_IDs, Route_IDs and Distances_m, a matrix in whole metres with
+              one row per drone and one column per route; None on a database error.
+
+    Raises:
+        ValueError: If the matrix would have more than MAX_MATRIX_CELLS cells.
+    """
+    if buno_ids is None:
+        drones = fleet.all()
+    else:
+        drones = [drone for drone in map(fleet.get, buno_ids) if drone is not None]
+    drones = [drone for drone in drones
+              if drone.Latitude is not None and drone.Longitude is not None
+              and (status is None or drone.Status == status)]
+
+    starts = get_route_starts()
+    if starts is None:
+        return None
+    if route_ids is not None:
+        by_id = {start[0]: start for start in starts}
+        starts = [by_id[route_id] for route_id in route_ids if route_id in by_id]
+
+    if len(drones) * len(starts) > MAX_MATRIX_CELLS:
+        raise ValueError(f"{len(drones)} drones x {len(starts)} routes is more than "
+                         f"{MAX_MATRIX_CELLS} distances; select fewer drones or routes")
+    return {
+        "BUNO_IDs": [drone.BUNO_ID for drone in drones],
+        "Route_IDs": [route_id for route_id, _, _ in starts],
+        "Distances_m": geo.distance_matrix_m([(drone.Latitude, drone.Longitude) for drone in drones],
+                                             [(lat, lon) for _, lat, lon in starts]),
+    }
@@ -0,0 +1,339 @@
+import heapq
+import math
+import threading
+from API import geo
+
+# Levels of the cell pyramid above the leaf cells. Leaf cells are
+# 360 / 2**CELL_LEVELS degrees on a side (about 300 m of latitude); each
+# level up merges 2 x 2 cells, up to a single cell covering the globe.
+CELL_LEVELS = 17
+
+HALF_RADIAN = math.pi / 360  # Multiplies degrees into half-angles in radians
+
+
+def _haversine_h(lat1, lon1, cos_lat1, lat2, lon2, cos_lat2):
+    # The haversine of the central angle between two points, in radians; it grows with distance
+    sin_lat = math.sin((lat2 - lat1) / 2)
+    sin_lon = math.sin((lon2 - lon1) / 2)
+    return sin_lat * sin_lat + cos_lat1 * cos_lat2 * sin_lon * sin_lon
+
+
+def _h_to_m(h):
+    return 2 * geo.EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, h)))
+
+
+class _CellTree:
+    """
+    One set of drones bucketed into a pyramid of grids: leaf cells hold the
+    drones, and every coarser level counts the drones under each of its
+    cells, so searches can skip empty parts of the globe.
+    """
+
+    def __init__(self, levels):
+        self.leaves = {}  # (row, column) -> {BUNO_ID: (lat, lon, cos(lat)) in radians}
+        self.counts = [{} for _ in range(levels)]  # counts[i] covers level i + 1
+
+    def _count(self, cell, step):
+        row, column = cell
+        for counts in self.counts:
+            row >>= 1
+            column >>= 1
+            total = counts.get((row, column), 0) + step
+            if total:
+                counts[(row, column)] = total
+            else:
+                del counts[(row, column)]
+
+    def add(self, buno_id, point, cell):
+        self.leaves.setdefault(cell, {})[buno_id] = point
+        self._count(cell, 1)
+
+    def remove(self, buno_id, cell):
+        leaf = self.leaves[cell]
+        del leaf[buno_id]
+        if not leaf:
+            del self.leaves[cell]
+        self._count(cell, -1)
+
+    def move(self, buno_id, point, old_cell, new_cell):
+        if old_cell == new_cell:
+            self.leaves[new_cell][buno_id] = point
+            return
+        leaf = self.leaves[old_cell]
+        del leaf[buno_id]
+        if not leaf:
+            del self.leaves[old_cell]
+        self.leaves.setdefault(new_cell, {})[buno_id] = point
+        # Counts only change below the first level where both cells share an ancestor
+        (old_row, old_column), (new_row, new_column) = old_cell, new_cell
+        for counts in self.counts:
+            old_row, old_column, new_row, new_column = old_row >> 1, old_column >> 1, new_row >> 1, new_column >> 1
+            if (old_row, old_column) == (new_row, new_column):
+                break
+            total = counts[(old_row, old_column)] - 1
+            if total:
+                counts[(old_row, old_column)] = total
+            else:
+                del counts[(old_row, old_column)]
+            counts[(new_row, new_column)] = counts.get((new_row, new_column), 0) + 1
+
+    def __bool__(self):
+        return bool(self.leaves)
+
+
+class GridIndex:
+    """
+    In-memory nearest-neighbour index over the live drone positions.
+
+    Drones are bucketed into leaf cells of a pyramid of grids, with one
+    pyramid for the whole fleet and one per Status. A position update moves
+    one entry between two leaf cells and adjusts the counts above them, so
+    the index keeps up with a fleet whose every drone moves each second.
+
+    k-nearest queries are best-first: cells are visited in order of the
+    smallest great-circle distance anything inside them could be at, from
+    the globe down to the leaves, and the search stops once the k-th best
+    drone is closer than the next cell. Dense clusters are split finely and
+    empty space is skipped in a few coarse steps, so the cost does not
+    depend on where the query point is or how the fleet is clustered; a
+    status no drone has is answered without searching. Box and radius
+    searches descend only into occupied cells that can hold a match.
+    """
+
+    def __init__(self, levels=CELL_LEVELS):
+        self.levels = levels
+        self.leaf_deg = 360 / 2 ** levels
+        self._leaf_rows = 2 ** (levels - 1)  # 180 degrees of latitude
+        self._sizes = [self.leaf_deg * 2 ** level for level in range(levels + 1)]
+        # Largest angle, in radians, between a cell's centre and any point in it, by level
+        self._radius = [2 * math.asin(min(1.0, math.sqrt(2) * math.sin(math.radians(self.leaf_deg * 2 ** level) / 4)))
+                        for level in range(levels + 1)]
+        self._points = {}  # BUNO_ID -> (lat, lon, Status, leaf cell)
+        self._all = _CellTree(levels)
+        self._by_status = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lon):
+        row = min(math.floor((lat + 90) / self.leaf_deg), self._leaf_rows - 1)
+        return (row, math.floor((lon + 180) / self.leaf_deg) % (2 * self._leaf_rows))
+
+    def _remove(self, buno_id):
+        point = self._points.pop(buno_id, None)
+        if point is not None:
+            _, _, status, cell = point
+            self._all.remove(buno_id, cell)
+            tree = self._by_status[status]
+            tree.remove(buno_id, cell)
+            if not tree:
+                del self._by_status[status]
+
+    def rebuild(self, drones):
+        """
+        Replaces the index contents.
+
+        Args:
+            drones (list of Drone): Every drone in the fleet.
+        """
+        with self._lock:
+            self._points = {}
+            self._all = _CellTree(self.levels)
+            self._by_status = {}
+        for drone in drones:
+            self.upsert(drone)
+
+    def upsert(self, drone):
+        """
+        Adds a drone or moves it to its current position.
+        """
+        buno_id, lat, lon, status = drone.BUNO_ID, drone.Latitude, drone.Longitude, drone.Status
+        with self._lock:
+            old = self._points.get(buno_id)
+            if lat is None or lon is None:
+                self._remove(buno_id)
+                return
+            cell = self._cell(lat, lon)
+            lat_rad = math.radians(lat)
+            point = (lat_rad, math.radians(lon), math.cos(lat_rad))
+            if old is None:
+                self._all.add(buno_id, point, cell)
+            else:
+                self._all.move(buno_id, point, old[3], cell)
+            if old is not None and old[2] == status:
+                self._by_status[status].move(buno_id, point, old[3], cell)
+            else:
+                if old is not None:
+                    tree = self._by_status[old[2]]
+                    tree.remove(buno_id, old[3])
+                    if not tree:
+                        del self._by_status[old[2]]
+                tree = self._by_status.get(status)
+                if tree is None:
+                    tree = self._by_status[status] = _CellTree(self.levels)
+                tree.add(buno_id, point, cell)
+            self._points[buno_id] = (lat, lon, status, cell)
+
+    def remove(self, buno_id):
+        """
+        Drops a drone from the index.
+        """
+        with self._lock:
+            self._remove(buno_id)
+
+    def _cell_bound(self, lat, lon, cos_lat, level, row, column):
+        """
+        Lower bound on the haversine from the point to anything in the cell.
+
+        hav(d) = hav(dlat) + cos(lat1) cos(lat2) hav(dlon), with each term at
+        its smallest over the cell. Past a quarter of the globe that flattens
+        out, and the distance to the cell's centre less its radius is used
+        when it is the larger of the two.
+        """
+        size = self._sizes[level]
+        south = row * size - 90
+        north = south + size
+        west = column * size - 180
+        if lat < south:
+            sin_lat = math.sin((south - lat) * HALF_RADIAN)
+        elif lat > north:
+            sin_lat = math.sin((lat - north) * HALF_RADIAN)
+        else:
+            sin_lat = 0.0
+        if west <= lon <= west + size:
+            return sin_lat * sin_lat
+        d_lon = min((west - lon) % 360, (lon - west - size) % 360)
+        sin_lon = math.sin(d_lon * HALF_RADIAN)
+        edge = max(abs(south), abs(north))
+        cos_cell = math.cos(math.radians(edge)) if edge < 90 else 0.0
+        box = sin_lat * sin_lat + cos_lat * cos_cell * sin_lon * sin_lon
+        if box <= 0.5:
+            return box
+
+        centre_lat = math.radians(south + size / 2)
+        centre = _haversine_h(math.radians(lat), math.radians(lon), cos_lat,
+                              centre_lat, math.radians(west + size / 2), math.cos(centre_lat))
+        angle = 2 * math.asin(math.sqrt(min(1.0, centre))) - self._radius[level]
+        return max(box, math.sin(angle / 2) ** 2) if angle > 0 else box
+
+    def _leaf_cells(self, tree, keep):
+        # Every occupied leaf cell under the cells keep(level, row, column) accepts
+        cells = [(self.levels, 0, 0)]
+        while cells:
+            level, row, column = cells.pop()
+            if level == 0:
+                yield row, column
+                continue
+            level -= 1
+            occupied = tree.counts[level - 1] if level else tree.leaves
+            for child in ((2 * row, 2 * column), (2 * row + 1, 2 * column),
+                          (2 * row, 2 * column + 1), (2 * row + 1, 2 * column + 1)):
+                if child in occupied and keep(level, *child):
+                    cells.append((level, *child))
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Finds the drones whose position lies inside a latitude/longitude box.
+
+        Args:
+            min_lat (float): Southern edge in degrees.
+            min_lon (float): Western edge in degrees.
+            max_lat (float): Northern edge in degrees.
+            max_lon (float): Eastern edge in degrees.
+
+        Returns:
+            list of str: BUNO_IDs of the matching drones, sorted.
+        """
+        def overlaps(level, row, column):
+            size = self._sizes[level]
+            south, west = row * size - 90, column * size - 180
+            # Longitude 180 is kept in the cells at -180
+            return (south <= max_lat and south + size >= min_lat
+                    and (west <= max_lon and west + size >= min_lon or column == 0 and max_lon >= 180))
+
+        matches = []
+        with self._lock:
+            points = self._points
+            for cell in self._leaf_cells(self._all, overlaps):
+                for buno_id in self._all.leaves[cell]:
+                    lat, lon, _, _ = points[buno_id]
+                    if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                        matches.append(buno_id)
+        matches.sort()
+        return matches
+
+    def within_radius(self, lat, lon, radius_m):
+        """
+        Finds the drones within a great-circle distance of a point.
+
+        Args:
+            lat (float): Latitude of the centre in degrees.
+            lon (float): Longitude of the centre in degrees.
+            radius_m (float): Search radius in metres.
+
+        Returns:
+            list of tuple: (distance in metres, BUNO_ID) pairs, nearest first.
+        """
+        lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(lat_rad)
+        limit = math.sin(min(math.pi, radius_m / geo.EARTH_RADIUS_M) / 2) ** 2
+        matches = []
+        with self._lock:
+            cells = self._leaf_cells(
+                self._all, lambda level, row, column: self._cell_bound(lat, lon, cos_lat, level, row, column) <= limit)
+            for cell in cells:
+                for buno_id, (p_lat, p_lon, p_cos) in self._all.leaves[cell].items():
+                    h = _haversine_h(lat_rad, lon_rad, cos_lat, p_lat, p_lon, p_cos)
+                    if h <= limit:
+                        matches.append((h, buno_id))
+        matches.sort()
+        return [(_h_to_m(h), buno_id) for h, buno_id in matches]
+
+    def nearest(self, lat, lon, k, status=None):
+        """
+        Finds the k drones closest to a point by great-circle distance.
+
+        Args:
+            lat (float): Latitude of the point in degrees.
+            lon (float): Longitude of the point in degrees.
+            k (int): Number of drones to return.
+            status (str, optional): Only consider drones with this Status.
+
+        Returns:
+            list of tuple: (distance in metres, BUNO_ID) pairs, nearest first.
+        """
+        if k <= 0:
+            return []
+        lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(lat_rad)
+        best = []  # max-heap of (-haversine, BUNO_ID)
+        with self._lock:
+            tree = self._all if status is None else self._by_status.get(status)
+            if not tree:
+                return []
+            cells = [(0.0, self.levels, 0, 0)]  # min-heap of (bound, level, row, column), from the globe down
+            while cells:
+                bound, level, row, column = heapq.heappop(cells)
+                if len(best) == k and bound >= -best[0][0]:
+                    break
+                if level == 0:
+                    for buno_id, (p_lat, p_lon, p_cos) in tree.leaves[(row, column)].items():
+                        h = _haversine_h(lat_rad, lon_rad, cos_lat, p_lat, p_lon, p_cos)
+                        if len(best) < k:
+                            heapq.heappush(best, (-h, buno_id))
+                        elif h < -best[0][0]:
+                            heapq.heapreplace(best, (-h, buno_id))
+                    continue
+                level -= 1
+                occupied = tree.counts[level - 1] if level else tree.leaves
+                for child in ((2 * row, 2 * column), (2 * row + 1, 2 * column),
+                              (2 * row, 2 * column + 1), (2 * row + 1, 2 * column + 1)):
+                    if child in occupied:
+                        bound = self._cell_bound(lat, lon, cos_lat, level, *child)
+                        if len(best) < k or bound < -best[0][0]:
+                            heapq.heappush(cells, (bound, level, *child))
+        return sorted((_h_to_m(-h), buno_id) for h, buno_id in best)
+
+    def __len__(self):
+        return len(self._points)
+
+
+nearest_index = GridIndex()
@@ -0,0 +1,135 @@
+import collections
+import itertools
+import json
+import threading
+
+# How many recent changes are kept for subscribers that fall behind or
+# reconnect with a Last-Event-ID header.
+FEED_CAPACITY = 10000
+
+# Seconds between keep-alive comments sent to idle subscribers.
+HEARTBEAT_INTERVAL = 15
+
+
+class ChangeFeed:
+    """
+    A shared, sequence-numbered log of drone changes.
+
+    Each change is encoded to JSON once when it is published. Subscribers
+    block on a single condition variable until the sequence moves past what
+    they have already sent, then filter the new entries; nothing is polled
+    and no subscriber touches the database.
+    """
+
+    def __init__(self, capacity=FEED_CAPACITY):
+        self._events = collections.deque(maxlen=capacity)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def publish(self, drones, event="drone", previous=None):
+        """
+        Appends one event per drone and wakes every waiting subscriber.
+
+        Args:
+            drones (list of Drone): The drones that changed.
+            event (str, optional): SSE event name. Defaults to "drone".
+            previous (list of str, optional): Each drone's Status before the
+                change, None for a new drone, so subscribers filtering on
+                status can tell when a drone leaves their filter.
+        """
+        if not drones:
+            return
+        if previous is None:
+            previous = [None] * len(drones)
+        with self._cond:
+            for drone, previous_status in zip(drones, previous):
+                self._seq += 1
+                data = json.dumps(drone.to_dict(), separators=(",", ":"))
+                self._events.append((self._seq, event, drone.BUNO_ID, drone.Status, previous_status, data))
+            self._cond.notify_all()
+
+    def wait(self, after, timeout):
+        """
+        Blocks until there are events newer than after, or the timeout passes.
+
+        Args:
+            after (int): The last sequence number the caller has seen.
+            timeout (float): Seconds to wait.
+
+        Returns:
+            tuple: (events newer than after, True if the caller missed events
+                    that are no longer in the feed).
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != after, timeout)
+            new = self._seq - after
+            if new < 0 or new > len(self._events):
+                return [], True
+            # Sequence numbers are contiguous, so the new events are the last `new` entries
+            events = list(itertools.islice(reversed(self._events), new))
+        events.reverse()
+        return events, False
+
+
+def format_event(seq, event, data):
+    """
+    Formats one Server-Sent Events message.
+    """
+    return f"id: {seq}\nevent: {event}\ndata: {data}\n\n"
+
+
+def subscribe(feed, snapshot, buno_ids=None, statuses=None, last_event_id=None,
+              heartbeat=HEARTBEAT_INTERVAL):
+    """
+    Generates an SSE stream of drone changes.
+
+    New subscribers (and ones whose Last-Event-ID is no longer in the feed)
+    first receive the current state of every matching drone, then only the
+    drones that change. A drone whose status changes out of the statuses
+    filter is sent once more as a "remove" event, so the subscriber drops it.
+
+    Args:
+        feed (ChangeFeed): The feed to follow.
+        snapshot (callable): Returns the current list of drones.
+        buno_ids (set, optional): Only send these drones.
+        statuses (set, optional): Only send drones with one of these statuses.
+        last_event_id (int, optional): Resume after this sequence number.
+        heartbeat (float, optional): Seconds between keep-alive comments.
+
+    Yields:
+        str: SSE messages.
+    """
+    def matches(buno_id, status):
+        return (not buno_ids or buno_id in buno_ids) and (not statuses or status in statuses)
+
+    yield "retry: 3000\n\n"
+
+    after = last_event_id if last_event_id is not None else -1
+    while True:
+        if after < 0:
+            after = feed.seq
+            for drone in snapshot():
+                if matches(drone.BUNO_ID, drone.Status):
+                    data = json.dumps(drone.to_dict(), separators=(",", ":"))
+                    yield format_event(after, "drone", data)
+
+        events, missed = feed.wait(after, heartbeat)
+        if missed:
+            after = -1  # Fell behind the feed; resend a snapshot
+            continue
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for seq, event, buno_id, status, previous, data in events:
+            if matches(buno_id, status):
+                yield format_event(seq, event, data)
+            elif previous is not None and matches(buno_id, previous):
+                yield format_event(seq, "remove", data)
+            after = seq
+
+
+feed = ChangeFeed()
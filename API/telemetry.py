@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+import time
+from API.database import pool
+
+# Retention tiers, finest first: (table, bucket size in seconds, seconds kept
+# before being rolled up into the next tier). The last tier is kept forever.
+TIERS = [
+    ("telemetry_raw", None, 60 * 60),
+    ("telemetry_1s", 1, 24 * 60 * 60),
+    ("telemetry_1m", 60, None),
+]
+
+# Minimum time between compaction passes started by maybe_compact(), in seconds.
+COMPACT_INTERVAL = 60
+
+_compact_lock = threading.Lock()
+_last_compaction = 0.0
+
+
+def record_positions(conn, positions, timestamp=None):
+    """
+    Appends drone positions to the raw telemetry tier.
+
+    Runs on the caller's connection so the history is written in the same
+    transaction as the position update itself.
+
+    Args:
+        conn (sqlite3.Connection): An open connection.
+        positions (list of dict): Dicts with BUNO_ID, Altitude, Latitude and Longitude,
+                                  and optionally their own Timestamp.
+        timestamp (float, optional): Unix time of samples without a Timestamp. Defaults to now.
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    conn.executemany(
+        "INSERT OR REPLACE INTO telemetry_raw (BUNO_ID, Timestamp, Altitude, Latitude, Longitude) VALUES (?, ?, ?, ?, ?)",
+        [(position["BUNO_ID"], position.get("Timestamp", timestamp),
+          position["Altitude"], position["Latitude"], position["Longitude"])
+         for position in positions])
+
+
+def maybe_compact():
+    """
+    Runs compact() if the last pass is older than COMPACT_INTERVAL.
+    """
+    if time.time() - _last_compaction >= COMPACT_INTERVAL:
+        compact()
+
+
+def compact(now=None):
+    """
+    Rolls samples that have outlived their tier into the next, coarser tier.
+
+    Samples are averaged per drone and bucket, and only whole buckets older
+    than the tier's retention are moved, so repeated passes are idempotent.
+
+    Args:
+        now (float, optional): Unix time to compact relative to. Defaults to now.
+
+    Returns:
+        dict: Number of rows rolled up out of each tier.
+    """
+    global _last_compaction
+    if not _compact_lock.acquire(blocking=False):
+        return {}
+    try:
+        if now is None:
+            now = time.time()
+        moved = {}
+        with pool.transaction() as conn:
+            for (source, _, retention), (target, bucket, _) in zip(TIERS, TIERS[1:]):
+                cutoff = (now - retention) // bucket * bucket
+                conn.execute(f"""
+                INSERT OR REPLACE INTO {target} (BUNO_ID, Timestamp, Altitude, Latitude, Longitude)
+                SELECT BUNO_ID, CAST(Timestamp / {bucket} AS INTEGER) * {bucket} AS Bucket,
+                       AVG(Altitude), AVG(Latitude), AVG(Longitude)
+                FROM {source} INDEXED BY idx_{source}_timestamp
+                WHERE Timestamp < ?
+                GROUP BY BUNO_ID, Bucket
+                """, (cutoff,))
+                moved[source] = conn.execute(f"DELETE FROM {source} WHERE Timestamp < ?", (cutoff,)).rowcount
+        _last_compaction = now
+        return moved
+    except sqlite3.Error as e:
+        print(f"Error compacting telemetry: {e}")
+        return {}
+    finally:
+        _compact_lock.release()
+
+
+def get_track(buno_id, start=None, end=None):
+    """
+    Retrieves a drone's position history between two times.
+
+    Older parts of the range come from the coarser tiers, so the result is
+    the finest history still kept for each moment.
+
+    Args:
+        buno_id (str): The BUNO_ID of the drone.
+        start (float, optional): Unix time to start from (inclusive).
+        end (float, optional): Unix time to stop at (inclusive).
+
+    Returns:
+        list of dict: Positions ordered by Timestamp.
+    """
+    conditions = ["BUNO_ID = ?"]
+    params = [buno_id]
+    if start is not None:
+        conditions.append("Timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("Timestamp <= ?")
+        params.append(end)
+    where = " AND ".join(conditions)
+
+    query = " UNION ALL ".join(
+        f"SELECT Timestamp, Altitude, Latitude, Longitude FROM {table} WHERE {where}"
+        for table, _, _ in TIERS) + " ORDER BY Timestamp"
+
+    with pool.connection() as conn:
+        rows = conn.execute(query, params * len(TIERS)).fetchall()
+    return [dict(row) for row in rows]
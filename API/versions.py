@@ -0,0 +1,38 @@
+import uuid
+from API.database import pool
+from API.stream import feed
+
+# Distinguishes this process's drone versions from those of earlier runs,
+# whose change feed started counting from zero too.
+PROCESS_EPOCH = uuid.uuid4().hex[:8]
+
+# Tables with a counter in table_versions
+STORED_TABLES = ["routes", "pilots", "flight_plans"]
+
+
+def current(tables):
+    """
+    Returns the current version of each table.
+
+    routes, pilots and flight_plans have counters in table_versions, bumped
+    by insert/update/delete triggers, so writes made by other processes and
+    scripts are seen too. Drones are served from the in-process fleet state,
+    so their version is the change feed's sequence number instead.
+
+    Args:
+        tables (list of str): "drones", "routes", "pilots" and/or "flight_plans".
+
+    Returns:
+        list of str: One version string per table, in the order given.
+    """
+    versions = {}
+    stored = [table for table in tables if table in STORED_TABLES]
+    if stored:
+        with pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT name, version FROM table_versions WHERE name IN ({', '.join('?' * len(stored))})",
+                stored).fetchall()
+        versions.update((row["name"], str(row["version"])) for row in rows)
+    if "drones" in tables:
+        versions["drones"] = f"{PROCESS_EPOCH}.{feed.seq}"
+    return [versions.get(table, "0") for table in tables]
@@ -1,7 +1,16 @@
+import argparse
+import asyncio
 import random
 import time
 import requests
 
+try:
+    import aiohttp
+except ImportError:  # aiohttp is only needed for the --drones load mode
+    aiohttp = None
+
+API_URL = "http://localhost:5000/api"
+
 # Route 2 waypoints
 route2_waypoints = [
     (36.341631, -94.198761),  # Walton Blvd Walmart (Start)
@@ -12,47 +21,62 @@ route2_waypoints = [
     (36.341631, -94.198761)   # Walton Blvd Walmart (End)
 ]
 
-def simulate_drone_flight(drone_id):
-    waypoint_index = 0
+
+def move_towards_waypoint(latitude, longitude, waypoint_index):
+    """
+    Advances a drone one step along route 2.
+
+    Returns:
+        tuple: (latitude, longitude, waypoint_index, True if a waypoint was just reached).
+    """
     current_waypoint = route2_waypoints[waypoint_index]
 
-    # Initialize latitude and longitude 
+    # Calculate distance to the next waypoint
+    lat_diff = current_waypoint[0] - latitude
+    lon_diff = current_waypoint[1] - longitude
+    distance = (lat_diff**2 + lon_diff**2)**0.5
+
+    # If close enough to the waypoint, move to the next one
+    reached = distance < 0.01  # Adjust this threshold as needed
+    if reached:
+        waypoint_index = (waypoint_index + 1) % len(route2_waypoints)
+
+    # Move towards the current waypoint (simplified simulation)
+    latitude += lat_diff * 0.005  # Increased step size for faster movement
+    longitude += lon_diff * 0.005
+    return latitude, longitude, waypoint_index, reached
+
+
+def drone_payload(drone_id, latitude, longitude):
+    return {
+        "BUNO_ID": drone_id,
+        "Drone_Model": "Model X",
+        "Manufacturer": "DroneCorp",
+        "Purchase_Date": "2023-01-01",
+        "Serial": "SN123456",
+        "Status": "Active",
+        "Status_Code": "A1",
+        "Altitude": round(random.uniform(100, 500), 2),  # Simulate flying altitude
+        "Latitude": latitude,
+        "Longitude": longitude
+    }
+
+
+def simulate_drone_flight(drone_id, api_url=API_URL):
+    waypoint_index = 0
+
+    # Initialize latitude and longitude
     latitude = 36.341631  # Start at Walton Blvd Walmart
     longitude = -94.198761
 
+    session = requests.Session()  # Reuses one keep-alive connection
     while True:
-        # Calculate distance to the next waypoint
-        lat_diff = current_waypoint[0] - latitude
-        lon_diff = current_waypoint[1] - longitude
-        distance = (lat_diff**2 + lon_diff**2)**0.5
-
-        # If close enough to the waypoint, move to the next one
-        if distance < 0.01:  # Adjust this threshold as needed
-            waypoint_index = (waypoint_index + 1) % len(route2_waypoints)
-            current_waypoint = route2_waypoints[waypoint_index]
-            print(f"Reached waypoint {waypoint_index + 1}: {current_waypoint}")
-
-        # Move towards the current waypoint (simplified simulation)
-        latitude += lat_diff * 0.005  # Increased step size for faster movement
-        longitude += lon_diff * 0.005
-
-        # Generate altitude within a specific range
-        altitude = round(random.uniform(100, 500), 2)  # Simulate flying altitude
-
-        drone_data = {
-            "BUNO_ID": drone_id,
-            "Drone_Model": "Model X",
-            "Manufacturer": "DroneCorp",
-            "Purchase_Date": "2023-01-01",
-            "Serial": "SN123456",
-            "Status": "Active",
-            "Status_Code": "A1",
-            "Altitude": altitude,
-            "Latitude": latitude,
-            "Longitude": longitude
-        }
-
-        response = requests.put(f"http://localhost:5000/api/drones/{drone_id}", json=drone_data)
+        latitude, longitude, waypoint_index, reached = move_towards_waypoint(latitude, longitude, waypoint_index)
+        if reached:
+            print(f"Reached waypoint {waypoint_index + 1}: {route2_waypoints[waypoint_index]}")
+
+        drone_data = drone_payload(drone_id, latitude, longitude)
+        response = session.put(f"{api_url}/drones/{drone_id}", json=drone_data)
         if response.status_code == 200:
             print(f"Updated drone {drone_id} data: {drone_data}")
         else:
@@ -60,6 +84,158 @@ def simulate_drone_flight(drone_id):
 
         time.sleep(0.9)
 
+
+# ---------------------------------------------------------
+# Load mode: many drones from one process
+# ---------------------------------------------------------
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.drone_updates = 0
+        self.max_lag = 0.0
+
+    def record(self, status, latency, updated):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latencies.append(latency)
+        self.drone_updates += updated
+
+    def report(self, elapsed):
+        latencies = sorted(self.latencies)
+        sent = len(latencies)
+        ok = self.statuses.get(200, 0)
+        print(f"{sent} requests in {elapsed:.1f}s: {sent / elapsed:.1f} req/s, "
+              f"{self.drone_updates / elapsed:.1f} drone updates/s")
+        print(f"status codes: {dict(sorted(self.statuses.items(), key=lambda item: str(item[0])))}, "
+              f"{sent - ok} failed")
+        print("latency ms: " + ", ".join(f"p{p} {percentile(latencies, p) * 1000:.1f}" for p in (50, 95, 99))
+              + f", max {latencies[-1] * 1000 if latencies else float('nan'):.1f}")
+        print(f"largest send delay behind schedule: {self.max_lag * 1000:.1f} ms")
+
+
+async def create_drones(session, api_url, drone_ids, connections):
+    # Drones that already exist are rejected by the POST and flown as they are.
+    # One worker per keep-alive connection takes the next ID as it finishes,
+    # so every connection is kept busy without a task per drone.
+    latitude, longitude = route2_waypoints[0]
+    remaining = iter(drone_ids)
+
+    async def worker():
+        created = 0
+        for drone_id in remaining:
+            async with session.post(f"{api_url}/drones", json=drone_payload(drone_id, latitude, longitude)) as response:
+                await response.read()
+                created += response.status == 201
+        return created
+
+    return sum(await asyncio.gather(*(worker() for _ in range(min(connections, len(drone_ids))))))
+
+
+async def fly_group(session, api_url, drone_ids, first_send, period, end, stats, batch):
+    """
+    Flies a group of drones, sending one request for the group every period seconds.
+
+    Latency is measured from the scheduled send time, so time spent waiting
+    for a free connection when the server falls behind is counted too.
+    """
+    states = {drone_id: (*route2_waypoints[0], 0) for drone_id in drone_ids}
+    loop = asyncio.get_running_loop()
+    scheduled = first_send
+    while scheduled < end:
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            stats.max_lag = max(stats.max_lag, -delay)
+
+        for drone_id, (latitude, longitude, waypoint_index) in states.items():
+            latitude, longitude, waypoint_index, _ = move_towards_waypoint(latitude, longitude, waypoint_index)
+            states[drone_id] = (latitude, longitude, waypoint_index)
+        try:
+            if batch:
+                body = [{"BUNO_ID": drone_id, "Latitude": latitude, "Longitude": longitude,
+                         "Altitude": round(random.uniform(100, 500), 2)}
+                        for drone_id, (latitude, longitude, _) in states.items()]
+                request = session.put(f"{api_url}/drones/batch", json=body)
+            else:
+                drone_id, (latitude, longitude, _) = next(iter(states.items()))
+                request = session.put(f"{api_url}/drones/{drone_id}",
+                                      json=drone_payload(drone_id, latitude, longitude))
+            async with request as response:
+                status = response.status
+                if batch and status == 200:
+                    updated = (await response.json())["updated"]  # Unknown drones fail individually
+                else:
+                    await response.read()
+                    updated = int(status == 200)
+        except aiohttp.ClientError as e:
+            status, updated = type(e).__name__, 0
+        stats.record(status, loop.time() - scheduled, updated)
+        scheduled += period
+
+
+async def run_load(api_url, drones, rate, duration, batch, connections, prefix, create):
+    drone_ids = [f"{prefix}{i:05d}" for i in range(1, drones + 1)]
+    groups = [drone_ids[i:i + batch] for i in range(0, drones, batch)]
+    period = len(groups) / rate  # Each group sends every period seconds, rate requests/s in all
+
+    connector = aiohttp.TCPConnector(limit=connections)  # Keep-alive connections shared by every drone
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if create:
+            created = await create_drones(session, api_url, drone_ids, connections)
+            print(f"Created {created} of {drones} drones")
+        stats = LoadStats()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        end = start + duration
+        # Stagger the groups evenly over one period so requests go out at a steady rate
+        await asyncio.gather(*(
+            fly_group(session, api_url, group, start + i / rate, period, end, stats, batch > 1)
+            for i, group in enumerate(groups)
+        ))
+        elapsed = loop.time() - start
+    print(f"{drones} drones, {len(groups)} request streams, target {rate:g} req/s, "
+          f"each drone updated every {period:.2f}s")
+    stats.report(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fly simulated drones along route 2 against the API.")
+    parser.add_argument("drone_id", nargs="?", help="fly this one drone (prompted for if no mode is given)")
+    parser.add_argument("--drones", type=int, help="load mode: fly this many drones concurrently")
+    parser.add_argument("--rate", type=float, default=100, help="target requests per second in load mode")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run load mode for")
+    parser.add_argument("--batch", type=int, default=1,
+                        help="drones per request; above 1 updates go through PUT /drones/batch")
+    parser.add_argument("--connections", type=int, default=50, help="keep-alive connections in load mode")
+    parser.add_argument("--prefix", default="LOAD-", help="BUNO_ID prefix of the load-mode drones")
+    parser.add_argument("--no-create", dest="create", action="store_false",
+                        help="do not POST the load-mode drones before flying them")
+    parser.add_argument("--url", default=API_URL, help="API base URL")
+    args = parser.parse_args()
+
+    if args.drones:
+        if aiohttp is None:
+            parser.error("load mode needs aiohttp: pip install aiohttp")
+        if args.rate <= 0 or args.batch < 1 or args.connections < 1:
+            parser.error("--rate must be positive, and --batch and --connections at least 1")
+        asyncio.run(run_load(args.url, args.drones, args.rate, args.duration, args.batch,
+                             args.connections, args.prefix, args.create))
+    else:
+        drone_id = args.drone_id or input("Enter Drone ID: ")
+        simulate_drone_flight(drone_id, args.url)
+
+
 if __name__ == "__main__":
-    drone_id = input("Enter Drone ID: ")
-    simulate_drone_flight(drone_id)
+    main()
@@ -3,11 +3,15 @@ from flask_cors import CORS
 from flasgger import Swagger # Only required if you want to use Swagger UI
 import yaml
 from API.routes import api_bp
+from API import compression
 from pathlib import Path
 
 def create_app():
     app = Flask(__name__)
     CORS(app)
+    # Keep model field order, as the streamed list responses do, instead of sorting keys
+    app.json.sort_keys = False
+    compression.init_app(app)  # gzip/br/zstd for responses over COMPRESS_MIN_SIZE
 
     # If you have provided an openapi.yaml file in the docs folder, load it
     if Path.exists(Path("drone-api.yaml")):
@@ -0,0 +1,35 @@
+"""
+Shared fixtures. The API reads DRONE_DB_PATH when it is first imported, so
+a scratch copy of the shipped database is set up here, before any test
+module imports it; the real database is never written.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SCRATCH = Path(tempfile.mkdtemp(prefix="drone-api-tests-"))
+shutil.copyfile(ROOT / "data" / "drone_data.db", SCRATCH / "drone_data.db")
+os.environ["DRONE_DB_PATH"] = str(SCRATCH / "drone_data.db")
+# Accepted drone updates stay in memory until a test flushes them
+os.environ["DRONE_FLUSH_INTERVAL"] = "3600"
+# Registered before the API's own exit handler, so it runs after the final flush
+atexit.register(shutil.rmtree, SCRATCH, ignore_errors=True)
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session")
+def app():
+    from run import create_app
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
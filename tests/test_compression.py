@@ -0,0 +1,59 @@
+import gzip
+
+import pytest
+
+
+def get(client, path, encoding=None, **headers):
+    if encoding is not None:
+        headers["Accept-Encoding"] = encoding
+    response = client.get(path, headers=headers)
+    response.get_data()  # Run streamed bodies to the end so their request context is released
+    return response
+
+
+@pytest.mark.parametrize("path", ["/api/drones", "/api/routes", "/api/flight_plans/flight_plans_with_routes"])
+def test_gzip_bodies_decompress_to_the_identity_body(client, path):
+    plain = get(client, path)
+    packed = get(client, path, "br;q=0.5, gzip")
+    assert plain.status_code == packed.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in packed.headers["Vary"] and "Accept-Encoding" in plain.headers["Vary"]
+    assert gzip.decompress(packed.get_data()) == plain.get_data()
+    assert len(packed.get_data()) < len(plain.get_data())
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip;q=0", "compress", "*;q=0"])
+def test_unaccepted_encodings_are_not_used(client, encoding):
+    response = get(client, "/api/drones", encoding)
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+def test_small_bodies_and_errors_are_sent_as_they_are(client, app, monkeypatch):
+    small = get(client, "/api/pilots/PILOT-002", "gzip")
+    assert len(small.get_data()) < app.config["COMPRESS_MIN_SIZE"]
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in get(client, "/api/pilots/PILOT-404", "gzip").headers
+
+    monkeypatch.setitem(app.config, "COMPRESS_MIN_SIZE", 1)
+    response = get(client, "/api/pilots/PILOT-002", "gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()) == small.get_data()
+
+    # A streamed list that ends before reaching the minimum size
+    monkeypatch.setitem(app.config, "COMPRESS_MIN_SIZE", 1 << 20)
+    streamed = get(client, "/api/drones", "gzip")
+    assert "Content-Encoding" not in streamed.headers
+    assert streamed.get_data() == get(client, "/api/drones").get_data()
+
+
+def test_compressed_responses_carry_a_weak_etag_that_revalidates_either_way(client):
+    plain = get(client, "/api/routes")
+    packed = get(client, "/api/routes", "gzip")
+    assert not plain.headers["ETag"].startswith("W/")
+    assert packed.headers["ETag"] == f'W/{plain.headers["ETag"]}'
+
+    assert get(client, "/api/routes", "gzip", **{"If-None-Match": packed.headers["ETag"]}).status_code == 304
+    assert get(client, "/api/routes", **{"If-None-Match": packed.headers["ETag"]}).status_code == 304
+    assert get(client, "/api/routes", "gzip", **{"If-None-Match": plain.headers["ETag"]}).status_code == 304
@@ -0,0 +1,58 @@
+def get(client, path, **kwargs):
+    response = client.get(path, **kwargs)
+    response.get_data()  # Run streamed bodies to the end so their request context is released
+    return response
+
+
+def revalidate(client, path, etag):
+    return get(client, path, headers={"If-None-Match": etag})
+
+
+def test_unchanged_tables_answer_304_without_a_body(client):
+    first = get(client, "/api/pilots/PILOT-002")
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    for etag in (first.headers["ETag"], f'W/{first.headers["ETag"]}', f'"other", {first.headers["ETag"]}', "*"):
+        response = revalidate(client, "/api/pilots/PILOT-002", etag)
+        assert response.status_code == 304, etag
+        assert response.get_data() == b""
+        assert response.headers["ETag"] == first.headers["ETag"]
+
+    assert revalidate(client, "/api/pilots/PILOT-002", '"other"').status_code == 200
+
+
+def test_etags_differ_by_url(client):
+    etags = {get(client, path).headers["ETag"]
+             for path in ("/api/pilots", "/api/pilots?limit=2", "/api/pilots/PILOT-002", "/api/pilots/PILOT-003")}
+    assert len(etags) == 4
+    missing = get(client, "/api/pilots/PILOT-404")
+    assert missing.status_code == 404 and "ETag" not in missing.headers
+
+
+def test_a_write_changes_only_the_etags_of_its_table(client):
+    pilot = get(client, "/api/pilots/PILOT-003")
+    pilots = get(client, "/api/pilots")
+    routes = get(client, "/api/routes")
+    drone = get(client, "/api/drones/DR-003")
+
+    changed = dict(pilot.get_json(), Pilot_Hours=pilot.get_json()["Pilot_Hours"] + 1)
+    assert client.put("/api/pilots/PILOT-003", json=changed).status_code == 200
+
+    response = revalidate(client, "/api/pilots/PILOT-003", pilot.headers["ETag"])
+    assert response.status_code == 200
+    assert response.get_json() == changed
+    assert response.headers["ETag"] != pilot.headers["ETag"]
+    assert revalidate(client, "/api/pilots/PILOT-003", response.headers["ETag"]).status_code == 304
+    assert revalidate(client, "/api/pilots", pilots.headers["ETag"]).status_code == 200
+    assert revalidate(client, "/api/routes", routes.headers["ETag"]).status_code == 304
+    assert revalidate(client, "/api/drones/DR-003", drone.headers["ETag"]).status_code == 304
+
+
+def test_drone_etags_follow_the_in_memory_fleet(client):
+    drone = get(client, "/api/drones/DR-004")
+    pilots = get(client, "/api/pilots")
+    assert client.put("/api/drones/DR-004", json=dict(drone.get_json(), Altitude=777)).status_code == 200
+
+    response = revalidate(client, "/api/drones/DR-004", drone.headers["ETag"])
+    assert response.status_code == 200 and response.get_json()["Altitude"] == 777
+    assert revalidate(client, "/api/pilots", pilots.headers["ETag"]).status_code == 304
@@ -0,0 +1,141 @@
+import base64
+import json
+
+
+def drone(client, buno_id):
+    response = client.get(f"/api/drones/{buno_id}")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_batch_applies_valid_items_and_reports_invalid_ones(client):
+    before = drone(client, "DR-002")
+    response = client.put("/api/drones/batch", json=[
+        {"BUNO_ID": "DR-001", "Altitude": 150, "Latitude": 36.40, "Longitude": -94.20},
+        {"BUNO_ID": "DR-002", "Altitude": 150, "Latitude": "abc", "Longitude": -94.20},
+        {"BUNO_ID": ["DR-003"], "Altitude": 150, "Latitude": 36.40, "Longitude": -94.20},
+        {"BUNO_ID": "DR-004", "Altitude": 150, "Latitude": 91, "Longitude": -94.20},
+        {"BUNO_ID": "DR-999", "Altitude": 150, "Latitude": 36.40, "Longitude": -94.20},
+        "not an object",
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["updated"], body["failed"]) == (1, 5)
+    assert [result["updated"] for result in body["results"]] == [True, False, False, False, False, False]
+    assert body["results"][1]["error"] == "Latitude must be a number"
+    assert body["results"][2] == {"BUNO_ID": None, "updated": False, "error": "BUNO_ID must be a string"}
+    assert body["results"][3]["error"] == "Latitude must be between -90 and 90"
+    assert body["results"][4]["error"] == "Drone not found"
+
+    assert drone(client, "DR-001")["Latitude"] == 36.40
+    assert drone(client, "DR-002") == before
+
+
+def test_drone_pages_follow_the_cursor_and_reject_non_string_ones(client):
+    first = client.get("/api/drones?limit=3")
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"/api/drones?limit=3&after={cursor}")
+    assert second.status_code == 200
+    assert second.get_json()[0]["BUNO_ID"] > first.get_json()[-1]["BUNO_ID"]
+
+    numeric = base64.urlsafe_b64encode(json.dumps([123]).encode()).decode()
+    response = client.get(f"/api/drones?limit=3&after={numeric}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid pagination parameters: Invalid cursor"}
+
+
+def test_invalid_drone_update_changes_nothing(client):
+    before = drone(client, "DR-005")
+    pending = client.get("/api/stats/fleet_state").get_json()["dirty"]
+    nearest = client.get(f"/api/drones/nearest?lat={before['Latitude']}&lon={before['Longitude']}&k=1")
+
+    response = client.put("/api/drones/DR-005", json=dict(before, Latitude="abc", Status="Down"))
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid drone data: DR-005: Latitude must be a number"}
+    assert client.put("/api/drones/DR-005", json={"Status": ["Down"]}).status_code == 400
+
+    assert drone(client, "DR-005") == before
+    assert client.get("/api/stats/fleet_state").get_json()["dirty"] == pending
+    assert client.get(f"/api/drones/nearest?lat={before['Latitude']}&lon={before['Longitude']}&k=1"
+                      ).get_json() == nearest.get_json()
+
+
+def test_within_sees_a_moved_drone_before_it_is_flushed(client):
+    before = drone(client, "DR-006")
+    old_area = (f"/api/drones/within?bbox={before['Longitude'] - 0.001},{before['Latitude'] - 0.001},"
+                f"{before['Longitude'] + 0.001},{before['Latitude'] + 0.001}")
+    new_area = "/api/drones/within?bbox=170.4,-40.6,170.6,-40.4"
+    assert "DR-006" in [found["BUNO_ID"] for found in client.get(old_area).get_json()]
+    stale = client.get(new_area)
+    assert stale.get_json() == []
+
+    moved = dict(before, Latitude=-40.5, Longitude=170.5)
+    assert client.put("/api/drones/DR-006", json=moved).status_code == 200
+
+    response = client.get(new_area, headers={"If-None-Match": stale.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.get_json() == [moved]
+    assert "DR-006" not in [found["BUNO_ID"] for found in client.get(old_area).get_json()]
+    radius = client.get("/api/drones/within?lat=-40.5&lon=170.51&radius_m=1000").get_json()
+    assert [found["BUNO_ID"] for found in radius] == ["DR-006"]
+
+
+def test_nearest_rejects_points_off_the_globe_and_unbounded_k(client):
+    found = client.get("/api/drones/nearest?lat=36.37&lon=-94.21&k=3").get_json()
+    assert len(found) == 3 and found[0]["Distance_m"] <= found[-1]["Distance_m"]
+    for query in ("lat=nan&lon=-94.21", "lat=200&lon=-94.21", "lat=36.37&lon=-181", "lat=inf&lon=0",
+                  "lat=36.37&lon=-94.21&k=0", "lat=36.37&lon=-94.21&k=1001", "lon=-94.21"):
+        assert client.get(f"/api/drones/nearest?{query}").status_code == 400, query
+
+
+def test_within_rejects_areas_off_the_globe(client):
+    assert client.get("/api/drones/within?bbox=-180,-90,180,90").status_code == 200
+    assert client.get("/api/drones/within?lat=36.37&lon=-94.21&radius_m=0").status_code == 200
+    for query in ("bbox=nan,36,-94,37", "bbox=-95,36,-94,nan", "bbox=-95,36,-94", "bbox=-95,37,-94,36",
+                  "bbox=-181,36,-94,37", "bbox=-95,36,-94,91", "lat=36.37&lon=-94.21&radius_m=inf",
+                  "lat=36.37&lon=-94.21&radius_m=nan", "lat=36.37&lon=-94.21&radius_m=-1",
+                  "lat=91&lon=-94.21&radius_m=10", "lat=nan&lon=-94.21&radius_m=10"):
+        assert client.get(f"/api/drones/within?{query}").status_code == 400, query
+
+
+def test_distance_matrix_matches_haversine_and_is_capped(client, monkeypatch):
+    from API import geo, services
+
+    response = client.get("/api/dispatch/distances")
+    assert response.status_code == 200
+    matrix = response.get_json()
+    assert matrix["BUNO_IDs"] and matrix["Route_IDs"]
+    starts = {route_id: (lat, lon) for route_id, lat, lon in services.get_route_starts()}
+    for buno_id, row in zip(matrix["BUNO_IDs"], matrix["Distances_m"]):
+        position = drone(client, buno_id)
+        assert len(row) == len(matrix["Route_IDs"])
+        for route_id, distance in zip(matrix["Route_IDs"], row):
+            expected = geo.haversine_m(position["Latitude"], position["Longitude"], *starts[route_id])
+            assert abs(distance - expected) <= 1
+
+    monkeypatch.setattr(services, "MAX_MATRIX_CELLS", len(matrix["BUNO_IDs"]) * len(matrix["Route_IDs"]) - 1)
+    assert client.get("/api/dispatch/distances").status_code == 400
+    one_route = client.get(f"/api/dispatch/distances?route_id={matrix['Route_IDs'][0]}")
+    assert one_route.status_code == 200
+    assert [row[0] for row in one_route.get_json()["Distances_m"]] == [row[0] for row in matrix["Distances_m"]]
+
+
+def test_filtered_drone_reads_see_unflushed_updates(client):
+    from API import services
+
+    before = drone(client, "DR-007")
+    changed = dict(before, Status="Grounded", Manufacturer="Acme Aerial", Purchase_Date="2030-01-01")
+    assert client.put("/api/drones/DR-007", json=changed).status_code == 200
+
+    assert [found.BUNO_ID for found in services.get_drones_by_status("Grounded")] == ["DR-007"]
+    assert [found.BUNO_ID for found in services.get_drones_by_manufacturer("Acme Aerial")] == ["DR-007"]
+    assert [found.BUNO_ID for found in services.get_drones_purchased_after("2029-12-31")] == ["DR-007"]
+
+    listed = client.get("/api/drones").get_json()
+    assert ([found.BUNO_ID for found in services.get_drones_purchased_after("2023-06-01")]
+            == [item["BUNO_ID"] for item in listed if item["Purchase_Date"] > "2023-06-01"])
+    assert ([found.BUNO_ID for found in services.get_drones_by_status("Active")]
+            == [item["BUNO_ID"] for item in listed if item["Status"] == "Active"])
+    assert client.put("/api/drones/DR-007", json=before).status_code == 200
+    assert services.get_drones_by_status("Grounded") == []
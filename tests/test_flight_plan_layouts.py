@@ -0,0 +1,56 @@
+import os
+import sqlite3
+
+import pytest
+
+PATH = "/api/flight_plans/flight_plans_with_routes"
+WAYPOINT_COLUMNS = ("Waypoint_ID", "Latitude", "Longitude")
+
+
+def layout(client, name):
+    response = client.get(f"{PATH}?layout={name}")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def flatten(plans, waypoints):
+    rows = []
+    for plan in plans:
+        fields = {key: value for key, value in plan.items() if key != "Waypoints"}
+        rows.extend(dict(fields, **waypoint) for waypoint in waypoints(plan["Waypoints"]))
+    return rows
+
+
+def test_nested_and_columnar_hold_the_flat_rows_in_the_same_order(client):
+    flat = layout(client, "flat")
+    assert flat == client.get(PATH).get_json()
+    nested = layout(client, "nested")
+    columnar = layout(client, "columnar")
+
+    assert flatten(nested, lambda waypoints: waypoints) == flat
+    assert flatten(columnar, lambda waypoints: (dict(zip(WAYPOINT_COLUMNS, values))
+                                                for values in zip(*map(waypoints.get, WAYPOINT_COLUMNS)))) == flat
+    assert [list(plan) for plan in nested] == [list(plan) for plan in columnar]
+    assert all(len(set(map(len, plan["Waypoints"].values()))) == 1 for plan in columnar)
+
+
+def test_every_joined_plan_appears_once(client):
+    with sqlite3.connect(os.environ["DRONE_DB_PATH"]) as conn:
+        rows, plans = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT fp.rowid) FROM flight_plans fp JOIN routes r ON fp.Route_ID = r.Route_ID"
+        ).fetchone()
+    conn.close()
+    assert len(layout(client, "flat")) == rows
+    assert len(layout(client, "nested")) == len(layout(client, "columnar")) == plans
+
+
+@pytest.mark.parametrize("name", ["Nested", "rows", ""])
+def test_unknown_layouts_are_rejected(client, name):
+    response = client.get(f"{PATH}?layout={name}")
+    assert response.status_code == 400
+    assert "flat, nested, columnar" in response.get_json()["error"]
+
+
+def test_each_layout_has_its_own_etag(client):
+    etags = {client.get(f"{PATH}?layout={name}").headers["ETag"] for name in ("flat", "nested", "columnar")}
+    assert len(etags) == 3
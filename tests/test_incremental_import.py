@@ -0,0 +1,48 @@
+import csv
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "utility"))
+import create_db  # noqa: E402
+
+
+def drone_rows():
+    with sqlite3.connect(os.environ["DRONE_DB_PATH"]) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute("SELECT * FROM drones ORDER BY rowid")]
+
+
+def test_incremental_import_with_the_api_running(client, tmp_path):
+    from API.live_state import fleet
+
+    moved = {"BUNO_ID": "DR-012", "Altitude": 321, "Latitude": 36.5, "Longitude": -94.5}
+    assert client.put("/api/drones/batch", json=[moved]).get_json()["updated"] == 1
+
+    # The CSV export changes DR-012's status, drops DR-013 and adds DR-NEW
+    rows = [dict(row, Status="Down") if row["BUNO_ID"] == "DR-012" else row
+            for row in drone_rows() if row["BUNO_ID"] != "DR-013"]
+    rows.append(dict(rows[0], BUNO_ID="DR-NEW", Serial="SN-NEW"))
+    with open(tmp_path / "drone.csv", "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    counts = create_db.sync_database(tmp_path, Path(os.environ["DRONE_DB_PATH"]))
+    assert counts["drones"]["inserted"] == 1 and counts["drones"]["deleted"] == 1
+
+    # Flushing the API's pending position keeps the imported status
+    fleet.flush()
+    stored = next(row for row in drone_rows() if row["BUNO_ID"] == "DR-012")
+    assert stored["Status"] == "Down"
+    assert (stored["Altitude"], stored["Latitude"], stored["Longitude"]) == (321, 36.5, -94.5)
+
+    assert client.get("/api/drones/DR-NEW").status_code == 404
+    response = client.post("/api/fleet_state/reload")
+    assert response.status_code == 200
+    assert response.get_json() == {"added": 1, "updated": 1, "deleted": 1}
+
+    assert client.get("/api/drones/DR-NEW").status_code == 200
+    assert client.get("/api/drones/DR-013").status_code == 404
+    assert client.get("/api/drones/DR-012").get_json() == dict(stored, Status="Down")
+    assert "DR-NEW" in [drone["BUNO_ID"] for drone in client.get("/api/drones").get_json()]
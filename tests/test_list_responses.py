@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+
+def keys(response):
+    assert response.status_code == 200
+    return [list(item) for item in json.loads(response.get_data())]
+
+
+@pytest.mark.parametrize("path, ids", [
+    ("/api/drones", "DR-001,DR-002"),
+    ("/api/pilots", "PILOT-001,PILOT-002"),
+    ("/api/flight_plans", "FP-001,FP-002"),
+    ("/api/drones?fields=Latitude,BUNO_ID", "DR-001,DR-002"),
+])
+def test_streamed_paged_and_multi_get_lists_share_key_order(client, path, ids):
+    separator = "&" if "?" in path else "?"
+    streamed = keys(client.get(path))
+    paged = keys(client.get(f"{path}{separator}limit=2"))
+    fetched = keys(client.get(f"{path}{separator}ids={ids}"))
+    assert paged == fetched == streamed[:2]
+
+
+def test_single_items_share_the_list_key_order(client):
+    assert list(client.get("/api/drones/DR-001").get_json()) == keys(client.get("/api/drones?limit=1"))[0]
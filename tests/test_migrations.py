@@ -0,0 +1,39 @@
+import sqlite3
+
+import pytest
+
+from API import migrations
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    migrations.migrate(conn, target=1)
+    yield conn
+    conn.close()
+
+
+def test_new_database_migrates_to_the_latest_version(conn):
+    migrations.migrate(conn)
+    assert migrations.current_version(conn) == migrations.LATEST_VERSION
+
+
+def test_duplicate_keys_stop_the_migration_with_a_message_naming_them(conn):
+    conn.executemany("INSERT INTO drones (BUNO_ID) VALUES (?)", [("DR-001",), ("DR-001",), ("DR-002",)])
+    with pytest.raises(sqlite3.IntegrityError) as error:
+        migrations.migrate(conn)
+    message = str(error.value)
+    assert "drones has 1 duplicate key(s) on (BUNO_ID)" in message
+    assert "DR-001 (2 rows)" in message
+    assert "DELETE FROM drones WHERE rowid NOT IN" in message
+    assert migrations.current_version(conn) == 1
+
+    conn.execute("DELETE FROM drones WHERE rowid NOT IN (SELECT MIN(rowid) FROM drones GROUP BY BUNO_ID)")
+    migrations.migrate(conn)
+    assert migrations.current_version(conn) == migrations.LATEST_VERSION
+
+
+def test_rows_without_a_key_are_not_duplicates(conn):
+    conn.executemany("INSERT INTO routes (Route_ID, Waypoint_ID) VALUES (?, ?)", [("RT-001", None)] * 2)
+    migrations.migrate(conn)
+    assert migrations.current_version(conn) == migrations.LATEST_VERSION
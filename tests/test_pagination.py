@@ -0,0 +1,41 @@
+import base64
+import json
+
+import pytest
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+@pytest.mark.parametrize("path, key", [
+    ("/api/routes", ["Route_ID", "Waypoint_ID"]),
+    ("/api/pilots", ["Pilot_ID"]),
+    ("/api/flight_plans", ["Flight_Plan_ID"]),
+])
+def test_pages_follow_the_cursor(client, path, key):
+    first = client.get(f"{path}?limit=3")
+    assert first.status_code == 200
+    second = client.get(f"{path}?limit=3&after={first.headers['X-Next-Cursor']}")
+    assert second.status_code == 200
+    last, following = first.get_json()[-1], second.get_json()[0]
+    assert [following[column] for column in key] >= [last[column] for column in key]
+    assert following != last
+
+
+@pytest.mark.parametrize("path, after", [
+    ("/api/routes", [{"a": 1}, 1, 2]),
+    ("/api/routes", ["RT-001", None, 1]),
+    ("/api/routes", ["RT-001", "1"]),
+    ("/api/pilots", [["PILOT-001"], 1]),
+    ("/api/flight_plans", ["FP-001", {"rowid": 1}]),
+])
+def test_malformed_cursors_are_rejected(client, path, after):
+    response = client.get(f"{path}?limit=3&after={cursor(after)}")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid pagination parameters: Invalid cursor"}
+
+
+def test_undecodable_cursor_is_rejected(client):
+    response = client.get("/api/routes?limit=3&after=not-a-cursor")
+    assert response.status_code == 400
@@ -0,0 +1,30 @@
+import os
+import sqlite3
+
+HOURS = "/api/pilots/hours?min=0&max=100000"
+
+
+def hours(response, pilot_id):
+    return next(pilot["Pilot_Hours"] for pilot in response.get_json() if pilot["Pilot_ID"] == pilot_id)
+
+
+def test_cached_results_follow_writes_made_outside_the_api(client):
+    first = client.get(HOURS)
+    assert client.get(HOURS).headers["ETag"] == first.headers["ETag"]
+
+    with sqlite3.connect(os.environ["DRONE_DB_PATH"]) as conn:
+        conn.execute("UPDATE pilots SET Pilot_Hours = 42 WHERE Pilot_ID = 'PILOT-004'")
+    conn.close()
+
+    response = client.get(HOURS, headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != first.headers["ETag"]
+    assert hours(response, "PILOT-004") == 42 == client.get("/api/pilots/PILOT-004").get_json()["Pilot_Hours"]
+    assert client.get(HOURS, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_reloading_the_fleet_state_empties_the_query_cache(client):
+    client.get(HOURS)
+    assert client.get("/api/stats/cache").get_json()["entries"] > 0
+    assert client.post("/api/fleet_state/reload").status_code == 200
+    assert client.get("/api/stats/cache").get_json()["entries"] == 0
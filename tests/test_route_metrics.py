@@ -0,0 +1,56 @@
+import math
+
+from API import geo
+
+
+def metrics(client, route_id, etag=None):
+    return client.get(f"/api/routes/{route_id}/metrics", headers={"If-None-Match": etag} if etag else {})
+
+
+def expected_length(client, route_id):
+    waypoints = client.get(f"/api/routes/{route_id}").get_json()
+    points = [(waypoint["Latitude"], waypoint["Longitude"]) for waypoint in waypoints]
+    return math.fsum(geo.haversine_m(*start, *end) for start, end in zip(points, points[1:]))
+
+
+def test_metrics_follow_the_waypoints(client):
+    result = metrics(client, "RT-004").get_json()
+    assert result["Waypoint_Count"] == 6
+    assert len(result["Legs"]) == 5
+    assert abs(result["Length_m"] - expected_length(client, "RT-004")) <= 0.1
+    assert math.isclose(math.fsum(leg["Distance_m"] for leg in result["Legs"]), result["Length_m"], abs_tol=0.5)
+    assert result["BBox"] == {"Min_Latitude": 36.098765, "Min_Longitude": -94.345678,
+                              "Max_Latitude": 36.512345, "Max_Longitude": -93.678901}
+    assert client.get("/api/routes/RT-404/metrics").status_code == 404
+
+
+def test_waypoint_writes_replace_the_cached_metrics(client):
+    waypoints = [("1", 36.30, -94.20), ("2", 36.40, -94.20), ("3", 36.40, -94.10)]
+    for waypoint_id, lat, lon in waypoints:
+        response = client.post(f"/api/routes/RT-900/{waypoint_id}", json={"Latitude": lat, "Longitude": lon})
+        assert response.status_code == 201
+    first = metrics(client, "RT-900")
+    assert first.status_code == 200
+    other = metrics(client, "RT-004")
+    assert first.get_json()["Waypoint_Count"] == 3
+    assert metrics(client, "RT-900", first.headers["ETag"]).status_code == 304
+    hits = client.get("/api/stats/cache").get_json()["hits"]
+    assert metrics(client, "RT-900").get_json() == first.get_json()
+    assert client.get("/api/stats/cache").get_json()["hits"] == hits + 1
+
+    assert client.put("/api/routes/RT-900/3", json={"Latitude": 36.50, "Longitude": -94.20}).status_code == 200
+    moved = metrics(client, "RT-900", first.headers["ETag"])
+    assert moved.status_code == 200 and moved.headers["ETag"] != first.headers["ETag"]
+    assert moved.get_json()["BBox"]["Max_Latitude"] == 36.50
+    assert abs(moved.get_json()["Length_m"] - expected_length(client, "RT-900")) <= 0.1
+    assert metrics(client, "RT-004").get_json() == other.get_json()
+
+    assert client.post("/api/routes/RT-900/4", json={"Latitude": 36.30, "Longitude": -94.20}).status_code == 201
+    added = metrics(client, "RT-900").get_json()
+    assert added["Waypoint_Count"] == 4 and added["Legs"][-1]["To"] == "4"
+
+    assert client.delete("/api/routes/RT-900/2").status_code == 200
+    assert [leg["From"] for leg in metrics(client, "RT-900").get_json()["Legs"]] == ["1", "3"]
+
+    assert client.delete("/api/routes/RT-900").status_code == 200
+    assert client.get("/api/routes/RT-900/metrics").status_code == 404
@@ -0,0 +1,84 @@
+import math
+import random
+
+from urllib.parse import quote
+
+import pytest
+
+from API import geo
+
+
+def segment_distance_m(point, start, end):
+    # Planar distance on a tangent plane at the start, fine at the few-kilometre scale used here
+    scale = math.radians(geo.EARTH_RADIUS_M)
+    x_scale = scale * math.cos(math.radians(start[0]))
+    px, py = (point[1] - start[1]) * x_scale, (point[0] - start[0]) * scale
+    dx, dy = (end[1] - start[1]) * x_scale, (end[0] - start[0]) * scale
+    length_sq = dx * dx + dy * dy
+    t = max(0.0, min(1.0, (px * dx + py * dy) / length_sq)) if length_sq else 0.0
+    return math.hypot(px - t * dx, py - t * dy)
+
+
+@pytest.fixture
+def path():
+    rng = random.Random(11)
+    lat, lon, points = 36.37, -94.21, []
+    for _ in range(400):
+        lat += rng.gauss(0, 0.0005)
+        lon += rng.gauss(0, 0.0005)
+        points.append((lat, lon))
+    return points
+
+
+@pytest.mark.parametrize("tolerance_m", [1, 10, 50, 250])
+def test_dropped_points_stay_within_the_tolerance(path, tolerance_m):
+    kept = geo.simplify_path(path, tolerance_m)
+    assert kept[0] == 0 and kept[-1] == len(path) - 1 and kept == sorted(set(kept))
+    for start, end in zip(kept, kept[1:]):
+        for i in range(start + 1, end):
+            assert segment_distance_m(path[i], path[start], path[end]) <= tolerance_m * 1.001
+
+
+def test_larger_tolerances_keep_fewer_points(path):
+    counts = [len(geo.simplify_path(path, tolerance_m)) for tolerance_m in (0, 1, 10, 100, 1000, 1e9)]
+    assert counts[0] == len(path)
+    assert counts == sorted(counts, reverse=True)
+    assert counts[-1] == 2
+    assert geo.simplify_path(path[:2], 1e9) == [0, 1]
+    assert geo.simplify_path([], 10) == []
+
+
+def test_pixel_size_halves_with_each_zoom_level():
+    assert geo.pixel_size_m(0, 0) == pytest.approx(2 * math.pi * geo.EARTH_RADIUS_M / 256)
+    assert geo.pixel_size_m(1, 60) == pytest.approx(geo.pixel_size_m(0, 0) / 4)
+
+
+def waypoint_ids(client, query):
+    response = client.get(f"/api/routes/RT-002?{query}")
+    assert response.status_code == 200
+    return [waypoint["Waypoint_ID"] for waypoint in response.get_json()]
+
+
+def test_route_detail_grows_with_zoom(client):
+    full = [waypoint["Waypoint_ID"] for waypoint in client.get("/api/routes/RT-002").get_json()]
+    by_zoom = [waypoint_ids(client, f"zoom={zoom}") for zoom in range(0, 23)]
+    assert by_zoom[0] == [full[0], full[-1]]
+    assert by_zoom[-1] == waypoint_ids(client, "tolerance_m=0") == full
+    for coarser, finer in zip(by_zoom, by_zoom[1:]):
+        assert set(coarser) <= set(finer)
+    assert waypoint_ids(client, "zoom=22&tolerance_m=1e9") == by_zoom[0]
+    assert waypoint_ids(client, "zoom=5&fields=Waypoint_ID") == by_zoom[5]
+
+
+@pytest.mark.parametrize("query", ["zoom=23", "zoom=-1", "zoom=1.5", "zoom=x", "tolerance_m=-1", "tolerance_m=nan"])
+def test_invalid_levels_of_detail_are_rejected(client, query):
+    assert client.get(f"/api/routes/RT-002?{query}").status_code == 400
+
+
+def test_simplified_routes_follow_waypoint_updates(client):
+    before = client.get("/api/routes/RT-005?zoom=0").get_json()
+    first = before[0]
+    moved = {"Latitude": first["Latitude"] + 0.01, "Longitude": first["Longitude"]}
+    assert client.put(f"/api/routes/RT-005/{quote(first['Waypoint_ID'])}", json=moved).status_code == 200
+    after = client.get("/api/routes/RT-005?zoom=0").get_json()
+    assert after[0]["Latitude"] == moved["Latitude"]
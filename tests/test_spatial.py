@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from API import geo
+from API.model import Drone
+from API.spatial import GridIndex
+
+STATUSES = ["Active", "Maintenance"]
+
+
+def make_drone(buno_id, lat, lon, status="Active"):
+    return Drone(buno_id, "Model X", "DroneCorp", "2023-01-01", "1", status, "A1", 100, lat, lon)
+
+
+def brute_force(drones, lat, lon, k, status=None):
+    distances = sorted((geo.haversine_m(lat, lon, drone.Latitude, drone.Longitude), drone.BUNO_ID)
+                       for drone in drones.values()
+                       if drone.Latitude is not None and (status is None or drone.Status == status))
+    return distances[:k]
+
+
+@pytest.fixture
+def fleet():
+    # Clusters like the generated fleet, a sparse global scatter, and drones on the edges of the map
+    rng = random.Random(7)
+    drones = {}
+    for i in range(3000):
+        lat, lon = rng.gauss(36.37, 0.05), rng.gauss(-94.21, 0.05)
+        drones[f"C-{i}"] = make_drone(f"C-{i}", lat, lon, rng.choice(STATUSES))
+    for i in range(300):
+        drones[f"G-{i}"] = make_drone(f"G-{i}", rng.uniform(-90, 90), rng.uniform(-180, 180), rng.choice(STATUSES))
+    for i, (lat, lon) in enumerate([(90, 0), (-90, 45), (0, 180), (0, -180), (10, 179.9999), (-10, -179.9999)]):
+        drones[f"E-{i}"] = make_drone(f"E-{i}", lat, lon)
+    return drones
+
+
+def check_against_brute_force(index, drones, queries):
+    for lat, lon, k, status in queries:
+        expected = brute_force(drones, lat, lon, k, status)
+        found = index.nearest(lat, lon, k, status)
+        assert [round(distance, 3) for distance, _ in found] == [round(distance, 3) for distance, _ in expected]
+        for distance, buno_id in found:
+            drone = drones[buno_id]
+            assert distance == pytest.approx(geo.haversine_m(lat, lon, drone.Latitude, drone.Longitude), abs=1e-3)
+
+
+def test_nearest_matches_brute_force(fleet):
+    index = GridIndex()
+    index.rebuild(fleet.values())
+    rng = random.Random(11)
+    queries = [(rng.gauss(36.37, 0.05), rng.gauss(-94.21, 0.05), rng.choice([1, 5, 50]), rng.choice([None] + STATUSES))
+               for _ in range(200)]
+    queries += [(rng.uniform(-90, 90), rng.uniform(-180, 180), rng.choice([1, 5]), None) for _ in range(100)]
+    queries += [(-36.37, 85.79, 5, None), (89.99, 10, 3, None), (0, -179.99, 3, None), (0, 180, 3, "Active")]
+    check_against_brute_force(index, fleet, queries)
+
+
+def test_nearest_follows_moves_status_changes_and_removals(fleet):
+    index = GridIndex()
+    index.rebuild(fleet.values())
+    rng = random.Random(13)
+    for buno_id in rng.sample(sorted(fleet), 1000):
+        drone = fleet[buno_id]
+        moved = make_drone(buno_id, max(-90, min(90, drone.Latitude + rng.gauss(0, 0.01))),
+                           (drone.Longitude + rng.gauss(0, 0.01) + 180) % 360 - 180, rng.choice(STATUSES))
+        fleet[buno_id] = moved
+        index.upsert(moved)
+    for buno_id in rng.sample(sorted(fleet), 300):
+        index.remove(buno_id)
+        del fleet[buno_id]
+    fleet["C-0"] = make_drone("C-0", None, None)
+    index.upsert(fleet["C-0"])
+
+    assert len(index) == len(fleet) - 1
+    queries = [(rng.gauss(36.37, 0.05), rng.gauss(-94.21, 0.05), 5, rng.choice([None] + STATUSES)) for _ in range(100)]
+    check_against_brute_force(index, fleet, queries)
+
+
+def test_nearest_without_candidates():
+    index = GridIndex()
+    assert index.nearest(36.37, -94.21, 5) == []
+    index.upsert(make_drone("DR-1", 36.37, -94.21, "Active"))
+    assert index.nearest(36.37, -94.21, 5, "Retired") == []
+    assert index.nearest(36.37, -94.21, 0) == []
+    index.upsert(make_drone("DR-1", 36.37, -94.21, "Retired"))
+    assert index.nearest(36.37, -94.21, 5, "Active") == []
+    assert [buno_id for _, buno_id in index.nearest(-36.37, 85.79, 5, "Retired")] == ["DR-1"]
+
+
+def test_box_and_radius_searches_match_brute_force(fleet):
+    index = GridIndex()
+    index.rebuild(fleet.values())
+    rng = random.Random(17)
+    boxes = [(36.3, -94.3, 36.4, -94.2), (-90, -180, 90, 180), (-10, 179.9, 10, 180), (89, -180, 90, 180)]
+    for _ in range(50):
+        south, north = sorted([rng.gauss(36.37, 0.1) for _ in range(2)])
+        west, east = sorted([rng.gauss(-94.21, 0.1) for _ in range(2)])
+        boxes.append((south, west, north, east))
+    for min_lat, min_lon, max_lat, max_lon in boxes:
+        assert index.within_bbox(min_lat, min_lon, max_lat, max_lon) == sorted(
+            buno_id for buno_id, drone in fleet.items()
+            if min_lat <= drone.Latitude <= max_lat and min_lon <= drone.Longitude <= max_lon)
+
+    circles = [(rng.gauss(36.37, 0.05), rng.gauss(-94.21, 0.05), rng.choice([100, 1000, 5000])) for _ in range(50)]
+    circles += [(0, 180, 50000), (90, 0, 1000), (-36.37, 85.79, 2e7), (10, 20, 0)]
+    for lat, lon, radius_m in circles:
+        expected = [(distance, buno_id) for distance, buno_id in brute_force(fleet, lat, lon, len(fleet))
+                    if distance <= radius_m]
+        found = index.within_radius(lat, lon, radius_m)
+        assert [buno_id for _, buno_id in found] == [buno_id for _, buno_id in expected]
+
+
+def test_distance_matrix_matches_haversine(fleet):
+    rng = random.Random(23)
+    rows = [(drone.Latitude, drone.Longitude) for drone in list(fleet.values())[::40]]
+    columns = [(rng.gauss(36.37, 0.05), rng.gauss(-94.21, 0.05)) for _ in range(20)]
+    columns += [(36.37, -94.21), (-90, 0), (0, 180), (-36.37, 85.79)]
+    matrix = geo.distance_matrix_m(rows, columns)
+    assert len(matrix) == len(rows) and all(len(row) == len(columns) for row in matrix)
+    for (lat1, lon1), row in zip(rows, matrix):
+        for (lat2, lon2), distance in zip(columns, row):
+            assert abs(distance - geo.haversine_m(lat1, lon1, lat2, lon2)) <= 1
+    assert len(geo.distance_matrix_m([], columns)) == 0
@@ -0,0 +1,71 @@
+import json
+
+from API import stream
+from API.model import Drone
+
+
+def make_drone(buno_id, status, lat=36.37):
+    return Drone(buno_id, "Model X", "DroneCorp", "2023-01-01", "1", status, "A1", 100, lat, -94.21)
+
+
+def parse(message):
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return int(fields["id"]), fields["event"], json.loads(fields["data"])
+
+
+def events(subscription, count):
+    # Skips keep-alive comments; the feed already holds the events asked for
+    found = []
+    while len(found) < count:
+        message = next(subscription)
+        if message.startswith("id:"):
+            found.append(parse(message))
+    return found
+
+
+def test_status_filtered_stream_sees_drones_join_and_leave():
+    feed = stream.ChangeFeed()
+    fleet = {"DR-1": make_drone("DR-1", "Active"), "DR-2": make_drone("DR-2", "Down")}
+    subscription = stream.subscribe(feed, lambda: list(fleet.values()), statuses={"Active"}, heartbeat=0.01)
+    assert next(subscription) == "retry: 3000\n\n"
+
+    # Snapshot: only the matching drone
+    assert [(event, drone["BUNO_ID"]) for _, event, drone in events(subscription, 1)] == [("drone", "DR-1")]
+
+    feed.publish([make_drone("DR-1", "Active", lat=36.5)], previous=["Active"])
+    feed.publish([make_drone("DR-1", "Down")], previous=["Active"])
+    feed.publish([make_drone("DR-2", "Active")], previous=["Down"])
+    feed.publish([make_drone("DR-1", "Maintenance")], previous=["Down"])
+    feed.publish([make_drone("DR-2", "Active")], event="delete")
+    received = events(subscription, 4)
+    assert [(seq, event, drone["BUNO_ID"]) for seq, event, drone in received] == [
+        (1, "drone", "DR-1"), (2, "remove", "DR-1"), (3, "drone", "DR-2"), (5, "delete", "DR-2")]
+    assert received[0][2]["Latitude"] == 36.5
+    assert received[1][2]["Status"] == "Down"
+    subscription.close()
+
+    # Resuming after event 1 replays the rest without a snapshot
+    resumed = stream.subscribe(feed, lambda: list(fleet.values()), statuses={"Active"}, last_event_id=1,
+                               heartbeat=0.01)
+    assert next(resumed) == "retry: 3000\n\n"
+    assert [(seq, event) for seq, event, _ in events(resumed, 3)] == [(2, "remove"), (3, "drone"), (5, "delete")]
+    resumed.close()
+
+
+def test_stream_endpoint_removes_a_drone_that_leaves_the_status_filter(client):
+    before = client.get("/api/drones/DR-003").get_json()
+    assert before["Status"] == "Active"
+    response = client.get("/api/drones/stream?buno_id=DR-003&status=Active", buffered=False)
+    assert response.status_code == 200
+    chunks = response.response
+    assert next(chunks) == b"retry: 3000\n\n"
+    _, event, drone = parse(next(chunks).decode())
+    assert (event, drone["BUNO_ID"]) == ("drone", "DR-003")
+
+    assert client.put("/api/drones/DR-003", json={"Status": "Down"}).status_code == 200
+    _, event, drone = parse(next(chunks).decode())
+    assert (event, drone["Status"]) == ("remove", "Down")
+    assert client.put("/api/drones/DR-003", json={"Status": "Active"}).status_code == 200
+    _, event, drone = parse(next(chunks).decode())
+    assert (event, drone["Status"]) == ("drone", "Active")
+    response.close()
@@ -0,0 +1,484 @@
+"""
+Benchmarks every route in API/routes.py, in process through the Flask test
+client and over HTTP against a locally started server.
+
+For each endpoint it records throughput, p50/p95/p99 latency and the peak
+RSS of the process serving it, writes them to a JSON results file, and
+compares them with a baseline results file: an endpoint whose p95 latency
+rose, or whose throughput fell, by more than --threshold is flagged and the
+script exits with status 1. Timings only compare on the same machine, so no
+baseline is committed; create one with --update-baseline. Without one the
+run says so and compares nothing.
+
+Each mode runs against its own scratch copy of the database, optionally
+grown --scale times, so the real database is never written.
+
+Usage:
+    python utility/bench_endpoints.py [--mode client|server|both] [--requests 200]
+        [--concurrency 1] [--scale 1] [--output bench_results.json]
+        [--baseline bench_baseline.json] [--update-baseline]
+"""
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+main_dir = Path(__file__).resolve().parents[1]
+
+# Endpoints not benchmarked, with the reason
+SKIPPED = {
+    "api.stream_drones": "an open-ended Server-Sent Events stream has no response time",
+    "api.reload_fleet_state": "an operator action after an external import, not part of serving requests",
+}
+
+# A p95 change smaller than this is noise, whatever the percentage
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+@dataclasses.dataclass
+class Case:
+    """
+    One benchmarked request. {i} in path, body and prepare is replaced with
+    the request's sequence number, so writes can use fresh keys.
+    """
+    name: str
+    method: str
+    path: str
+    body: object = None
+    prepare: tuple = None  # (method, path, body) sent untimed before each request
+    expect: int = 200
+
+
+def drone(buno_id):
+    return {"BUNO_ID": buno_id, "Drone_Model": "Model X", "Manufacturer": "DroneCorp",
+            "Purchase_Date": "2023-01-01", "Serial": "SN123456", "Status": "Active", "Status_Code": "A1",
+            "Altitude": 250, "Latitude": 36.37, "Longitude": -94.21}
+
+
+def flight_plan(flight_plan_id):
+    return {"Flight_Plan_ID": flight_plan_id, "BUNO_ID": "DR-001", "Pilot_ID": "PILOT-001",
+            "Route_ID": "RT-001", "IsPlanned": 1, "IsComplete": 0}
+
+
+def pilot(pilot_id):
+    return {"Pilot_ID": pilot_id, "Pilot_Current": 1, "Pilot_Hours": 250}
+
+
+WAYPOINT = {"Latitude": 36.4, "Longitude": -94.2}
+
+# Reads first, then writes, so the reads see the dataset as it was built
+CASES = [
+    Case("connection", "GET", "/api/connection"),
+    Case("stats pool", "GET", "/api/stats/pool"),
+    Case("stats cache", "GET", "/api/stats/cache"),
+    Case("stats fleet_state", "GET", "/api/stats/fleet_state"),
+    Case("index", "GET", "/api/"),
+    Case("openapi spec", "GET", "/api/drone-api.yaml"),
+    Case("drones list", "GET", "/api/drones"),
+    Case("drones page", "GET", "/api/drones?limit=100"),
+    Case("drones fields", "GET", "/api/drones?fields=BUNO_ID,Latitude,Longitude"),
+    Case("drones within bbox", "GET", "/api/drones/within?bbox=-94.5,36.2,-94.0,36.6"),
+    Case("drones within radius", "GET", "/api/drones/within?lat=36.37&lon=-94.21&radius_m=20000"),
+    Case("drones nearest", "GET", "/api/drones/nearest?lat=36.37&lon=-94.21&k=5"),
+    Case("drone", "GET", "/api/drones/DR-001"),
+    Case("drones multi-get", "GET", "/api/drones?ids=DR-001,DR-002,DR-003,DR-004,DR-005,DR-999"),
+    Case("drone track", "GET", "/api/drones/DR-001/track"),
+    Case("drone pilot_info", "GET", "/api/drones/DR-001/pilot_info"),
+    Case("routes list", "GET", "/api/routes"),
+    Case("routes page", "GET", "/api/routes?limit=100"),
+    Case("route", "GET", "/api/routes/RT-001"),
+    Case("route simplified", "GET", "/api/routes/RT-001?zoom=10"),
+    Case("route metrics", "GET", "/api/routes/RT-001/metrics"),
+    Case("route waypoint", "GET", "/api/routes/RT-001/2"),
+    Case("flight_plans list", "GET", "/api/flight_plans"),
+    Case("flight_plans page", "GET", "/api/flight_plans?limit=100"),
+    Case("flight_plans with routes", "GET", "/api/flight_plans/flight_plans_with_routes"),
+    Case("flight_plans with routes nested", "GET", "/api/flight_plans/flight_plans_with_routes?layout=nested"),
+    Case("flight_plan", "GET", "/api/flight_plans/FP-001"),
+    Case("flight_plans multi-get", "GET", "/api/flight_plans?ids=FP-001,FP-002,FP-003,FP-004,FP-005,FP-999"),
+    Case("pilots list", "GET", "/api/pilots"),
+    Case("pilots page", "GET", "/api/pilots?limit=100"),
+    Case("pilot", "GET", "/api/pilots/PILOT-001"),
+    Case("pilots multi-get", "GET", "/api/pilots?ids=PILOT-001,PILOT-002,PILOT-003,PILOT-004,PILOT-005,PILOT-999"),
+    Case("pilots hours", "GET", "/api/pilots/hours?min=0&max=100000"),
+    Case("dispatch distances", "GET", "/api/dispatch/distances"),
+    Case("drone update", "PUT", "/api/drones/DR-001", drone("DR-001")),
+    Case("drones batch update", "PUT", "/api/drones/batch",
+         [{"BUNO_ID": f"DR-{n:03d}", "Latitude": 36.37, "Longitude": -94.21, "Altitude": 250} for n in range(1, 11)]),
+    Case("drone add", "POST", "/api/drones", drone("BENCH-{i}"), expect=201),
+    Case("drone delete", "DELETE", "/api/drones/BENCH-DEL-{i}", prepare=("POST", "/api/drones", drone("BENCH-DEL-{i}"))),
+    Case("waypoint add", "POST", "/api/routes/RT-BENCH/{i}", WAYPOINT, expect=201),
+    Case("waypoint update", "PUT", "/api/routes/RT-001/2", {"Latitude": 36.587654, "Longitude": -94.234567}),
+    Case("waypoint delete", "DELETE", "/api/routes/RT-BENCH-DEL/{i}",
+         prepare=("POST", "/api/routes/RT-BENCH-DEL/{i}", WAYPOINT)),
+    Case("route delete", "DELETE", "/api/routes/RT-DEL-{i}", prepare=("POST", "/api/routes/RT-DEL-{i}/1", WAYPOINT)),
+    Case("flight_plan add", "POST", "/api/flight_plans", flight_plan("FP-BENCH-{i}"), expect=201),
+    Case("flight_plan update", "PUT", "/api/flight_plans/FP-001", dict(flight_plan("FP-001"), IsComplete=1)),
+    Case("flight_plan delete", "DELETE", "/api/flight_plans/FP-DEL-{i}",
+         prepare=("POST", "/api/flight_plans", flight_plan("FP-DEL-{i}"))),
+    Case("pilot add", "POST", "/api/pilots", pilot("PILOT-BENCH-{i}"), expect=201),
+    Case("pilot update", "PUT", "/api/pilots/PILOT-001", pilot("PILOT-001")),
+    Case("pilot delete", "DELETE", "/api/pilots/PILOT-DEL-{i}", prepare=("POST", "/api/pilots", pilot("PILOT-DEL-{i}"))),
+]
+
+
+def fill(template, i):
+    """
+    Replaces {i} in a path or anywhere inside a JSON body.
+    """
+    if isinstance(template, str):
+        return template.replace("{i}", str(i))
+    if isinstance(template, dict):
+        return {key: fill(value, i) for key, value in template.items()}
+    if isinstance(template, list):
+        return [fill(value, i) for value in template]
+    return template
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+# ---------------------------------------------------------
+# Dataset
+# ---------------------------------------------------------
+
+# Columns made unique in each copy when the dataset is grown
+KEY_COLUMNS = {
+    "drones": ["BUNO_ID"],
+    "routes": ["Route_ID"],
+    "pilots": ["Pilot_ID"],
+    "flight_plans": ["Flight_Plan_ID", "BUNO_ID", "Pilot_ID", "Route_ID"],
+}
+
+
+def build_dataset(source, path, scale):
+    """
+    Copies the database and appends scale - 1 copies of every row, with
+    suffixed keys so the copies stay distinct and still join to each other.
+
+    Returns:
+        dict: Row count of each table.
+    """
+    shutil.copyfile(source, path)
+    with sqlite3.connect(path) as conn:
+        for table, keys in KEY_COLUMNS.items():
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            for copy in range(1, scale):
+                select = ", ".join(f"{column} || '-x{copy}'" if column in keys else column for column in columns)
+                conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) "
+                             f"SELECT {select} FROM {table} WHERE {keys[0]} NOT LIKE '%-x%'")
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in KEY_COLUMNS}
+
+
+# ---------------------------------------------------------
+# Peak RSS
+# ---------------------------------------------------------
+
+def reset_peak_rss(pid):
+    # Linux resets VmHWM when 5 is written to clear_refs; elsewhere the peak only grows
+    try:
+        Path(f"/proc/{pid}/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb(pid):
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid == os.getpid():
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+
+# ---------------------------------------------------------
+# Drivers
+# ---------------------------------------------------------
+
+class ClientDriver:
+    """
+    Sends requests through the Flask test client, in this process.
+    """
+
+    def __init__(self, db_path):
+        # The API's connection pool reads DRONE_DB_PATH when it is first imported
+        os.environ["DRONE_DB_PATH"] = str(db_path)
+        os.chdir(main_dir)  # create_app() loads drone-api.yaml from the working directory
+        sys.path.insert(0, str(main_dir))
+        from run import create_app
+        self.app = create_app()
+        self.pid = os.getpid()
+        self._local = threading.local()
+
+    def send(self, method, path, body):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.get_data()  # Drain streamed responses
+        status = response.status_code
+        response.close()
+        return status
+
+    def close(self):
+        # Flush pending drone writes while the scratch database still exists
+        from API.database import pool
+        from API.live_state import fleet
+        fleet.close()
+        pool.close_all()
+
+
+class ServerDriver:
+    """
+    Starts the API in a child process and sends requests to it over
+    keep-alive HTTP/1.1 connections, one per worker thread.
+    """
+
+    def __init__(self, db_path):
+        import requests
+        self._requests = requests
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        code = ("from werkzeug.serving import WSGIRequestHandler\n"
+                "WSGIRequestHandler.protocol_version = 'HTTP/1.1'\n"  # keep-alive, as a production server would
+                "from run import create_app\n"
+                f"create_app().run(host='127.0.0.1', port={port}, threaded=True)\n")
+        self.process = subprocess.Popen([sys.executable, "-c", code], cwd=main_dir,
+                                        env=dict(os.environ, DRONE_DB_PATH=str(db_path)),
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.pid = self.process.pid
+        self._local = threading.local()
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if requests.get(f"{self.base_url}/api/connection", timeout=1).ok:
+                    break
+            except requests.ConnectionError:
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.close()
+                raise RuntimeError("the API server did not start")
+            time.sleep(0.1)
+
+    def send(self, method, path, body):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.request(method, self.base_url + path, json=body)
+        return response.status_code
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def run_case(driver, case, requests, concurrency, warmup, sequence):
+    """
+    Returns:
+        dict: requests, errors, throughput_rps, p50_ms, p95_ms, p99_ms, max_ms and peak_rss_mb.
+    """
+    def one(i):
+        if case.prepare is not None:
+            method, path, body = case.prepare
+            driver.send(method, fill(path, i), fill(body, i))
+        started = time.perf_counter()
+        status = driver.send(case.method, fill(case.path, i), fill(case.body, i))
+        return time.perf_counter() - started, status == case.expect
+
+    for _ in range(warmup):
+        one(next(sequence))
+    reset_peak_rss(driver.pid)
+    numbers = [next(sequence) for _ in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(one, numbers))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in outcomes)
+    return {
+        "requests": requests,
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(driver.pid),
+    }
+
+
+def check_coverage():
+    """
+    Returns:
+        list of str: "METHOD endpoint" pairs of api routes that no case exercises.
+    """
+    sys.path.insert(0, str(main_dir))
+    from flask import Flask
+    from API.routes import api_bp
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix="/api")
+    adapter = app.url_map.bind("localhost")
+    covered = set()
+    for case in CASES:
+        path, _, query = fill(case.path, 0).partition("?")
+        endpoint, _ = adapter.match(path, case.method, query_args=query)
+        covered.add((case.method, endpoint))
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if not rule.endpoint.startswith("api.") or rule.endpoint in SKIPPED:
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if (method, rule.endpoint) not in covered:
+                missing.append(f"{method} {rule.endpoint}")
+    return missing
+
+
+# ---------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------
+
+def compare(results, baseline, threshold):
+    """
+    Prints each endpoint's change against the baseline.
+
+    Returns:
+        list of str: The regressions.
+    """
+    settings = ("concurrency", "scale")
+    if any(baseline.get("meta", {}).get(key) != results["meta"][key] for key in settings):
+        print("Warning: the baseline was run with different settings: "
+              + ", ".join(f"{key} {baseline.get('meta', {}).get(key)} vs {results['meta'][key]}" for key in settings))
+    regressions = []
+    for mode, cases in results["results"].items():
+        base_cases = baseline.get("results", {}).get(mode, {})
+        for name, result in cases.items():
+            base = base_cases.get(name)
+            if base is None:
+                continue
+            p95_change = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+            rps_change = result["throughput_rps"] / base["throughput_rps"] - 1 if base["throughput_rps"] else 0.0
+            slower = (p95_change > threshold and result["p95_ms"] - base["p95_ms"] > MIN_LATENCY_DELTA_MS) \
+                or rps_change < -threshold
+            flag = "SLOWER" if slower else ""
+            print(f"{mode:<7}{name:<34}p95 {base['p95_ms']:>9.2f} -> {result['p95_ms']:>9.2f} ms ({p95_change:+.0%})  "
+                  f"rps {base['throughput_rps']:>8.1f} -> {result['throughput_rps']:>8.1f} ({rps_change:+.0%})  {flag}")
+            if slower:
+                regressions.append(f"{mode} {name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["client", "server", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint first")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    parser.add_argument("--scale", type=int, default=1, help="grow every table to this many copies of its rows")
+    parser.add_argument("--only", help="only run cases whose name contains this text")
+    parser.add_argument("--db", default=str(main_dir / "data" / "drone_data.db"), help="database to copy")
+    parser.add_argument("--output", default="bench_results.json", help="results file to write")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="results file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results to the baseline file too")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="flag p95 rises and throughput drops larger than this fraction")
+    args = parser.parse_args()
+
+    output_path = Path(args.output).resolve()
+    baseline_path = Path(args.baseline).resolve()
+    cases = [case for case in CASES if not args.only or args.only in case.name]
+    # The server runs in its own process; the in-process client goes last so
+    # the API it imports does not add to the server's numbers
+    modes = ["server", "client"] if args.mode == "both" else [args.mode]
+
+    scratch = Path(tempfile.mkdtemp())
+    db_paths = {mode: scratch / f"{mode}.db" for mode in modes}
+    for mode, db_path in db_paths.items():
+        rows = build_dataset(args.db, db_path, args.scale)
+    # Importing the API for the coverage check must not open the real database
+    os.environ["DRONE_DB_PATH"] = str(db_paths[modes[-1]])
+    missing = check_coverage()
+    if missing:
+        shutil.rmtree(scratch, ignore_errors=True)
+        print(f"Not benchmarked: {', '.join(missing)}. Add them to CASES or SKIPPED.")
+        return 1
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "scale": args.scale,
+            "rows": rows,
+        },
+        "results": {},
+    }
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=main_dir,
+                                capture_output=True, text=True).stdout.strip()
+        results["meta"]["commit"] = commit or None
+        for mode in modes:
+            driver = ServerDriver(db_paths[mode]) if mode == "server" else ClientDriver(db_paths[mode])
+            sequence = iter(range(10 ** 9))
+            mode_results = results["results"][mode] = {}
+            try:
+                for case in cases:
+                    result = mode_results[case.name] = run_case(driver, case, args.requests, args.concurrency,
+                                                                args.warmup, sequence)
+                    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "-"
+                    print(f"{mode:<7}{case.name:<34}{result['throughput_rps']:>9.1f} rps  "
+                          f"p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  "
+                          f"rss {rss:>7}  errors {result['errors']}")
+            finally:
+                driver.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    output_path.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results written to {output_path}")
+
+    status = 0
+    if baseline_path == output_path:
+        print(f"Warning: --baseline and --output are both {baseline_path}; nothing was compared")
+    elif not baseline_path.exists():
+        print(f"Warning: no baseline at {baseline_path}; nothing was compared. "
+              f"Run once with --update-baseline on the machine you compare on to create it")
+    else:
+        regressions = compare(results, json.loads(baseline_path.read_text()), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} endpoint(s) slower than {baseline_path}: {', '.join(regressions)}")
+            status = 1
+        else:
+            print(f"No endpoint slower than {baseline_path} by more than {args.threshold:.0%}")
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline written to {baseline_path}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Compares the two ways the API can turn routes rows into a JSON response body:
+
+  objects   sqlite3.Row -> model object -> dict -> json   (the per-object path)
+  stream    tuple batches -> RowEncoder -> JSON bytes       (services.stream_json)
+
+For each path it reports CPU time per row and peak traced memory, in total
+and per row, plus the size of one model instance with and without __slots__.
+
+Usage:
+    python utility/bench_serialization.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import dataclasses
+import json
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from API.database import ConnectionPool  # noqa: E402
+from API.model import Route  # noqa: E402
+from API.serialize import ArrayStream, RowEncoder  # noqa: E402
+
+
+@dataclasses.dataclass
+class DictRoute:
+    """The Route model as it was before __slots__."""
+    Route_ID: str
+    Latitude: float
+    Longitude: float
+    Waypoint_ID: str
+
+
+def build_database(path, rows):
+    # A throwaway routes table with the same columns as the real one
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE IF EXISTS routes")
+    conn.execute("CREATE TABLE routes (Route_ID TEXT, Latitude REAL, Longitude REAL, Waypoint_ID TEXT)")
+    rng = random.Random(42)
+    conn.executemany("INSERT INTO routes VALUES (?, ?, ?, ?)",
+                     ((f"RT-{i // 10:06d}", 36.37 + rng.uniform(-0.3, 0.3),
+                       -94.21 + rng.uniform(-0.3, 0.3), str(i % 10 + 1)) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def objects_path(pool):
+    # What a list endpoint did before: fetchall, build models, __dict__, encode
+    with pool.connection() as conn:
+        rows = conn.execute("SELECT * FROM routes").fetchall()
+    routes = [DictRoute(Route_ID=row["Route_ID"], Latitude=row["Latitude"],
+                        Longitude=row["Longitude"], Waypoint_ID=row["Waypoint_ID"]) for row in rows]
+    return json.dumps([route.__dict__ for route in routes], separators=(",", ":")).encode()
+
+
+def stream_path(pool):
+    # What services.stream_json does: tuple batches straight to JSON bytes
+    encoder = RowEncoder(["Route_ID", "Latitude", "Longitude", "Waypoint_ID"])
+    rows = pool.stream("SELECT Route_ID, Latitude, Longitude, Waypoint_ID FROM routes", raw=True)
+    array = ArrayStream(rows.batches(), encoder, rows.close)
+    size = 0
+    for chunk in array:
+        size += len(chunk)  # A response would write the chunk out here
+    return size
+
+
+def measure(func, pool, rows, repeat):
+    func(pool)  # warm up the page cache and the statement cache
+    cpu = min(_cpu_time(func, pool) for _ in range(repeat))
+    tracemalloc.start()
+    func(pool)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_us_per_row": cpu / rows * 1e6, "peak_mb": peak / 2 ** 20, "peak_bytes_per_row": peak / rows}
+
+
+def _cpu_time(func, pool):
+    started = time.process_time()
+    func(pool)
+    return time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default="bench_serialization.db", help="scratch database file")
+    args = parser.parse_args()
+
+    build_database(args.db, args.rows)
+    pool = ConnectionPool(args.db, max_size=1)
+    try:
+        results = {name: measure(func, pool, args.rows, args.repeat)
+                   for name, func in (("objects", objects_path), ("stream", stream_path))}
+    finally:
+        pool.close_all()
+        for suffix in ("", "-wal", "-shm"):
+            Path(args.db + suffix).unlink(missing_ok=True)
+
+    print(f"{args.rows} rows, best of {args.repeat}")
+    print(f"{'path':<10}{'CPU us/row':>12}{'peak MB':>10}{'peak B/row':>12}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['cpu_us_per_row']:>12.3f}{result['peak_mb']:>10.1f}{result['peak_bytes_per_row']:>12.1f}")
+    before = results["objects"]
+    after = results["stream"]
+    print(f"CPU {before['cpu_us_per_row'] / after['cpu_us_per_row']:.1f}x faster, "
+          f"peak memory {before['peak_mb'] / after['peak_mb']:.0f}x lower")
+
+    sample = ("RT-000001", 36.37, -94.21, "1")
+    slotted, plain = Route(*sample), DictRoute(*sample)
+    print(f"model instance: {sys.getsizeof(plain) + sys.getsizeof(plain.__dict__)} bytes with __dict__, "
+          f"{sys.getsizeof(slotted)} bytes with __slots__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Times the in-memory drone position index (API.spatial.GridIndex) on a fleet
+from generate_fleet.py: drones clustered around the hubs of Benton and
+Washington counties, as the API sees them at scale.
+
+Query points are drawn from the same distribution as the drones, plus
+points far away from the whole fleet and a status no drone has, and box
+and radius searches around them. Everything
+is seeded, so runs with the same arguments time the same work. Exits with
+status 1 if a query case's p95 latency is above --target-ms.
+
+Usage:
+    python utility/bench_spatial.py [--drones 100000] [--queries 2000] [--target-ms 1.0]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from generate_fleet import FleetGenerator  # noqa: E402
+from API.model import Drone  # noqa: E402
+from API.spatial import GridIndex  # noqa: E402
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an ascending list
+    return sorted_values[max(0, -(-len(sorted_values) * p // 100) - 1)]
+
+
+def time_calls(func, args_list):
+    """
+    Returns:
+        list of float: Seconds taken by each call, ascending.
+    """
+    timings = []
+    for args in args_list:
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drones", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000, help="timed queries per case")
+    parser.add_argument("--target-ms", type=float, default=1.0, help="p95 latency every query case must stay under")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generator = FleetGenerator(args.drones, 1, 1, 3, 0, args.seed)
+    drones = [Drone(*row) for row in generator.drones()]
+    index = GridIndex()
+    started = time.perf_counter()
+    index.rebuild(drones)
+    print(f"{len(index):,} drones indexed in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(f"{args.seed}:queries")
+    near = [generator._near_hub(rng) for _ in range(args.queries)]
+    far = [(rng.uniform(-80, 80), rng.uniform(-180, 180)) for _ in range(args.queries)]
+    cases = [
+        ("k=5 near the fleet", index.nearest, [(lat, lon, 5) for lat, lon in near]),
+        ("k=50 near the fleet", index.nearest, [(lat, lon, 50) for lat, lon in near]),
+        ("k=5 status=Active", index.nearest, [(lat, lon, 5, "Active") for lat, lon in near]),
+        ("k=5 status=Maintenance", index.nearest, [(lat, lon, 5, "Maintenance") for lat, lon in near]),
+        ("k=5 far from the fleet", index.nearest, [(lat, lon, 5) for lat, lon in far]),
+        ("k=5 status nobody has", index.nearest, [(lat, lon, 5, "Retired") for lat, lon in near]),
+        ("radius 500 m near", index.within_radius, [(lat, lon, 500) for lat, lon in near]),
+        ("radius 500 m far", index.within_radius, [(lat, lon, 500) for lat, lon in far]),
+        ("bbox 0.01 deg near", index.within_bbox, [(lat - 0.005, lon - 0.005, lat + 0.005, lon + 0.005)
+                                                   for lat, lon in near]),
+    ]
+
+    print(f"{'case':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    failed = []
+    for name, func, args_list in cases:
+        func(*args_list[0])  # warm up
+        timings = time_calls(func, args_list)
+        p95 = percentile(timings, 95) * 1000
+        print(f"{name:<28}{percentile(timings, 50) * 1000:>9.3f}{p95:>9.3f}"
+              f"{percentile(timings, 99) * 1000:>9.3f}{timings[-1] * 1000:>9.3f}")
+        if p95 > args.target_ms:
+            failed.append(name)
+
+    # Position updates: every drone takes a small step, as a fleet reporting each second does
+    moved = [Drone(drone.BUNO_ID, drone.Drone_Model, drone.Manufacturer, drone.Purchase_Date, drone.Serial,
+                   drone.Status, drone.Status_Code, drone.Altitude,
+                   drone.Latitude + rng.gauss(0, 0.0005), drone.Longitude + rng.gauss(0, 0.0005))
+             for drone in drones]
+    started = time.perf_counter()
+    for drone in moved:
+        index.upsert(drone)
+    elapsed = time.perf_counter() - started
+    print(f"upsert: {elapsed / len(moved) * 1e6:.1f} us per moved drone ({len(moved) / elapsed:,.0f}/s)")
+
+    if failed:
+        print(f"p95 above {args.target_ms} ms: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
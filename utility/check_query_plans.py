@@ -0,0 +1,175 @@
+"""
+Runs every function in API/services.py against a scratch copy of the
+database, records each SQL statement they execute, and checks its
+EXPLAIN QUERY PLAN. Exits with status 1 if any statement scans a whole
+table while filtering it, i.e. it should be using an index.
+
+Statements without a WHERE clause read or write the whole table on
+purpose and may scan it.
+
+Usage:
+    python utility/check_query_plans.py [--db data/drone_data.db] [--verbose]
+"""
+import argparse
+import inspect
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+main_dir = Path(__file__).resolve().parents[1]
+
+# Full scans that are intended even though the statement has a WHERE clause
+ALLOWED_SCANS = {}
+
+# Helpers whose SQL is checked through the public functions that call them,
+# and functions that run no SQL of their own.
+NOT_CALLED = {
+    "run_query", "run_page_query", "run_in_query", "select_columns", "parse_fields", "project_models",
+    "convert_rows_to_dicts", "convert_rows_to_drone_list", "convert_rows_to_route_list",
+    "convert_rows_to_flight_plan_list", "convert_rows_to_pilot_list",
+    "get_pool_stats", "get_cache_stats", "get_fleet_state_stats", "stream_drone_changes",
+}
+
+DRONE = {"BUNO_ID": "DR-PLAN", "Drone_Model": "Model X", "Manufacturer": "DroneCorp",
+         "Purchase_Date": "2024-01-01", "Serial": "1", "Status": "Active", "Status_Code": "A1",
+         "Altitude": 100, "Latitude": 36.37, "Longitude": -94.21}
+WAYPOINT = {"Latitude": 36.4, "Longitude": -94.2}
+FLIGHT_PLAN = {"Flight_Plan_ID": "FP-PLAN", "BUNO_ID": "DR-PLAN", "Pilot_ID": "PILOT-PLAN",
+               "Route_ID": "RT-PLAN", "IsPlanned": 1, "IsComplete": 0}
+PILOT = {"Pilot_ID": "PILOT-PLAN", "Pilot_Current": 1, "Pilot_Hours": 250}
+
+# (function name, arguments), in the order they run
+CALLS = [
+    ("check_connection", ()),
+    ("get_table_versions", (["drones", "routes", "pilots", "flight_plans"],)),
+    ("add_drone", (DRONE,)),
+    ("get_all_drones", ()),
+    ("get_drones_page", (5,)),
+    ("get_drone_by_id", ("DR-PLAN",)),
+    ("get_drones_by_ids", (["DR-PLAN", "DR-NONE"],)),
+    ("get_drones_by_status", ("Active",)),
+    ("get_drones_by_manufacturer", ("DroneCorp",)),
+    ("get_drones_purchased_after", ("2023-06-01",)),
+    ("update_drone", ("DR-PLAN", dict(DRONE, Status="Down"))),
+    ("update_drone_positions", ([{"BUNO_ID": "DR-PLAN", "Altitude": 120, "Latitude": 36.38, "Longitude": -94.2}],)),
+    ("get_drone_track", ("DR-PLAN", 0, 4102444800)),
+    ("get_drones_in_bbox", (36.0, -95.0, 37.0, -94.0)),
+    ("get_drones_in_radius", (36.37, -94.21, 5000)),
+    ("get_nearest_drones", (36.37, -94.21, 3)),
+    ("reload_fleet_state", ()),
+    ("add_pilot", (PILOT,)),
+    ("get_all_pilots", ()),
+    ("get_pilots_page", (5, ["PILOT-001", 1])),
+    ("get_pilot_by_id", ("PILOT-PLAN",)),
+    ("get_pilots_by_ids", (["PILOT-PLAN", "PILOT-NONE"], ["Pilot_Hours"])),
+    ("get_pilots_with_hour_range", (100, 500)),
+    ("update_pilot", ("PILOT-PLAN", dict(PILOT, Pilot_Hours=300))),
+    ("add_route_waypoint", ("RT-PLAN", "1", WAYPOINT)),
+    ("get_all_routes", ()),
+    ("get_routes_page", (5, ["RT-001", "1", 1])),
+    ("get_route_by_id", ("RT-PLAN",)),
+    ("get_route_waypoint", ("RT-PLAN", "1")),
+    ("update_route_waypoint", ("RT-PLAN", "1", WAYPOINT)),
+    ("get_route_metrics", ("RT-PLAN",)),
+    ("get_simplified_route", ("RT-PLAN", 10.0)),
+    ("add_flight_plan", (FLIGHT_PLAN,)),
+    ("get_all_flight_plans", ()),
+    ("get_flight_plans_page", (5, ["FP-001", 1])),
+    ("get_flight_plan_by_id", ("FP-PLAN",)),
+    ("get_flight_plans_by_ids", (["FP-PLAN", "FP-NONE"],)),
+    ("update_flight_plan", ("FP-PLAN", dict(FLIGHT_PLAN, IsComplete=1))),
+    ("get_flight_plans_with_routes", ()),
+    ("get_drone_pilot_info", ("DR-PLAN",)),
+    ("get_pilot_for_drone", ("DR-PLAN",)),
+    ("get_route_starts", ()),
+    ("get_distance_matrix", (["DR-PLAN"], ["RT-PLAN"])),
+    ("stream_json", ("routes",)),
+    ("stream_json", ("pilots", ["Pilot_ID", "Pilot_Current"])),
+    ("delete_flight_plan", ("FP-PLAN",)),
+    ("delete_route_waypoint", ("RT-PLAN", "1")),
+    ("delete_route", ("RT-PLAN",)),
+    ("delete_pilot", ("PILOT-PLAN",)),
+    ("delete_drone", ("DR-PLAN",)),
+]
+
+PLANNED_STATEMENT = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b", re.IGNORECASE)
+SCAN = re.compile(r"^SCAN (\w+)(.*)$")
+WHERE = re.compile(r"\bWHERE\b", re.IGNORECASE)
+
+
+def full_scans(conn, statement, tables):
+    """
+    Returns:
+        tuple: (plan lines that scan a whole table, every plan line).
+    """
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+    scans = []
+    for _, _, _, detail in plan:
+        match = SCAN.match(detail)
+        if match and match.group(1) in tables and "VIRTUAL TABLE" not in match.group(2):
+            scans.append(detail)
+    return scans, [row[3] for row in plan]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=str(main_dir / "data" / "drone_data.db"), help="database to copy")
+    parser.add_argument("--verbose", action="store_true", help="print every statement and its plan")
+    args = parser.parse_args()
+
+    scratch = Path(tempfile.mkdtemp()) / "plans.db"
+    shutil.copyfile(args.db, scratch)
+    os.environ["DRONE_DB_PATH"] = str(scratch)
+    os.environ["DRONE_FLUSH_INTERVAL"] = "0"  # write drone changes through so their SQL is seen
+    os.environ["DRONE_CACHE_SIZE"] = "0"
+    sys.path.insert(0, str(main_dir))
+    from API import services
+    from API.database import pool
+
+    defined = {name for name, func in inspect.getmembers(services, inspect.isfunction)
+               if func.__module__ == services.__name__}
+    missing = defined - NOT_CALLED - {name for name, _ in CALLS}
+    if missing:
+        print(f"Not exercised by this check: {', '.join(sorted(missing))}. Add them to CALLS or NOT_CALLED.")
+        return 1
+
+    statements = {}
+    current = [None]
+    pool.set_trace_callback(lambda sql: statements.setdefault(sql, current[0]))
+    for name, call_args in CALLS:
+        current[0] = name
+        result = getattr(services, name)(*call_args)
+        if hasattr(result, "close"):  # streamed results run their query as they are read
+            for _ in result:
+                pass
+            result.close()
+    pool.set_trace_callback(None)
+
+    failures = checked = 0
+    with sqlite3.connect(scratch) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for statement, caller in statements.items():
+            if not PLANNED_STATEMENT.match(statement):
+                continue
+            checked += 1
+            scans, plan = full_scans(conn, statement, tables)
+            allowed = not WHERE.search(statement) or any(
+                " ".join(statement.split()).startswith(prefix) for prefix in ALLOWED_SCANS)
+            if scans and not allowed:
+                failures += 1
+                print(f"FULL SCAN in {caller}(): {'; '.join(scans)}\n    {' '.join(statement.split())}")
+            elif args.verbose:
+                print(f"ok  {caller}(): {'; '.join(plan) or '-'}\n    {' '.join(statement.split())}")
+
+    pool.close_all()
+    shutil.rmtree(scratch.parent, ignore_errors=True)
+    print(f"{checked} statements checked, {failures} full table scan(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,81 +1,358 @@
+"""
+Builds data/drone_data.db from the CSV files in utility/raw_data.
+
+The tables are created by the API's migrations, so the database gets the
+same schema, keys and indexes the API expects. Each CSV file is streamed in
+chunks into its table with executemany() inside one transaction per table,
+with journaling and syncing off; indexes and triggers are added once all
+rows are in. The database is built under a temporary name and renamed into
+place at the end, so a failed build leaves the previous one untouched.
+
+With --incremental the existing database is updated in place instead: rows
+are matched to the CSV rows by key, and only new, changed and missing rows
+are inserted, updated and deleted, in one transaction. Drone positions are
+left as the API last wrote them. The API serves drones from memory; pass
+--api-url to have a running API reload them once the import is committed.
+
+Usage:
+    python utility/create_db.py [--source utility/raw_data] [--db data/drone_data.db]
+    python utility/create_db.py --incremental [--keep-missing] [--api-url http://localhost:5000/api]
+"""
+import argparse
+import csv
+import itertools
+import json
 import os
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.request
 from pathlib import Path
-import sqlalchemy as sa
-import pandas as pd
 
 # --- File Path Handling ---
 # Get the script's directory
 script_dir = Path(__file__).parent.resolve()
 
-# Go up one level to the main directory 
-main_dir = script_dir.parent 
-
-# Construct paths relative to the main directory
-data_folder = main_dir / "data"  # For the database
-database_path = data_folder / "drone_data.db"
-
-# Create data folder if it doesn't exist
-data_folder.mkdir(parents=True, exist_ok=True)
-
-# --- Database Creation ---
-# Create the engine with the absolute path
-engine = sa.create_engine(f'sqlite:///{database_path}')
-
-# Define the table structures
-metadata = sa.MetaData()
-
-drones = sa.Table(
-    'drones', metadata,
-    sa.Column('BUNO_ID', sa.String, primary_key=True),
-    sa.Column('Drone_Model', sa.String),
-    sa.Column('Manufacturer', sa.String),
-    sa.Column('Purchase_Date', sa.Date),
-    sa.Column('Serial', sa.String),
-    sa.Column('Status', sa.String),
-    sa.Column('Status_Code', sa.String)
-)
-
-flight_plans = sa.Table(
-    'flight_plans', metadata,
-    sa.Column('Flight_Plan_ID', sa.String, primary_key=True),
-    sa.Column('BUNO_ID', sa.String, sa.ForeignKey('drones.BUNO_ID')),
-    sa.Column('Pilot_ID', sa.String, sa.ForeignKey('pilots.Pilot_ID')),
-    sa.Column('Route_ID', sa.String, sa.ForeignKey('routes.Route_ID')),
-    sa.Column('IsPlanned', sa.Boolean),
-)
-
-routes = sa.Table(
-    'routes', metadata,
-    sa.Column('Route_ID', sa.String, primary_key=True),
-    sa.Column('Waypoint_ID', sa.String),  # Added Waypoint_ID column
-    sa.Column('Latitude', sa.Float),
-    sa.Column('Longitude', sa.Float),
-)
-
-pilots = sa.Table(
-    'pilots', metadata,
-    sa.Column('Pilot_ID', sa.String, primary_key=True),
-    sa.Column('Pilot_Current', sa.Boolean),
-    sa.Column('Pilot_Hours', sa.Integer)
-)
-
-# --- Data Loading ---
-# Construct the path to the CSV files in the raw_data folder
-csv_data_folder = script_dir / "raw_data"  # Path to the 'utility/raw_data' folder
-
-# Load data from CSV files using pathlib
-for table, filename in [
-    (drones, csv_data_folder / 'drone.csv'),
-    (flight_plans, csv_data_folder / 'flight_plan.csv'),
-    (routes, csv_data_folder / 'flight_route.csv'),
-    (pilots, csv_data_folder / 'pilot_currency.csv')
-]:
+# Go up one level to the main directory
+main_dir = script_dir.parent
+
+sys.path.insert(0, str(main_dir))
+from API import migrations  # noqa: E402
+
+# (table, CSV file name) in load order
+TABLE_FILES = [
+    ("drones", "drone.csv"),
+    ("flight_plans", "flight_plan.csv"),
+    ("routes", "flight_route.csv"),
+    ("pilots", "pilot_currency.csv"),
+]
+
+# Columns identifying a row, as in the unique indexes the migrations create
+TABLE_KEYS = {
+    "drones": ("BUNO_ID",),
+    "flight_plans": ("Flight_Plan_ID", "Route_ID"),
+    "routes": ("Route_ID", "Waypoint_ID"),
+    "pilots": ("Pilot_ID",),
+}
+
+# Columns the API keeps current: an incremental import sets them on new rows only
+LIVE_COLUMNS = {
+    "drones": ("Altitude", "Latitude", "Longitude"),
+}
+
+# BOOLEAN columns hold 1/0; the CSV files spell them TRUE/FALSE. Other values
+# are stored as text and converted by the columns' type affinity.
+BOOLEAN_VALUES = {"TRUE": 1, "FALSE": 0, "True": 1, "False": 0, "true": 1, "false": 0, "1": 1, "0": 0}
+
+# Rows handed to each executemany() call
+CHUNK_SIZE = 50000
+
+# Settings for a database nobody else is using yet: a crash only loses the
+# half-built file, so there is nothing to journal or sync
+LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "locking_mode": "EXCLUSIVE",
+    "temp_store": "MEMORY",
+    "cache_size": -262144,  # 256 MiB, for building the indexes
+}
+
+
+def relax_pragmas(conn):
+    for pragma, value in LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+
+def insert_rows(conn, table, columns, rows, chunk_size=CHUNK_SIZE):
+    """
+    Inserts rows into a table in one transaction, chunk_size rows per executemany() call.
+
+    Args:
+        conn (sqlite3.Connection): A connection opened with isolation_level=None.
+        table (str): The table.
+        columns (list of str): Column names, in row order.
+        rows (iterable of tuple): The rows; consumed lazily.
+
+    Returns:
+        int: Number of rows inserted.
+    """
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    inserted = 0
+    conn.execute("BEGIN")
+    try:
+        for chunk in iter(lambda: list(itertools.islice(rows, chunk_size)), []):
+            conn.executemany(insert, chunk)
+            inserted += len(chunk)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return inserted
+
+
+def csv_rows(path, table, conn):
+    """
+    Opens a CSV file for loading into a table.
+
+    Returns:
+        tuple: (columns named by the header, iterator of row tuples, the open file).
+
+    Raises:
+        ValueError: If the header names a column the table does not have.
+    """
+    file = open(path, newline="")
+    reader = csv.reader(file)
+    columns = [column.strip() for column in next(reader)]
+    table_columns = {row[1]: row[2].upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+    unknown = [column for column in columns if column not in table_columns]
+    if unknown:
+        file.close()
+        raise ValueError(f"{path.name}: {table} has no column(s) {', '.join(unknown)}")
+    booleans = [i for i, column in enumerate(columns) if table_columns[column] == "BOOLEAN"]
+
+    def rows():
+        for row in reader:
+            if not row:
+                continue
+            row = [value if value != "" else None for value in row]
+            for i in booleans:
+                row[i] = BOOLEAN_VALUES.get(row[i], row[i])
+            yield tuple(row)
+
+    return columns, rows(), file
+
+
+def build_database(source, database_path, chunk_size=CHUNK_SIZE):
+    """
+    Builds a database from the CSV files in source and moves it to database_path.
+
+    Returns:
+        int: Total rows loaded.
+    """
+    building = database_path.with_name(database_path.name + ".building")
+    building.unlink(missing_ok=True)
+    conn = sqlite3.connect(building, isolation_level=None)
+    total = 0
     try:
-        df = pd.read_csv(filename)
-        df.to_sql(table.name, engine, index=False, if_exists='replace')
-    except FileNotFoundError:
-        print(f"Error: Could not find the file at {filename}")
-
-# --- Database Creation ---
-metadata.create_all(engine)
-print(f"Database created at: {database_path}")
\ No newline at end of file
+        relax_pragmas(conn)
+        migrations.migrate(conn, target=1)  # Tables only; keys, indexes and triggers follow the data
+        for table, filename in TABLE_FILES:
+            path = source / filename
+            if not path.exists():
+                print(f"Error: Could not find the file at {path}")
+                continue
+            started = time.perf_counter()
+            columns, rows, file = csv_rows(path, table, conn)
+            with file:
+                loaded = insert_rows(conn, table, columns, rows, chunk_size)
+            report(table, loaded, started)
+            total += loaded
+
+        started = time.perf_counter()
+        migrations.migrate(conn)
+        conn.execute("ANALYZE")
+        print(f"indexes, triggers and statistics in {time.perf_counter() - started:.1f}s "
+              f"(schema version {migrations.current_version(conn)})")
+        conn.execute("PRAGMA journal_mode = DELETE")  # The API switches it to WAL when it connects
+    except BaseException:
+        conn.close()
+        building.unlink(missing_ok=True)
+        raise
+    conn.close()
+
+    for suffix in ("-wal", "-shm"):
+        Path(f"{database_path}{suffix}").unlink(missing_ok=True)
+    os.replace(building, database_path)
+    return total
+
+
+def stage_rows(conn, table, columns, rows, chunk_size=CHUNK_SIZE):
+    """
+    Loads rows into a temporary copy of a table, indexed on the table's key.
+
+    Returns:
+        str: Name of the temporary table.
+
+    Raises:
+        ValueError: If the CSV columns miss part of the key, or two rows have the same key.
+    """
+    key = TABLE_KEYS[table]
+    missing = [column for column in key if column not in columns]
+    if missing:
+        raise ValueError(f"{table}: the CSV file has no key column(s) {', '.join(missing)}")
+    staged = f"import_{table}"
+    conn.execute(f"DROP TABLE IF EXISTS temp.{staged}")
+    # Copying the column types keeps values converted the same way as in the table, so they compare equal
+    conn.execute(f"CREATE TEMP TABLE {staged} AS SELECT {', '.join(columns)} FROM main.{table} WHERE 0")
+    insert_rows(conn, f"temp.{staged}", columns, rows, chunk_size)
+    conn.execute(f"CREATE INDEX temp.{staged}_key ON {staged} ({', '.join(key)})")
+
+    duplicate = conn.execute(
+        f"SELECT {', '.join(key)} FROM {staged} GROUP BY {', '.join(key)} HAVING COUNT(*) > 1 LIMIT 1").fetchone()
+    if duplicate:
+        raise ValueError(f"{table}: more than one row has the key {', '.join(map(str, duplicate))}")
+    if conn.execute(f"SELECT 1 FROM {staged} WHERE {' OR '.join(f'{c} IS NULL' for c in key)} LIMIT 1").fetchone():
+        raise ValueError(f"{table}: a row has no {' / '.join(key)}")
+    return staged
+
+
+def apply_rows(conn, table, columns, staged, delete=True):
+    """
+    Brings a table in line with its staged rows: inserts rows with new keys,
+    updates rows whose values differ and, if delete is set, deletes rows
+    whose key is not staged. Rows that are the same are not written, so
+    they keep their rowid and do not bump the table's version.
+
+    Returns:
+        dict: Counts of "inserted", "updated", "deleted" and "unchanged" rows.
+    """
+    key = TABLE_KEYS[table]
+    matches = " AND ".join(f"{table}.{column} = s.{column}" for column in key)
+    updated_columns = [column for column in columns
+                       if column not in key and column not in LIVE_COLUMNS.get(table, ())]
+
+    staged_count, inserted = conn.execute(
+        f"SELECT COUNT(*), COUNT(*) FILTER (WHERE NOT EXISTS (SELECT 1 FROM main.{table} WHERE {matches})) "
+        f"FROM {staged} AS s").fetchone()
+    if updated_columns:
+        on_conflict = (f"DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in updated_columns)} "
+                       f"WHERE {' OR '.join(f'{table}.{column} IS NOT excluded.{column}' for column in updated_columns)}")
+    else:
+        on_conflict = "DO NOTHING"
+    # "WHERE true" tells the parser the ON CONFLICT clause belongs to the INSERT, not a join
+    written = conn.execute(
+        f"INSERT INTO main.{table} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM {staged} WHERE true "
+        f"ON CONFLICT ({', '.join(key)}) {on_conflict}").rowcount
+    deleted = 0
+    if delete:
+        deleted = conn.execute(
+            f"DELETE FROM main.{table} WHERE NOT EXISTS (SELECT 1 FROM {staged} AS s WHERE {matches})").rowcount
+    return {"inserted": inserted, "updated": written - inserted, "deleted": deleted,
+            "unchanged": staged_count - written}
+
+
+def sync_database(source, database_path, chunk_size=CHUNK_SIZE, delete=True):
+    """
+    Updates an existing database in place from the CSV files in source.
+
+    Every CSV file is staged first; the changes to all tables are then
+    applied in one transaction, so readers see all of them or none.
+
+    Returns:
+        dict: Counts from apply_rows() for each table that had a CSV file.
+    """
+    conn = sqlite3.connect(database_path, isolation_level=None, timeout=30)
+    try:
+        # Only settings local to this connection: the API may have the database open
+        conn.execute(f"PRAGMA temp_store = {LOAD_PRAGMAS['temp_store']}")
+        conn.execute(f"PRAGMA cache_size = {LOAD_PRAGMAS['cache_size']}")
+        migrations.migrate(conn)  # The keys matched on are unique indexes
+        staged = []
+        for table, filename in TABLE_FILES:
+            path = source / filename
+            if not path.exists():
+                print(f"Error: Could not find the file at {path}; {table} is left as it is")
+                continue
+            columns, rows, file = csv_rows(path, table, conn)
+            with file:
+                staged.append((table, columns, stage_rows(conn, table, columns, rows, chunk_size)))
+
+        counts = {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table, columns, staged_table in staged:
+                counts[table] = apply_rows(conn, table, columns, staged_table, delete)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return counts
+
+
+def reload_api(api_url, timeout=60):
+    """
+    Asks a running API to re-read the drones table into its live fleet state.
+
+    Returns:
+        dict: Counts of the drones the API added, updated and deleted.
+
+    Raises:
+        OSError: If the API cannot be reached or the reload fails.
+    """
+    request = urllib.request.Request(f"{api_url.rstrip('/')}/fleet_state/reload", method="POST")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)
+
+
+def report(table, rows, started):
+    elapsed = time.perf_counter() - started
+    print(f"{table:<13}{rows:>12,} rows in {elapsed:7.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", type=Path, default=script_dir / "raw_data", help="folder holding the CSV files")
+    parser.add_argument("--db", type=Path, default=main_dir / "data" / "drone_data.db", help="database to build")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per executemany() call")
+    parser.add_argument("--incremental", action="store_true",
+                        help="update the existing database in place with only the rows that changed")
+    parser.add_argument("--keep-missing", action="store_true",
+                        help="with --incremental, keep rows that are not in the CSV files")
+    parser.add_argument("--api-url", help="with --incremental, base URL of a running API to reload afterwards")
+    args = parser.parse_args()
+
+    if args.incremental:
+        if not args.db.exists():
+            parser.error(f"{args.db} does not exist; build it without --incremental first")
+        started = time.perf_counter()
+        counts = sync_database(args.source, args.db, args.chunk_size, delete=not args.keep_missing)
+        for table, table_counts in counts.items():
+            print(f"{table:<13}" + ", ".join(f"{count:,} {change}" for change, count in table_counts.items()))
+        print(f"Database updated at: {args.db} in {time.perf_counter() - started:.1f}s")
+        if args.api_url:
+            try:
+                counts = reload_api(args.api_url)
+            except OSError as e:
+                print(f"Error: {args.api_url} did not reload its drones ({e}); "
+                      f"POST {args.api_url.rstrip('/')}/fleet_state/reload once it is reachable")
+                sys.exit(1)
+            print("API reloaded: " + ", ".join(f"{count:,} {change}" for change, count in counts.items()))
+        return
+    if args.keep_missing or args.api_url:
+        parser.error("--keep-missing and --api-url only apply to --incremental")
+
+    # Create data folder if it doesn't exist
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    total = build_database(args.source, args.db, args.chunk_size)
+    elapsed = time.perf_counter() - started
+    print(f"Database created at: {args.db} ({total:,} rows in {elapsed:.1f}s, "
+          f"{total / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
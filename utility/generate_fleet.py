@@ -0,0 +1,252 @@
+"""
+Generates a synthetic fleet for scale testing: drones, pilots, routes with
+their waypoints, and flight plans whose foreign keys all resolve.
+
+Positions cluster around the towns of Benton and Washington counties that
+the shipped data flies over. Output is seeded, so the same arguments always
+produce the same data, and streamed: rows are written as they are
+generated, so memory use does not grow with the fleet size.
+
+Write the four CSV files in the layout of utility/raw_data (load them with
+create_db.py), or build a SQLite database directly:
+
+    python utility/generate_fleet.py --drones 1000000 --csv utility/synthetic_data
+    python utility/generate_fleet.py --drones 1000000 --db data/drone_data.db --replace
+"""
+import argparse
+import csv
+import itertools
+import math
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from create_db import CHUNK_SIZE, insert_rows, relax_pragmas, report  # noqa: E402
+from API import migrations  # noqa: E402
+
+# (name, latitude, longitude, weight): where drones are based and routes start
+HUBS = [
+    ("Bentonville", 36.372854, -94.208817, 6),
+    ("Rogers", 36.332020, -94.118538, 5),
+    ("Springdale", 36.186744, -94.128814, 4),
+    ("Fayetteville", 36.062580, -94.157426, 4),
+    ("Bella Vista", 36.481220, -94.273290, 2),
+    ("Centerton", 36.359800, -94.285200, 2),
+    ("Pea Ridge", 36.454022, -94.116936, 1),
+    ("Lowell", 36.255400, -94.130700, 1),
+    ("Cave Springs", 36.263700, -94.231900, 1),
+    ("Siloam Springs", 36.188133, -94.540500, 1),
+]
+
+# Spread of positions around a hub, in degrees (about 3 km)
+HUB_SPREAD_DEG = 0.03
+# Largest distance of a waypoint from its route's start, in degrees (about 20 km)
+ROUTE_RADIUS_DEG = 0.18
+
+# (Drone_Model, Manufacturer, Serial prefix, weight)
+MODELS = [
+    ("DJI Mavic Air 2", "DJI Innovations", "12", 5),
+    ("DJI Phantom 4 Pro", "DJI Innovations", "23", 4),
+    ("DJI Matrice 300 RTK", "DJI Innovations", "34", 2),
+    ("Autel EVO II", "Autel Robotics", "45", 2),
+    ("Skydio 2+", "Skydio", "56", 1),
+]
+
+# (Status, Status_Code, weight)
+STATUSES = [("Active", "OK", 80), ("Maintenance", "MAINT", 20)]
+
+COLUMNS = {
+    "drones": ["BUNO_ID", "Drone_Model", "Manufacturer", "Purchase_Date", "Serial", "Status", "Status_Code",
+               "Altitude", "Latitude", "Longitude"],
+    "pilots": ["Pilot_ID", "Pilot_Current", "Pilot_Hours"],
+    "routes": ["Route_ID", "Latitude", "Longitude", "Waypoint_ID"],
+    "flight_plans": ["Flight_Plan_ID", "BUNO_ID", "Pilot_ID", "Route_ID", "IsPlanned", "IsComplete"],
+}
+
+# CSV file names, as in utility/raw_data
+CSV_FILES = {
+    "drones": "drone.csv",
+    "pilots": "pilot_currency.csv",
+    "routes": "flight_route.csv",
+    "flight_plans": "flight_plan.csv",
+}
+
+
+def make_id(prefix, n, count):
+    # Zero-padded so IDs sort in generation order, at least as wide as the shipped DR-001
+    return f"{prefix}-{n:0{max(3, len(str(count)))}d}"
+
+
+class FleetGenerator:
+    """
+    Streams the rows of each table. Every table has its own random stream
+    derived from the seed, so a table's rows do not depend on which other
+    tables were generated, or in what order.
+    """
+
+    def __init__(self, drones, pilots, routes, waypoints, flight_plans, seed):
+        self.counts = {"drones": drones, "pilots": pilots, "routes": routes, "flight_plans": flight_plans}
+        self.waypoints = waypoints
+        self.seed = seed
+        hubs = [(lat, lon) for _, lat, lon, _ in HUBS]
+        self._hubs = hubs
+        self._hub_weights = list(itertools.accumulate(weight for *_, weight in HUBS))
+        self._model_weights = list(itertools.accumulate(weight for *_, weight in MODELS))
+        self._status_weights = list(itertools.accumulate(weight for *_, weight in STATUSES))
+
+    def _rng(self, table):
+        return random.Random(f"{self.seed}:{table}")
+
+    def _near_hub(self, rng, spread=HUB_SPREAD_DEG):
+        lat, lon = rng.choices(self._hubs, cum_weights=self._hub_weights)[0]
+        return round(rng.gauss(lat, spread), 6), round(rng.gauss(lon, spread / math.cos(math.radians(lat))), 6)
+
+    def drones(self):
+        rng = self._rng("drones")
+        count = self.counts["drones"]
+        first_day = date(2019, 1, 1)
+        days = (date(2024, 12, 31) - first_day).days
+        for n in range(1, count + 1):
+            model, manufacturer, serial_prefix, _ = rng.choices(MODELS, cum_weights=self._model_weights)[0]
+            status, status_code, _ = rng.choices(STATUSES, cum_weights=self._status_weights)[0]
+            latitude, longitude = self._near_hub(rng)
+            altitude = rng.randrange(100, 501, 10) if status == "Active" else 0
+            yield (make_id("DR", n, count), model, manufacturer,
+                   (first_day + timedelta(days=rng.randrange(days))).isoformat(),
+                   int(serial_prefix + f"{rng.randrange(10000):04d}"), status, status_code,
+                   altitude, latitude, longitude)
+
+    def pilots(self):
+        rng = self._rng("pilots")
+        count = self.counts["pilots"]
+        for n in range(1, count + 1):
+            # Hours are log-normal: most pilots have a few hundred, a few have thousands
+            hours = min(10000, max(10, int(rng.lognormvariate(6.2, 0.8))))
+            yield make_id("PILOT", n, count), rng.random() < 0.6, hours
+
+    def routes(self):
+        """
+        Yields waypoint rows. Each route is a loop out of a hub and back to
+        its start, like the shipped routes; it has between half and one and a
+        half times the average number of waypoints, and at least three.
+        """
+        rng = self._rng("routes")
+        count = self.counts["routes"]
+        low, high = max(3, self.waypoints // 2), max(3, self.waypoints * 3 // 2)
+        for n in range(1, count + 1):
+            route_id = make_id("RT", n, count)
+            start = self._near_hub(rng, HUB_SPREAD_DEG / 3)
+            points = rng.randint(low, high)
+            # Waypoints go round the start at increasing bearings so the loop does not cross itself
+            bearing = rng.uniform(0, 2 * math.pi)
+            step = 2 * math.pi / points
+            cos_lat = math.cos(math.radians(start[0]))
+            yield route_id, start[0], start[1], "1"
+            for waypoint in range(2, points):
+                bearing += step * rng.uniform(0.5, 1.5)
+                distance = ROUTE_RADIUS_DEG * rng.uniform(0.2, 1.0)
+                yield (route_id, round(start[0] + distance * math.sin(bearing), 6),
+                       round(start[1] + distance * math.cos(bearing) / cos_lat, 6), str(waypoint))
+            yield route_id, start[0], start[1], str(points)
+
+    def flight_plans(self):
+        rng = self._rng("flight_plans")
+        count = self.counts["flight_plans"]
+        drones, pilots, routes = self.counts["drones"], self.counts["pilots"], self.counts["routes"]
+        for n in range(1, count + 1):
+            planned = rng.random() < 0.9
+            yield (make_id("FP", n, count), make_id("DR", rng.randint(1, drones), drones),
+                   make_id("PILOT", rng.randint(1, pilots), pilots), make_id("RT", rng.randint(1, routes), routes),
+                   planned, planned and rng.random() < 0.5)
+
+    def tables(self):
+        """
+        Returns:
+            list of tuple: (table name, row iterator), referenced tables first.
+        """
+        return [("drones", self.drones()), ("pilots", self.pilots()),
+                ("routes", self.routes()), ("flight_plans", self.flight_plans())]
+
+
+def write_csv(generator, folder):
+    folder.mkdir(parents=True, exist_ok=True)
+    for table, rows in generator.tables():
+        started = time.perf_counter()
+        with open(folder / CSV_FILES[table], "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(COLUMNS[table])
+            written = 0
+            for chunk in iter(lambda: list(itertools.islice(rows, CHUNK_SIZE)), []):
+                # Booleans as the shipped CSV files spell them
+                writer.writerows(tuple("TRUE" if value is True else "FALSE" if value is False else value
+                                       for value in row) for row in chunk)
+                written += len(chunk)
+        report(table, written, started)
+
+
+def write_database(generator, path):
+    # Loaded the way create_db.py loads the CSV files
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        relax_pragmas(conn)
+        migrations.migrate(conn, target=1)  # Tables only: indexes are built once the rows are in
+        for table, rows in generator.tables():
+            started = time.perf_counter()
+            report(table, insert_rows(conn, table, COLUMNS[table], rows), started)
+        started = time.perf_counter()
+        migrations.migrate(conn)
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        print(f"indexes and schema version {migrations.current_version(conn)} in {time.perf_counter() - started:.1f}s")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--csv", type=Path, help="folder to write the four CSV files to")
+    target.add_argument("--db", type=Path, help="SQLite database to build")
+    parser.add_argument("--replace", action="store_true", help="overwrite the --db file if it exists")
+    parser.add_argument("--drones", type=int, default=10000)
+    parser.add_argument("--pilots", type=int, help="defaults to one per two drones")
+    parser.add_argument("--routes", type=int, help="defaults to one per ten drones")
+    parser.add_argument("--waypoints", type=int, default=10, help="average waypoints per route")
+    parser.add_argument("--flight-plans", type=int, help="defaults to one per drone")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    pilots = args.pilots or max(1, args.drones // 2)
+    routes = args.routes or max(1, args.drones // 10)
+    flight_plans = args.flight_plans if args.flight_plans is not None else args.drones
+    if min(args.drones, pilots, routes, args.waypoints) < 1:
+        parser.error("--drones, --pilots, --routes and --waypoints must be at least 1")
+    generator = FleetGenerator(args.drones, pilots, routes, args.waypoints, flight_plans, args.seed)
+
+    started = time.perf_counter()
+    if args.csv:
+        write_csv(generator, args.csv)
+        print(f"CSV files written to {args.csv} in {time.perf_counter() - started:.1f}s")
+        return 0
+
+    if args.db.exists():
+        if not args.replace:
+            parser.error(f"{args.db} exists; pass --replace to overwrite it")
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            Path(f"{args.db}{suffix}").unlink(missing_ok=True)
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        write_database(generator, args.db)
+    except BaseException:
+        args.db.unlink(missing_ok=True)
+        raise
+    print(f"Database written to {args.db} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())